@@ -1,31 +1,32 @@
 # app.py
 
-from flask import Flask
+# Time every import made while the app starts (see `flask startup-report`)
+from utils.startup import ImportTimer, print_startup_report
+
+_import_timer = ImportTimer().start()
+
+import click
+from flask import Flask, Response, g, request
 from dotenv import load_dotenv
 from flask_cors import CORS
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
-from sqlite3 import Connection as SQLite3Connection
 import os
+import time
 
-from models import db, Tag
+from models import db, Tag, MessageStats
+from models.engine import configure_engine
+from utils import metrics, warming
+from utils.responses import FastJSONProvider
 
 # Load environment variables
 load_dotenv()
 
 
-# Enable foreign key support for SQLite (from old app)
-@event.listens_for(Engine, "connect")
-def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
-    if isinstance(dbapi_connection, SQLite3Connection):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
-
-
 def create_app():
     app = Flask(__name__)
 
+    # Serialize jsonify responses with orjson when available
+    app.json = FastJSONProvider(app)
+
     # Database config
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DB_URL")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
@@ -33,8 +34,9 @@ def create_app():
     # Allow CORS (same as old version)
     CORS(app, resources={r"/*": {"origins": "*"}})
 
-    # Initialize SQLAlchemy without creating DB yet
-    db.init_app(app)
+    # Initialize SQLAlchemy without creating DB yet, using the engine profile
+    # selected with DB_PROFILE (pool settings, SQLite pragmas, query timing)
+    configure_engine(app, db)
 
     # Register blueprints inside context (best practice)
     with app.app_context():
@@ -44,11 +46,56 @@ def create_app():
         app.register_blueprint(user_bp)
         app.register_blueprint(geo_bp)  # Was active in old version
 
+        # Earth Engine is initialized on the first geo request, not here
+        app.config["STARTUP_REPORT"] = _import_timer.stop().report()
+        print_startup_report(app.config["STARTUP_REPORT"])
+
         # Root endpoint
         @app.route("/")
         def index():
             return "root"
 
+        # Metrics endpoint (Prometheus text format)
+        @app.route("/metrics")
+        def metrics_endpoint():
+            return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+        # Background cache warming (WARM_CACHE_AT, validated once here), started
+        # by the first request so CLI commands don't run it
+        app.config["WARM_CACHE_SCHEDULE"] = warming.schedule_from_env()
+
+        @app.before_request
+        def start_background_jobs():
+            warming.ensure_scheduler(app)
+
+        # Request latency and in-flight metrics. Observed when the response is
+        # closed, so streamed responses are measured until their last byte.
+        @app.before_request
+        def start_request_metrics():
+            g.metrics_start = time.perf_counter()
+            g.metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.HTTP_IN_FLIGHT.labels(endpoint=g.metrics_endpoint).inc()
+
+        @app.after_request
+        def finish_request_metrics(response):
+            if "metrics_start" not in g:
+                return response
+            start, endpoint = g.metrics_start, g.metrics_endpoint
+            labels = {
+                "method": request.method,
+                "endpoint": endpoint,
+                "status": response.status_code,
+            }
+
+            def observe():
+                metrics.HTTP_IN_FLIGHT.labels(endpoint=endpoint).dec()
+                metrics.HTTP_REQUEST_SECONDS.labels(**labels).observe(
+                    time.perf_counter() - start
+                )
+
+            response.call_on_close(observe)
+            return response
+
         # CLI command: init-db
         @app.cli.command("init-db")
         def init_db():
@@ -70,6 +117,44 @@ def create_app():
             print(Tag.get_tags())
             print("Base de datos inicializada")
 
+        # CLI command: startup-report
+        @app.cli.command("startup-report")
+        def startup_report():
+            report = app.config["STARTUP_REPORT"]
+            print_startup_report(report)
+            print("Slowest modules (total / self ms):")
+            for item in report["modules"]:
+                print(f"   {item['module']:<48} {item['total_ms']:>8.1f} {item['self_ms']:>8.1f}")
+
+        # CLI command: warm-cache
+        @app.cli.command("warm-cache")
+        @click.option("--region", "region_names", multiple=True, help="Only warm these regions (by name)")
+        def warm_cache(region_names):
+            regions = warming.load_regions()
+            if region_names:
+                regions = [r for r in regions if r["name"] in region_names]
+            warming.print_report(warming.warm_all(regions))
+
+        # CLI command: build-atlas
+        @app.cli.command("build-atlas")
+        @click.option("--region", "region_names", multiple=True, help="Only build these regions (by name)")
+        def build_atlas(region_names):
+            from utils import atlas
+
+            regions = warming.load_regions()
+            if region_names:
+                regions = [r for r in regions if r["name"] in region_names]
+            for region in regions:
+                built = atlas.build_atlas(region)
+                cells = sum(len(c) for c in built["resolutions"].values())
+                print(f"✅ Atlas {region['name']}: {cells} cells -> {atlas.atlas_path(region['name'])}")
+
+        # CLI command: rebuild-stats
+        @app.cli.command("rebuild-stats")
+        def rebuild_stats():
+            MessageStats.rebuild()
+            print("Message stats rebuilt")
+
     return app
 
 
@@ -0,0 +1,381 @@
+# benchmarks/fake_ee.py
+#
+# Recording stand-in for the `ee` client library. Every ee constructor and method
+# call builds a node of a local computation graph (nothing is sent anywhere), and
+# every getInfo/getMapId is recorded as one round trip together with the size of
+# the graph it would have sent and when it ran (to tell overlapping calls apart). Values returned by getInfo are plausible
+# placeholders so the application code can run end to end.
+
+import contextlib
+import hashlib
+import itertools
+import json
+import threading
+import time
+import types
+
+# Band names the application reads back from reduceRegion results
+_BAND_VALUES = {
+    "LST_Day_1km": 31.5,
+    "LST": 31.5,
+    "NDVI": 0.32,
+    "NDBI": -0.05,
+    "AQ_Composite_0_100": 42.0,
+    "AQ": 42.0,
+    "u_component_of_wind_10m": 2.1,
+    "v_component_of_wind_10m": -1.3,
+    "wind_speed": 2.47,
+    "wind_speed_1000m": 2.4,
+    "wind_speed_5000m": 2.5,
+    "wind_speed_10000m": 2.6,
+}
+
+# Like Earth Engine, getInfo of a larger collection fails
+MAX_GETINFO_FEATURES = 5000
+
+_ids = itertools.count(1)
+
+
+class Node:
+    """
+    One operation in the fake computation graph.
+    """
+
+    __slots__ = ("op", "args", "kwargs", "id")
+
+    def __init__(self, op, args=(), kwargs=None):
+        self.op = op
+        self.args = tuple(_capture(a) for a in args)
+        self.kwargs = {k: _capture(v) for k, v in (kwargs or {}).items()}
+        self.id = next(_ids)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _BoundMethod(self, name)
+
+    def __repr__(self):
+        return f"<fake ee {self.op}#{self.id}>"
+
+    # --- Round trips ---
+
+    def getInfo(self):
+        with RECORDER.round_trip("getInfo", self):
+            _wait()
+        result = evaluate(self)
+        if isinstance(result, dict) and len(result.get("features") or ()) > MAX_GETINFO_FEATURES:
+            raise EEException(
+                f"Collection query aborted after accumulating over {MAX_GETINFO_FEATURES} elements."
+            )
+        return result
+
+    def getMapId(self, vis_params=None):
+        with RECORDER.round_trip("getMapId", self):
+            _wait()
+        return {
+            "mapid": f"fake-{self.id}",
+            "token": "",
+            "tile_fetcher": types.SimpleNamespace(
+                url_format=f"https://fake-ee.local/map/{self.id}/{{z}}/{{x}}/{{y}}"
+            ),
+        }
+
+    def serialize(self, *args, **kwargs):
+        # Like the real client, the encoding depends only on the expression,
+        # not on the Python objects that built it
+        return json.dumps(graph_of(self), sort_keys=True, default=str)
+
+
+class _BoundMethod:
+    __slots__ = ("node", "name")
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        return Node(self.name, (self.node,) + args, kwargs)
+
+
+class _Namespace:
+    """
+    Callable namespace such as `ee.Image` (constructor) or `ee.Reducer.mean`.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Namespace(f"{self._name}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return Node(self._name, args, kwargs)
+
+
+def _capture(value):
+    # Server-side functions (e.g. collection.map(lambda img: ...)) are traced
+    # with a placeholder argument, like the real client does
+    if callable(value) and not isinstance(value, (Node, _Namespace, _BoundMethod, type)):
+        try:
+            return Node("Function", (value(Node("Argument")),))
+        except Exception:
+            return Node("Function")
+    if isinstance(value, dict):
+        return {k: _capture(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_capture(v) for v in value]
+    return value
+
+
+def _children(value):
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _children(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _children(v)
+
+
+def walk(root):
+    """
+    Return every distinct node reachable from root.
+    """
+    seen, stack = {}, [root]
+    while stack:
+        node = stack.pop()
+        if node.id in seen:
+            continue
+        seen[node.id] = node
+        for value in node.args + tuple(node.kwargs.values()):
+            stack.extend(_children(value))
+    return list(seen.values())
+
+
+def graph_of(root):
+    """
+    Encode the graph with structural node ids (hash of the operation and its
+    inputs), so identical expressions serialize identically.
+    """
+    digests, nodes = {}, {}
+
+    def encode(value):
+        if isinstance(value, Node):
+            return {"ref": digest(value)}
+        if isinstance(value, dict):
+            return {k: encode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [encode(v) for v in value]
+        return value
+
+    def digest(node):
+        if node.id not in digests:
+            body = {"op": node.op, "args": encode(list(node.args)), "kwargs": encode(node.kwargs)}
+            key = hashlib.sha1(
+                json.dumps(body, sort_keys=True, default=str).encode()
+            ).hexdigest()[:16]
+            digests[node.id] = key
+            nodes[key] = body
+        return digests[node.id]
+
+    return {"result": digest(root), "nodes": nodes}
+
+
+# --- Placeholder evaluation ---
+
+# Extra evaluators registered by benchmarks for ops that need a specific shape
+EVALUATORS = {}
+
+
+def evaluate(value):
+    if isinstance(value, dict):
+        return {k: evaluate(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [evaluate(v) for v in value]
+    if not isinstance(value, Node):
+        return value
+
+    op = value.op
+    if op in EVALUATORS:
+        return EVALUATORS[op](value)
+    if op == "reduceRegion":
+        return dict(_BAND_VALUES)
+    if op == "Dictionary":
+        return evaluate(value.args[0]) if value.args else {}
+    if op == "List":
+        return evaluate(value.args[0]) if value.args else []
+    if op == "get":
+        container = evaluate(value.args[0])
+        key = evaluate(value.args[1]) if len(value.args) > 1 else None
+        if isinstance(container, dict):
+            return container.get(key, 0.5)
+        if isinstance(container, list) and isinstance(key, int) and key < len(container):
+            return container[key]
+        return 0.5
+    if op in ("size", "length"):
+        return 4000
+    if op == "map":
+        # ee.List.map: one placeholder per element (collections stay opaque)
+        container = evaluate(value.args[0]) if value.args else None
+        return [0.5] * len(container) if isinstance(container, list) else 0.5
+    if op == "FeatureCollection":
+        return evaluate(value.args[0]) if value.args and isinstance(value.args[0], dict) else 0.5
+    if op == "reduceRegions":
+        collection = evaluate(value.kwargs.get("collection", value.args[1] if len(value.args) > 1 else None))
+        features = collection.get("features", []) if isinstance(collection, dict) else []
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {**f, "properties": {**(f.get("properties") or {}), **_BAND_VALUES}} for f in features
+            ],
+        }
+    if op == "sample":
+        return _sample_table(value)
+    if op == "limit":
+        collection = evaluate(value.args[0])
+        count = evaluate(value.args[1] if len(value.args) > 1 else value.kwargs.get("max"))
+        if isinstance(collection, dict) and "features" in collection:
+            return {**collection, "features": collection["features"][:count]}
+        return collection
+    if op == "reduceColumns":
+        return {"scale": -9.5, "offset": 34.8, "coefficients": [[34.8], [-9.5], [4.0]]}
+    return 0.5
+
+
+def _sample_table(node):
+    """
+    Sampled pixels with a plausible relation between the bands (LST and AQ
+    fall with NDVI and rise with NDBI), so local fits are well conditioned.
+    """
+    import random
+
+    rng = random.Random(node.kwargs.get("seed", 0))
+    features = []
+    for _ in range(int(node.kwargs.get("numPixels", 1000))):
+        ndvi, ndbi = rng.uniform(0.0, 0.7), rng.uniform(-0.3, 0.3)
+        lst = 35.0 - 10.0 * ndvi + 5.0 * ndbi + rng.gauss(0, 1.0)
+        aq = 50.0 - 20.0 * ndvi + rng.gauss(0, 3.0)
+        properties = {
+            "NDVI": ndvi, "NDBI": ndbi, "LST": lst, "AQ": aq,
+            "LST_Day_1km": lst, "AQ_Composite_0_100": aq,
+        }
+        features.append({"type": "Feature", "geometry": None, "properties": properties})
+    return {"type": "FeatureCollection", "features": features}
+
+
+# --- Round trip recorder ---
+
+# Simulated server latency per round trip, in seconds (used by concurrency cases)
+LATENCY_S = 0.0
+
+# Error messages raised by the next round trips, in order (e.g. quota errors)
+ERRORS = []
+
+
+def _wait():
+    if LATENCY_S:
+        time.sleep(LATENCY_S)
+    if ERRORS:
+        raise EEException(ERRORS.pop(0))
+
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+
+    @contextlib.contextmanager
+    def round_trip(self, kind, node):
+        call = {
+            "kind": kind,
+            "op": node.op,
+            "graph_nodes": len(walk(node)),
+            "request_bytes": len(node.serialize()),
+            "start": time.perf_counter(),
+        }
+        with self._lock:
+            self.calls.append(call)
+        try:
+            yield
+        finally:
+            call["end"] = time.perf_counter()
+
+    def summary(self):
+        with self._lock:
+            calls = list(self.calls)
+        by_call = {}
+        for call in calls:
+            key = call["kind"] if call["kind"] == "getMapId" else f"getInfo:{call['op']}"
+            by_call[key] = by_call.get(key, 0) + 1
+        return {
+            "round_trips": len(calls),
+            "sequential_trips": _sequential_trips(calls),
+            "graph_nodes": sum(call["graph_nodes"] for call in calls),
+            "request_bytes": sum(call["request_bytes"] for call in calls),
+            "by_call": dict(sorted(by_call.items())),
+        }
+
+
+def _sequential_trips(calls):
+    """
+    Round trips on the critical path: calls started while another one was
+    still in flight overlap it and count once.
+    """
+    trips, wave_end = 0, None
+    for call in sorted(calls, key=lambda c: c["start"]):
+        end = call.get("end", call["start"])
+        if wave_end is None or call["start"] >= wave_end:
+            trips, wave_end = trips + 1, end
+        else:
+            wave_end = min(wave_end, end)
+    return trips
+
+
+RECORDER = Recorder()
+
+
+class EEException(Exception):
+    pass
+
+
+class IndustryModel:
+    """
+    Stand-in for ML_Models/industry_model.pkl, which is not part of the
+    repository: a fixed linear ΔLST over the same feature columns (latitude,
+    longitude, CO2e, industry flags, wind speeds at 1/5/10 km).
+    """
+
+    def predict(self, X):
+        import numpy as np
+
+        X = np.asarray(X, dtype=float)
+        return 1.0 + 2e-5 * X[:, 2] + 0.5 * X[:, 3:-3].sum(axis=1) - 0.3 * X[:, -3:].mean(axis=1)
+
+
+class _FakeEEModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Namespace(name)
+
+
+def install():
+    """
+    Build the fake `ee` module. Put it in sys.modules["ee"] before the
+    application imports Earth Engine.
+    """
+    module = _FakeEEModule("ee")
+    module.EEException = EEException
+    module.Initialize = lambda *args, **kwargs: None
+    module.ServiceAccountCredentials = lambda *args, **kwargs: None
+    module.RECORDER = RECORDER
+    module.__fake__ = True
+    return module
@@ -0,0 +1,573 @@
+# benchmarks/geo_roundtrips.py
+#
+# Round-trip budget benchmark for the /geo endpoints.
+#
+# Every geo endpoint is driven through the Flask test client with the `ee` module
+# replaced by a recording stand-in (benchmarks/fake_ee.py), so no credentials or
+# network are needed. For each request we measure:
+#   - round trips: getInfo/getMapId calls (the dominant latency cost in production)
+#   - graph nodes: total size of the computation graphs sent with those calls
+#   - request kB: serialized size of those graphs (geometries included)
+#   - cpu ms: client-side CPU spent building graphs and the response
+#
+# Results are compared with benchmarks/baselines.json and the run fails (exit
+# code 1) when an endpoint goes over its budget. Round trips are a hard budget;
+# graph size and CPU get some tolerance.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.geo_roundtrips
+#   python -m benchmarks.geo_roundtrips --update-baseline
+#   python -m benchmarks.geo_roundtrips --only simulate-polygons --verbose
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+from . import fake_ee
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Allowed growth before a case fails
+GRAPH_TOLERANCE = 0.10
+CPU_FACTOR = 3.0
+CPU_SLACK_MS = 50.0
+
+# Sample area in Monterrey, MX (the demo region of the frontend)
+LATITUDE, LONGITUDE = 25.6866, -100.3161
+
+_SQUARE = {
+    "type": "Polygon",
+    "coordinates": [[
+        [-100.320, 25.680], [-100.310, 25.680], [-100.310, 25.690],
+        [-100.320, 25.690], [-100.320, 25.680],
+    ]],
+}
+# _SQUARE drawn clockwise from another corner, with float noise
+_SQUARE_REDRAWN = {
+    "type": "Polygon",
+    "coordinates": [[
+        [-100.310, 25.6900000001], [-100.310, 25.680], [-100.3200000002, 25.680],
+        [-100.320, 25.690], [-100.310, 25.6900000001],
+    ]],
+}
+# A traced parcel: ~1 km circle with 2000 jittered vertices
+_TRACED_PARCEL = {
+    "type": "Polygon",
+    "coordinates": [[
+        [
+            round(-100.315 + 0.005 * math.cos(2 * math.pi * i / 2000) * (1 + 0.0005 * math.sin(37 * i)), 7),
+            round(25.685 + 0.005 * math.sin(2 * math.pi * i / 2000), 7),
+        ]
+        for i in [*range(2000), 0]
+    ]],
+}
+_SQUARE_EAST = {
+    "type": "Polygon",
+    "coordinates": [[
+        [-100.300, 25.680], [-100.290, 25.680], [-100.290, 25.690],
+        [-100.300, 25.690], [-100.300, 25.680],
+    ]],
+}
+_SQUARE_NORTH = {
+    "type": "Polygon",
+    "coordinates": [[
+        [-100.320, 25.700], [-100.310, 25.700], [-100.310, 25.710],
+        [-100.320, 25.710], [-100.320, 25.700],
+    ]],
+}
+
+_POINT_ARGS = {"latitude": LATITUDE, "longitude": LONGITUDE, "buffer": 5000}
+
+def _case(name, method, path, concurrency=1, errors=(), warm=False, setup=None, **kwargs):
+    """
+    One benchmark case. `concurrency` runs the request from several threads at
+    once; `errors` are Earth Engine error messages raised by the first round
+    trips; `warm` runs cache warming for the sample region before the request;
+    `setup(client)` runs before it and returns the fields to format `path` with.
+    Every case starts with an empty result cache.
+    """
+    return {
+        "name": name,
+        "method": method,
+        "path": path,
+        "kwargs": kwargs,
+        "concurrency": concurrency,
+        "errors": list(errors),
+        "warm": warm,
+        "setup": setup,
+    }
+
+
+_POLYGONS = [
+    {"type": "Feature", "id": "park", "geometry": _SQUARE,
+     "properties": {"preset": "green_real", "arboles": 150, "pasto": 50, "copa": 40}},
+    {"type": "Feature", "id": "housing", "geometry": _SQUARE_EAST,
+     "properties": {"preset": "residential_real", "densidad": 700, "trafico": 12000, "albedo": 0.2}},
+    {"type": "Feature", "id": "plant", "geometry": _SQUARE_NORTH,
+     "properties": {"preset": "industrial", "co2": 50000, "ch4": 100, "n2o": 10}},
+]
+
+
+def _create_scenario(client):
+    from models import db
+    from utils import cache
+
+    with client.application.app_context():
+        db.create_all()
+    # Responses are closed so the geo bulkhead slot is given back
+    with client.post("/geo/scenarios", json={**_POINT_ARGS, "geometries": _POLYGONS}) as response:
+        scenario_id = response.get_json()["payload"]["scenario_id"]
+    # Measure the reuse of the stored features, not of cached results
+    cache.get_cache().clear()
+    return {"scenario_id": scenario_id}
+
+
+_GREEN_REAL = {
+    **_POINT_ARGS, "preset": "green_real", "geometry": _SQUARE,
+    "arboles": 120, "pasto": 40, "copa": 35, "agua": True,
+}
+
+
+def _simulate_green_real(client):
+    client.post("/geo/simulate", json=_GREEN_REAL).close()
+    return {}
+
+
+def _build_atlas(client):
+    from utils import atlas
+
+    atlas.build_atlas(_SAMPLE_REGION)
+    return {}
+
+
+# Past 12 months up to the current one, which is still partial
+_SERIES_TO = datetime.date.today().strftime("%Y-%m")
+_SERIES_FROM = (datetime.date.today().replace(day=1) - datetime.timedelta(days=330)).strftime("%Y-%m")
+
+
+def _request_timeseries(client):
+    from utils import cache
+
+    client.get(
+        "/geo/timeseries",
+        query_string={**_POINT_ARGS, "layer": "heat", "from": _SERIES_FROM, "to": _SERIES_TO},
+    ).close()
+    # Keep only the immutable month entries, as on a later day
+    cache.get_cache()._connect().execute("DELETE FROM entries WHERE key NOT LIKE 'timeseries:%'")
+    return {}
+
+
+def _load_facilities(client):
+    from utils import facilities
+
+    facilities.get_table()
+    return {}
+
+
+_INDUSTRIAL = {
+    **_POINT_ARGS, "preset": "industrial", "geometry": _SQUARE_NORTH,
+    "co2": 50000, "ch4": 100, "n2o": 10, "industries_used": ["Cement Production"],
+}
+
+# Candidate plant sites on a grid around the sample area
+_CANDIDATE_SITES = [
+    {
+        "id": f"site-{i}",
+        "latitude": round(LATITUDE - 0.5 + (i // 50) * 0.02, 4),
+        "longitude": round(LONGITUDE - 0.5 + (i % 50) * 0.02, 4),
+        "co2": 20000 + 150 * i, "ch4": 50, "n2o": 5,
+        "industries_used": ["Cement Production"] if i % 3 else ["Iron and Steel Production"],
+    }
+    for i in range(2000)
+]
+
+# Industrial cases use a stand-in industry model (fake_ee.IndustryModel), the
+# real pickle is not part of the repository.
+CASES = [
+    _case("get-initial-data/temp", "GET", "/geo/get-initial-data/temp", query_string=_POINT_ARGS),
+    _case("get-initial-data/ndvi", "GET", "/geo/get-initial-data/ndvi", query_string=_POINT_ARGS),
+    _case("get-initial-data/aq", "GET", "/geo/get-initial-data/aq", query_string=_POINT_ARGS),
+    _case("get-kpis (all layers)", "GET", "/geo/get-kpis", query_string=_POINT_ARGS),
+    _case("get-kpis/heat", "GET", "/geo/get-kpis/heat", query_string=_POINT_ARGS),
+    _case("get-kpis/NDVI", "GET", "/geo/get-kpis/NDVI", query_string=_POINT_ARGS),
+    _case("get-kpis/AQ", "GET", "/geo/get-kpis/AQ", query_string=_POINT_ARGS),
+    # Area KPIs inside a city with a precomputed atlas need no round trip
+    _case(
+        "area-kpis (atlas)",
+        "POST",
+        "/geo/area-kpis",
+        setup=_build_atlas,
+        json={"geometry": _SQUARE},
+    ),
+    _case("area-kpis (precise)", "POST", "/geo/area-kpis", json={**_POINT_ARGS, "geometry": _SQUARE, "precise": True}),
+    # Monthly series: one mapped round trip; finished months are cached for good
+    _case(
+        "timeseries/heat 12 months",
+        "GET",
+        "/geo/timeseries",
+        query_string={**_POINT_ARGS, "layer": "heat", "from": _SERIES_FROM, "to": _SERIES_TO},
+    ),
+    _case(
+        "timeseries/heat 12 months repeated",
+        "GET",
+        "/geo/timeseries",
+        setup=_request_timeseries,
+        query_string={**_POINT_ARGS, "layer": "heat", "from": _SERIES_FROM, "to": _SERIES_TO},
+    ),
+    # Modifier response surface: computed locally, no round trip
+    _case(
+        "sweep/residential_real 10000 points",
+        "POST",
+        "/geo/sweep",
+        json={
+            "preset": "residential_real",
+            "axes": {
+                "densidad": {"min": 0, "max": 1000, "steps": 25},
+                "trafico": {"min": 0, "max": 20000, "steps": 20},
+                "albedo": {"min": 0.1, "max": 0.9, "steps": 20},
+            },
+        },
+    ),
+    # Design search runs locally; only the slopes (and the validation) use EE
+    _case(
+        "optimize-green",
+        "POST",
+        "/geo/optimize-green",
+        json={**_POINT_ARGS, "geometry": _SQUARE, "budget": 5000000},
+    ),
+    _case(
+        "optimize-green validated",
+        "POST",
+        "/geo/optimize-green",
+        json={**_POINT_ARGS, "geometry": _SQUARE, "budget": 5000000, "validate": True},
+    ),
+    # Facility queries run on the in-memory columnar table
+    _case(
+        "facilities near site",
+        "GET",
+        "/geo/facilities",
+        setup=_load_facilities,
+        query_string={"latitude": 29.76, "longitude": -95.37, "radius_km": 50, "sectors": "Chemicals,Refineries", "top": 5},
+    ),
+    _case(
+        "simulate/green_real",
+        "POST",
+        "/geo/simulate",
+        json=_GREEN_REAL,
+    ),
+    # Thousands of vertices are simplified before they reach Earth Engine
+    _case(
+        "simulate/green_real traced parcel",
+        "POST",
+        "/geo/simulate",
+        json={**_GREEN_REAL, "geometry": _TRACED_PARCEL},
+    ),
+    # The same scenario drawn again (ring reversed, starting elsewhere, float
+    # noise) is answered from the result cache
+    _case(
+        "simulate/green_real repeated",
+        "POST",
+        "/geo/simulate",
+        setup=_simulate_green_real,
+        json={**_GREEN_REAL, "geometry": _SQUARE_REDRAWN},
+    ),
+    _case("simulate/industrial", "POST", "/geo/simulate", json=_INDUSTRIAL),
+    # One bulk wind reduction and one model call for all candidates
+    _case("screen-sites 2000 candidates", "POST", "/geo/screen-sites", json={"sites": _CANDIDATE_SITES}),
+    _case(
+        "screen-sites 2000, top 3 simulated",
+        "POST",
+        "/geo/screen-sites",
+        json={"sites": _CANDIDATE_SITES, "top_k": 3, "simulate": True},
+    ),
+    _case(
+        "simulate/residential_real",
+        "POST",
+        "/geo/simulate",
+        json={
+            **_POINT_ARGS, "preset": "residential_real", "geometry": _SQUARE,
+            "densidad": 600, "trafico": 8000, "albedo": 0.3,
+        },
+    ),
+    _case(
+        "simulate-tiles",
+        "POST",
+        "/geo/simulate-tiles",
+        query_string={**_POINT_ARGS, "geometry": "1", "preset": "residential"},
+    ),
+    _case(
+        "simulate-polygons",
+        "POST",
+        "/geo/simulate-polygons",
+        json={
+            **_POINT_ARGS,
+            "geometries": _POLYGONS,
+        },
+    ),
+    # Editing one polygon of a saved scenario re-simulates only that polygon
+    _case(
+        "scenario edit (1 of 3 polygons)",
+        "PATCH",
+        "/geo/scenarios/{scenario_id}",
+        setup=_create_scenario,
+        json={"features": [{**_POLYGONS[0], "properties": {**_POLYGONS[0]["properties"], "arboles": 220}}]},
+    ),
+    # Simultaneous viewers of the same region: identical computations are
+    # coalesced, so N concurrent requests cost about as many round trips as one
+    _case("concurrent get-kpis/heat x8", "GET", "/geo/get-kpis/heat", concurrency=8, query_string=_POINT_ARGS),
+    _case("concurrent get-initial-data/aq x8", "GET", "/geo/get-initial-data/aq", concurrency=8, query_string=_POINT_ARGS),
+    # Quota errors: retried with backoff, then answered with 503 + Retry-After
+    _case(
+        "get-kpis/heat after 429",
+        "GET",
+        "/geo/get-kpis/heat",
+        errors=["Too many concurrent aggregations."],
+        query_string=_POINT_ARGS,
+    ),
+    _case(
+        "get-kpis/heat over quota",
+        "GET",
+        "/geo/get-kpis/heat",
+        errors=["429 Too Many Requests: quota exceeded"] * 10,
+        query_string=_POINT_ARGS,
+    ),
+    # Regions warmed ahead of time (flask warm-cache) are served from the cache
+    _case("get-kpis (all layers) after warm-cache", "GET", "/geo/get-kpis", warm=True, query_string=_POINT_ARGS),
+    _case("get-kpis/heat after warm-cache", "GET", "/geo/get-kpis/heat", warm=True, query_string=_POINT_ARGS),
+    _case("get-initial-data/aq after warm-cache", "GET", "/geo/get-initial-data/aq", warm=True, query_string=_POINT_ARGS),
+]
+
+_SAMPLE_REGION = {"name": "benchmark", **_POINT_ARGS}
+
+# Simulated server latency per round trip, so parallel calls overlap and the
+# estimate counts them once (sequential trips)
+BASE_LATENCY_S = 0.02
+# Latency for concurrent cases, so requests overlap
+CONCURRENT_LATENCY_S = 0.05
+
+
+def _load_app():
+    sys.modules["ee"] = fake_ee.install()
+
+    # Never touch the real database or Earth Engine project
+    os.environ["DB_URL"] = "sqlite://"
+    os.environ["DB_PROFILE"] = "production"
+    os.environ["GEE_PROJECT"] = "benchmark"
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "benchmark.json"
+    work_dir = tempfile.mkdtemp(prefix="ee-bench-")
+    os.environ["EE_CACHE_PATH"] = os.path.join(work_dir, "ee_cache.db")
+    os.environ["ATLAS_DIR"] = os.path.join(work_dir, "atlas")
+    os.environ["ML_MODELS_DIR"] = os.path.join(work_dir, "models")
+    os.makedirs(os.environ["ML_MODELS_DIR"])
+    with open(os.path.join(os.environ["ML_MODELS_DIR"], "industry_model.pkl"), "wb") as fh:
+        pickle.dump(fake_ee.IndustryModel(), fh)
+    # The facility columns are kept across runs (rebuilt when the spreadsheet changes)
+    os.environ["FACILITIES_CACHE"] = os.path.join(tempfile.gettempdir(), "ee-bench-facilities.npz")
+    # Keep retry backoff short, the benchmark counts retries rather than waiting
+    os.environ["EE_BACKOFF_BASE_S"] = "0.001"
+    os.environ["EE_BACKOFF_MAX_S"] = "0.01"
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+
+    app.config["TESTING"] = True
+    return app
+
+
+def _prepare(case, client, verbose=False):
+    """
+    Run the case setup and return the request path.
+    """
+    from utils import cache, warming
+
+    path = case["path"]
+    cache.get_cache().clear()
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        if case["setup"]:
+            path = path.format(**case["setup"](client))
+        if case["warm"]:
+            warming.warm_region(_SAMPLE_REGION)
+    return path
+
+
+def run_case(client, method, path, kwargs, verbose=False):
+    """
+    Run one request and return its status, round trips, graph size and CPU time.
+    """
+    fake_ee.RECORDER.reset()
+    output = io.StringIO()
+    cpu_start = time.process_time()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()  # drain streamed responses
+        response.close()
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    return {
+        "status": response.status_code,
+        **fake_ee.RECORDER.summary(),
+        "cpu_ms": round(cpu_ms, 1),
+    }
+
+
+def run_concurrent_case(app, method, path, kwargs, concurrency, verbose=False):
+    """
+    Run the same request from several threads at once. Round trips and graph
+    size are totals over all requests.
+    """
+    fake_ee.RECORDER.reset()
+    fake_ee.LATENCY_S = CONCURRENT_LATENCY_S
+    barrier = threading.Barrier(concurrency)
+    statuses = []
+
+    def viewer():
+        client = app.test_client()
+        barrier.wait()
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+        response.close()
+        statuses.append(response.status_code)
+
+    output = io.StringIO()
+    cpu_start = time.process_time()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else output):
+            threads = [threading.Thread(target=viewer) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        fake_ee.LATENCY_S = BASE_LATENCY_S
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    return {
+        "status": max(statuses),
+        **fake_ee.RECORDER.summary(),
+        "cpu_ms": round(cpu_ms, 1),
+    }
+
+
+def check(name, result, baseline):
+    """
+    Compare one result with its baseline. Returns a list of budget violations.
+    """
+    if baseline is None:
+        return [f"{name}: no baseline, run with --update-baseline"]
+
+    problems = []
+    if result["status"] != baseline["status"]:
+        problems.append(f"{name}: status {result['status']} (baseline {baseline['status']})")
+    if result["round_trips"] > baseline["round_trips"]:
+        problems.append(
+            f"{name}: {result['round_trips']} round trips, budget {baseline['round_trips']} "
+            f"({_diff_calls(result['by_call'], baseline['by_call'])})"
+        )
+    graph_budget = baseline["graph_nodes"] * (1 + GRAPH_TOLERANCE)
+    if result["graph_nodes"] > graph_budget:
+        problems.append(
+            f"{name}: {result['graph_nodes']} graph nodes, budget {graph_budget:.0f}"
+        )
+    if "request_bytes" in baseline:
+        bytes_budget = baseline["request_bytes"] * (1 + GRAPH_TOLERANCE)
+        if result["request_bytes"] > bytes_budget:
+            problems.append(
+                f"{name}: {result['request_bytes'] / 1024:.1f} kB sent, budget {bytes_budget / 1024:.1f} kB"
+            )
+    cpu_budget = max(baseline["cpu_ms"] * CPU_FACTOR, baseline["cpu_ms"] + CPU_SLACK_MS)
+    if result["cpu_ms"] > cpu_budget:
+        problems.append(f"{name}: {result['cpu_ms']:.1f} ms CPU, budget {cpu_budget:.1f} ms")
+    return problems
+
+
+def _diff_calls(current, baseline):
+    changes = []
+    for key in sorted(set(current) | set(baseline)):
+        delta = current.get(key, 0) - baseline.get(key, 0)
+        if delta:
+            changes.append(f"{key} {delta:+d}")
+    return ", ".join(changes) or "same calls"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Earth Engine round-trip budgets for /geo endpoints")
+    parser.add_argument("--update-baseline", action="store_true", help="write the current results as the new baselines")
+    parser.add_argument("--only", help="run only the cases whose name contains this text")
+    parser.add_argument("--rtt-ms", type=float, default=400.0, help="round trip latency used to estimate Earth Engine time (parallel calls count once)")
+    parser.add_argument("--verbose", action="store_true", help="show the application output")
+    args = parser.parse_args(argv)
+
+    app = _load_app()
+    client = app.test_client()
+    fake_ee.LATENCY_S = BASE_LATENCY_S
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as fh:
+            baselines = json.load(fh).get("cases", {})
+
+    results, problems = {}, []
+    print(
+        f"{'case':<38} {'status':>6} {'trips':>6} {'nodes':>7} {'req kB':>7} "
+        f"{'cpu ms':>8} {'est. EE ms':>11}"
+    )
+    for case in CASES:
+        name = case["name"]
+        if args.only and args.only not in name:
+            continue
+        path = _prepare(case, client, verbose=args.verbose)
+        fake_ee.ERRORS[:] = case["errors"]
+        if case["concurrency"] > 1:
+            result = run_concurrent_case(
+                app, case["method"], path, case["kwargs"], case["concurrency"], verbose=args.verbose
+            )
+        else:
+            result = run_case(client, case["method"], path, case["kwargs"], verbose=args.verbose)
+        fake_ee.ERRORS.clear()
+        results[name] = result
+        baseline = baselines.get(name)
+        print(
+            f"{name:<38} {result['status']:>6} {result['round_trips']:>6} "
+            f"{result['graph_nodes']:>7} {result['request_bytes'] / 1024:>7.1f} {result['cpu_ms']:>8.1f} "
+            f"{result['sequential_trips'] * args.rtt_ms:>11.0f}"
+        )
+        if args.verbose:
+            print(f"   {result['by_call']}")
+        if not args.update_baseline:
+            problems.extend(check(name, result, baseline))
+            if baseline and result["round_trips"] < baseline["round_trips"]:
+                print(
+                    f"   {baseline['round_trips'] - result['round_trips']} round trips "
+                    f"below baseline, run with --update-baseline to lock it in"
+                )
+
+    if args.update_baseline:
+        merged = dict(baselines)
+        merged.update(results)
+        with open(BASELINE_PATH, "w") as fh:
+            json.dump({"cases": dict(sorted(merged.items()))}, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"Baselines written to {BASELINE_PATH}")
+        return 0
+
+    if problems:
+        print("\nOver budget:")
+        for problem in problems:
+            print(f"   {problem}")
+        return 1
+
+    print("\nAll endpoints within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# models/ScenarioModel.py
+#
+# Defines the scenario session models. A scenario remembers the features of a
+# multi-polygon simulation (geometry, parameters, content hash and computed
+# report), so an edit only re-simulates the features whose content changed.
+
+import datetime
+import uuid
+
+from . import db
+
+
+def _new_scenario_id():
+    return uuid.uuid4().hex
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class Scenario(db.Model):
+    """
+    A simulation session: the area and global parameters, plus the last global
+    KPIs and map URLs.
+    """
+    __tablename__ = "scenarios"
+
+    # Random id, safe to share in links
+    id = db.Column(db.String(32), primary_key=True, default=_new_scenario_id)
+
+    # Area of the global analysis
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    buffer = db.Column(db.Integer, nullable=False)
+
+    # Global parameters used when a feature does not set its own
+    settings = db.Column(db.JSON, nullable=False, default=dict)
+
+    # Results of the last run over all features
+    global_kpis = db.Column(db.JSON, nullable=True)
+    map_urls = db.Column(db.JSON, nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_utcnow)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow)
+
+    # Features in drawing order
+    features = db.relationship(
+        "ScenarioFeature",
+        backref="scenario",
+        lazy=True,
+        order_by="ScenarioFeature.position",
+        cascade="all, delete-orphan",
+    )
+
+    def to_dict(self):
+        return {
+            "scenario_id": self.id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "buffer": self.buffer,
+            "settings": self.settings,
+            "features": [feature.to_dict() for feature in self.features],
+            "global_kpis": self.global_kpis,
+            "map_urls": self.map_urls,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ScenarioFeature(db.Model):
+    """
+    One polygon of a scenario with its parameters and last computed report.
+    `content_hash` covers everything the report depends on.
+    """
+    __tablename__ = "scenario_features"
+
+    scenario_id = db.Column(
+        db.String(32), db.ForeignKey("scenarios.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Client-provided feature id (or a random one when it has none)
+    feature_id = db.Column(db.String(64), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    geometry = db.Column(db.JSON, nullable=False)
+    properties = db.Column(db.JSON, nullable=False, default=dict)
+    content_hash = db.Column(db.String(64), nullable=False)
+
+    # impact_report output and the inputs of the unified map for this feature
+    report = db.Column(db.JSON, nullable=True)
+    visualization = db.Column(db.JSON, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.feature_id,
+            "hash": self.content_hash,
+            "geometry": self.geometry,
+            "properties": self.properties,
+            "report": self.report,
+        }
@@ -0,0 +1,179 @@
+# models/StatsModel.py
+#
+# Defines the aggregate tables that keep message counts per tag, per location and
+# per grid cell and tag. They are maintained by the message write paths inside the
+# same transaction, so summaries can be read without scanning the messages table.
+
+import math
+
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import selectinload
+
+from . import db
+from .MessageModel import Message
+
+# Size of a grid cell in degrees (~1.1 km of latitude)
+GRID_CELL_DEG = 0.01
+
+# INSERT constructs with ON CONFLICT DO UPDATE, per dialect
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def grid_cell(latitude, longitude):
+    """
+    Return the (row, col) grid cell indexes for a coordinate.
+    """
+    return (
+        math.floor(latitude / GRID_CELL_DEG),
+        math.floor(longitude / GRID_CELL_DEG),
+    )
+
+
+class TagStat(db.Model):
+    """
+    Number of messages labeled with a tag.
+    """
+    __tablename__ = "message_tag_stats"
+
+    tag_id = db.Column(
+        db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True
+    )
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    tag = db.relationship("Tag")
+
+
+class LocationStat(db.Model):
+    """
+    Number of messages posted for a location string.
+    """
+    __tablename__ = "message_location_stats"
+
+    location = db.Column(db.String(256), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CellTagStat(db.Model):
+    """
+    Number of messages labeled with a tag inside a GRID_CELL_DEG grid cell.
+    """
+    __tablename__ = "message_cell_tag_stats"
+
+    cell_lat = db.Column(db.Integer, primary_key=True)
+    cell_lon = db.Column(db.Integer, primary_key=True)
+    tag_id = db.Column(
+        db.Integer, db.ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True
+    )
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    tag = db.relationship("Tag")
+
+
+class MessageStats:
+    """
+    Helpers to keep the aggregate tables in sync with the messages table.
+    None of them commit: callers add them to the transaction of the write.
+    """
+
+    @staticmethod
+    def snapshot(message):
+        """
+        Capture the fields of a message that the aggregates depend on.
+        """
+        return (
+            message.location,
+            grid_cell(message.latitude, message.longitude),
+            frozenset(tag.id for tag in message.tags if tag is not None),
+        )
+
+    @staticmethod
+    def record(message, delta):
+        """
+        Count a message in (delta=1) or out of (delta=-1) the aggregates.
+        """
+        MessageStats._apply(MessageStats.snapshot(message), delta)
+
+    @staticmethod
+    def record_change(before, after):
+        """
+        Move a message between aggregates after an update, given the snapshots
+        taken before and after the change.
+        """
+        if before == after:
+            return
+        MessageStats._apply(before, -1)
+        MessageStats._apply(after, 1)
+
+    @staticmethod
+    def _apply(snapshot, delta):
+        location, (cell_lat, cell_lon), tag_ids = snapshot
+
+        # Make sure tags added in this transaction have an id
+        db.session.flush()
+
+        MessageStats._bump(LocationStat, {"location": location}, delta)
+        for tag_id in tag_ids:
+            MessageStats._bump(TagStat, {"tag_id": tag_id}, delta)
+            MessageStats._bump(
+                CellTagStat,
+                {"cell_lat": cell_lat, "cell_lon": cell_lon, "tag_id": tag_id},
+                delta,
+            )
+
+    @staticmethod
+    def _bump(model, keys, delta):
+        if delta > 0:
+            MessageStats._increment(model, keys, delta)
+            return
+        query = model.query.filter_by(**keys)
+        query.update({model.count: model.count + delta}, synchronize_session=False)
+        query.filter(model.count <= 0).delete(synchronize_session=False)
+
+    @staticmethod
+    def _increment(model, keys, delta):
+        """
+        Insert the row or add to its count in one statement, so two writers
+        creating the same key cannot collide on the primary key.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect in _UPSERT_INSERTS:
+            statement = _UPSERT_INSERTS[dialect](model).values(**keys, count=delta)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keys), set_={"count": model.count + delta}
+            )
+        elif dialect in ("mysql", "mariadb"):
+            statement = mysql.insert(model).values(**keys, count=delta)
+            statement = statement.on_duplicate_key_update(count=model.count + delta)
+        else:
+            query = model.query.filter_by(**keys)
+            if not query.update({model.count: model.count + delta}, synchronize_session=False):
+                db.session.add(model(**keys, count=delta))
+            return
+        db.session.execute(statement)
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every aggregate from the messages table (e.g. after a bulk import
+        or when the tables are first created on an existing database).
+        """
+        for model in (TagStat, LocationStat, CellTagStat):
+            model.query.delete()
+
+        tags, locations, cells = {}, {}, {}
+        for message in Message.query.options(selectinload(Message.tags)).yield_per(1000):
+            location, cell, tag_ids = MessageStats.snapshot(message)
+            locations[location] = locations.get(location, 0) + 1
+            for tag_id in tag_ids:
+                tags[tag_id] = tags.get(tag_id, 0) + 1
+                cells[cell + (tag_id,)] = cells.get(cell + (tag_id,), 0) + 1
+
+        db.session.add_all(TagStat(tag_id=k, count=v) for k, v in tags.items())
+        db.session.add_all(
+            LocationStat(location=k, count=v) for k, v in locations.items()
+        )
+        db.session.add_all(
+            CellTagStat(cell_lat=k[0], cell_lon=k[1], tag_id=k[2], count=v)
+            for k, v in cells.items()
+        )
+        db.session.commit()
@@ -12,3 +12,5 @@ db = SQLAlchemy()
 from .MessageModel import Message, message_tags
 from .TagModel import Tag
 from .UserModel import User
+from .StatsModel import TagStat, LocationStat, CellTagStat, MessageStats, grid_cell
+from .ScenarioModel import Scenario, ScenarioFeature
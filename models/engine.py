@@ -0,0 +1,155 @@
+# models/engine.py
+#
+# Database engine profiles: connection pool settings for server databases, SQLite
+# pragmas for concurrent access from several workers, and per-statement timing
+# with a slow query threshold (also exported as /metrics counters).
+
+import logging
+import os
+import time
+from sqlite3 import Connection as SQLite3Connection
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from utils import metrics
+
+logger = logging.getLogger("greengrowth.sql")
+
+# Profiles selected with DB_PROFILE. Pool options only apply to server databases
+# (PostgreSQL, MySQL); pragmas only apply to SQLite connections.
+ENGINE_PROFILES = {
+    "development": {
+        "pool": {},
+        "sqlite_pragmas": {
+            "foreign_keys": "ON",
+        },
+        "slow_query_ms": 200,
+        "log_statements": False,
+    },
+    "production": {
+        "pool": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        },
+        "sqlite_pragmas": {
+            "foreign_keys": "ON",
+            # Readers no longer block the writer and vice versa
+            "journal_mode": "WAL",
+            # Safe with WAL, avoids an fsync per commit
+            "synchronous": "NORMAL",
+            # Wait for the write lock instead of failing with "database is locked"
+            "busy_timeout": 5000,
+            "mmap_size": 268435456,
+            "temp_store": "MEMORY",
+        },
+        "slow_query_ms": 500,
+        "log_statements": False,
+    },
+}
+
+
+def get_engine_profile(name=None):
+    """
+    Return the engine profile named by `name` (or DB_PROFILE), with the numeric
+    settings overridable from the environment.
+    """
+    name = name or os.getenv("DB_PROFILE", "development")
+    if name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown DB_PROFILE '{name}', expected one of {list(ENGINE_PROFILES)}"
+        )
+
+    profile = {
+        "name": name,
+        "pool": dict(ENGINE_PROFILES[name]["pool"]),
+        "sqlite_pragmas": dict(ENGINE_PROFILES[name]["sqlite_pragmas"]),
+        "slow_query_ms": ENGINE_PROFILES[name]["slow_query_ms"],
+        "log_statements": ENGINE_PROFILES[name]["log_statements"],
+    }
+
+    overrides = {
+        "DB_POOL_SIZE": ("pool", "pool_size"),
+        "DB_MAX_OVERFLOW": ("pool", "max_overflow"),
+        "DB_POOL_TIMEOUT": ("pool", "pool_timeout"),
+        "DB_BUSY_TIMEOUT_MS": ("sqlite_pragmas", "busy_timeout"),
+    }
+    for env_name, (section, key) in overrides.items():
+        if os.getenv(env_name):
+            profile[section][key] = int(os.getenv(env_name))
+
+    if os.getenv("DB_SLOW_QUERY_MS"):
+        profile["slow_query_ms"] = float(os.getenv("DB_SLOW_QUERY_MS"))
+    if os.getenv("DB_LOG_STATEMENTS"):
+        profile["log_statements"] = os.getenv("DB_LOG_STATEMENTS").lower() in ("1", "true", "yes")
+
+    return profile
+
+
+def configure_engine(app, db, profile=None):
+    """
+    Apply an engine profile to a Flask app. Must be called before db.init_app
+    (to set the pool options) and registers the connection and timing hooks
+    on the engine once it exists.
+    """
+    profile = profile or get_engine_profile()
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+
+    if url.get_backend_name() != "sqlite":
+        options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+        options.update(profile["pool"])
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    db.init_app(app)
+
+    with app.app_context():
+        _install_hooks(db.engine, profile)
+
+    app.config["DB_PROFILE"] = profile["name"]
+    return profile
+
+
+def _install_hooks(engine, profile):
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if profile["log_statements"] else logging.INFO)
+
+    pragmas = profile["sqlite_pragmas"]
+    slow_query_ms = profile["slow_query_ms"]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, SQLite3Connection):
+            cursor = dbapi_connection.cursor()
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+            cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()[1]) * 1000
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        metrics.DB_QUERIES.labels(operation=operation).inc()
+        metrics.DB_QUERY_SECONDS.labels(operation=operation).observe(elapsed_ms / 1000)
+        if elapsed_ms >= slow_query_ms:
+            logger.warning("Slow query (%.1f ms): %s", elapsed_ms, statement)
+        else:
+            logger.debug("Query (%.1f ms): %s", elapsed_ms, statement)
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(context):
+        # after_cursor_execute does not fire for a failed statement
+        started = context.connection.info.get("query_start") if context.connection else None
+        if started and started[-1][0] is context.execution_context:
+            started.pop()
+
+    logger.info("Database engine profile '%s' enabled", profile["name"])
@@ -1,7 +1,19 @@
 # routers/__init__.py
 #
-# This module imports and exposes all API blueprints for easy registration in the main app.
+# This module exposes all API blueprints for easy registration in the main app.
+# Blueprints are imported on first access so the app can time (and skip) each one.
 
-from .message_router import message_bp  # Blueprint for message-related routes
-from .user_router import user_bp      # Blueprint for user-related routes
-from .geo_router import geo_bp        # Blueprint for geospatial routes
+import importlib
+
+_BLUEPRINTS = {
+    "message_bp": ".message_router",  # Blueprint for message-related routes
+    "user_bp": ".user_router",        # Blueprint for user-related routes
+    "geo_bp": ".geo_router",          # Blueprint for geospatial routes
+}
+
+
+def __getattr__(name):
+    if name in _BLUEPRINTS:
+        module = importlib.import_module(_BLUEPRINTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,20 +2,23 @@
 #
 # This module defines the geospatial API endpoints for simulation and data retrieval.
 
-import matplotlib
-
-matplotlib.use("Agg")  # Use non-interactive backend for server environments
-
 from flask import Blueprint, jsonify, request
-import ee
 from dotenv import load_dotenv
 import os
-from utils import GeoAnalytics, get_wind_speed
-import numpy as np
+from utils.responses import retry_later_response
+from utils.limiter import EEOverloadedError
+from utils.startup import LazyModule
+from utils import bulkhead, cache, fanout, metrics
+from utils.facilities import co2e
+from utils.geometry import area_m2, centroid, geometry_hash, scenario_key
 import math
 import pickle
 import json
 from functools import lru_cache
+import datetime
+import hashlib
+import uuid
+from models import db, Scenario, ScenarioFeature
 
 
 # Load environment variables from .env file
@@ -23,9 +26,21 @@ load_dotenv()
 
 # Define the Blueprint for geospatial routes
 geo_bp = Blueprint("geo", __name__, url_prefix="/geo")
-
-GWP_CH4 = 25
-GWP_N2O = 298
+# Slow Earth Engine requests run in their own pool (utils/bulkhead.py)
+bulkhead.install(geo_bp, bulkhead.GEO)
+
+# Earth Engine and NumPy are only imported when a geo endpoint is first called,
+# so registering this blueprint does not slow down worker startup
+ee = LazyModule("ee")
+np = LazyModule("numpy")
+geo_utils = LazyModule("utils.geoprocessor")
+wind_utils = LazyModule("utils.wind")
+atlas_utils = LazyModule("utils.atlas")
+timeseries_utils = LazyModule("utils.timeseries")
+modifier_utils = LazyModule("utils.modifiers")
+optimizer_utils = LazyModule("utils.optimizer")
+facilities_utils = LazyModule("utils.facilities")
+dispersion_utils = LazyModule("utils.dispersion")
 
 industries = {
     "Stationary Combustion": 0,
@@ -79,7 +94,7 @@ industries = {
 
 # Model loading: use a cached loader and a safe path
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "ML_Models")
+MODEL_DIR = os.getenv("ML_MODELS_DIR", os.path.join(BASE_DIR, "ML_Models"))
 
 
 @lru_cache(maxsize=4)
@@ -91,6 +106,81 @@ def load_model_cached(filename: str):
     except Exception:
         return None
 
+
+metrics.observe_lru_cache("ml_models", load_model_cached)
+
+
+def _emission_source(geojson_geom, emissions, latitude, longitude):
+    """
+    (latitude, longitude, tCO2e per year) of an industrial polygon: its
+    centroid, or the analysis point when it has none.
+    """
+    point = centroid(geojson_geom) if isinstance(geojson_geom, dict) else None
+    lon, lat = point or (longitude, latitude)
+    return [lat, lon, emissions]
+
+
+def _industry_delta_lst(prediction):
+    """
+    ΔLST applied by the industrial preset for a prediction of the industry
+    model: whole degrees, the same on every endpoint.
+    """
+    return int(prediction)
+
+
+def _industrial_report(geometry, latitude, longitude, buffer, emissions, prediction, buffer_m=None):
+    """
+    Full industrial simulation of one facility: the ΔLST predicted by the
+    industry model and the dispersed plume of its emissions. Returns the
+    analyzer and its report.
+    """
+    # The AQ delta is the dispersed plume of the facility, in and around the polygon
+    plume = _industrial_plume(
+        [_emission_source(geometry, emissions, latitude, longitude)],
+        latitude,
+        longitude,
+        half_size_m=buffer,
+    )
+    geoanalytics = geo_utils.GeoAnalytics(
+        latitude=latitude,
+        longitude=longitude,
+        buffer=buffer,
+        temp_industry=_industry_delta_lst(prediction),
+        plume=plume,
+    )
+    report = geoanalytics.impact_report(
+        geojson_area=geometry,
+        preset="industrial",
+        buffer_m=buffer_m,
+        calibrate=True,
+    )
+    return geoanalytics, report
+
+
+def _industrial_plume(sources, latitude, longitude, center=None, half_size_m=None):
+    """
+    Gaussian plume of industrial sources in the mean wind at the analysis
+    point (utils/dispersion.py). None without emissions or wind data.
+    """
+    sources = [s for s in sources if s and s[2] > 0]
+    if not sources:
+        return None
+    try:
+        u, v = wind_utils.get_wind_components(latitude, longitude)
+    except EEOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Warning: wind components unavailable, no plume: {e}")
+        return None
+    return dispersion_utils.field(
+        sources,
+        u,
+        v,
+        center=center or (latitude, longitude),
+        half_size_m=half_size_m or dispersion_utils.DEFAULT_HALF_SIZE_M,
+    )
+
+
 # Endpoint: /geo/simulate
 # Simulates an environmental impact report for a given location and parameters
 @geo_bp.post("/simulate")
@@ -125,12 +215,47 @@ def get_simulation_report():
         agua = data.get("agua", False)
         copa = data.get("copa", 0)
 
+        # Repeated scenarios (retries, shared links) are answered from the
+        # result cache, keyed by the canonical geometry and the inputs
+        attributes = {
+            "industries_used": industries_used, "co2": co2, "ch4": ch4, "n2o": n2o,
+            "densidad": densidad, "trafico": trafico, "albedo": albedo,
+            "arboles": arboles, "pasto": pasto, "agua": agua, "copa": copa,
+        }
+        scenario_cache = cache.get_cache() if isinstance(geometry, dict) else None
+        if scenario_cache is not None:
+            cache_key = scenario_key(
+                "simulate",
+                geometry,
+                preset=preset,
+                latitude=latitude,
+                longitude=longitude,
+                buffer=buffer,
+                attributes={k: attributes[k] for k in _PRESET_PARAMS.get(preset, ())},
+            )
+            cached = scenario_cache.get(cache_key, cache="scenarios")
+            if cached:
+                return (
+                    jsonify(
+                        {
+                            "status": "success",
+                            "message": "Simulation completed successfully",
+                            "payload": cached,
+                        }
+                    ),
+                    201,
+                )
+
         report = None
 
         if preset == "industrial":
-            reported_emissions = co2 + (ch4 * GWP_CH4) + (n2o * GWP_N2O)
+            model = load_model_cached("industry_model.pkl")
+            if model is None:
+                return jsonify({"status": "error", "message": "Industry model not available", "payload": None}), 500
+
+            reported_emissions = co2e(co2, ch4, n2o)
             industries_vector = [0] * len(industries)
-            wind_speeds = get_wind_speed(lat=latitude, lon=longitude)
+            wind_speeds = wind_utils.get_wind_speed(lat=latitude, lon=longitude)
             if industries_used:
                 for i in industries_used:
                     if i in industries:
@@ -149,25 +274,8 @@ def get_simulation_report():
             ]
 
             x = np.array([data_to_predict], dtype=float)
-            
-
-            with open('\ML_Models\industry_model.pkl', 'rb') as file: 
-                model = pickle.load(file)
-            
-            temp = int(model.predict(x))
-
-            geoanalytics = GeoAnalytics(
-                latitude=latitude,
-                longitude=longitude,
-                buffer=buffer,
-                temp_industry=temp,
-                aq_industry=reported_emissions,
-            )
-            report = geoanalytics.impact_report(
-                geojson_area=geometry,
-                preset="industrial",
-                buffer_m=buffer,
-                calibrate=True,
+            geoanalytics, report = _industrial_report(
+                geometry, latitude, longitude, buffer, reported_emissions, model.predict(x)[0], buffer_m=buffer
             )
         elif preset == "green_real":
             attrs_green = {
@@ -176,7 +284,7 @@ def get_simulation_report():
                 "agua": agua,
                 "copa": {"value": copa, "unit": "pct"},
             }
-            geoanalytics = GeoAnalytics(
+            geoanalytics = geo_utils.GeoAnalytics(
                 latitude=latitude,
                 longitude=longitude,
                 buffer=buffer,
@@ -194,7 +302,7 @@ def get_simulation_report():
                 "trafico": {"value": trafico, "unit": "veh_day"},
                 "albedo": {"value": albedo, "unit": "albedo_0_1"},
             }
-            geoanalytics = GeoAnalytics(
+            geoanalytics = geo_utils.GeoAnalytics(
                 latitude=latitude,
                 longitude=longitude,
                 buffer=buffer,
@@ -224,12 +332,11 @@ def get_simulation_report():
         sim_ndvi_url = None
         sim_aq_url = None
         try:
-            if 'geoanalytics' in locals() and getattr(geoanalytics, 'sim_temp', None) is not None:
-                sim_temp_url = geoanalytics.get_tile_url(geoanalytics.sim_temp, geoanalytics.temp_vis_params)
-            if 'geoanalytics' in locals() and getattr(geoanalytics, 'sim_ndvi', None) is not None:
-                sim_ndvi_url = geoanalytics.get_tile_url(geoanalytics.sim_ndvi, geoanalytics.ndvi_vis_params)
-            if 'geoanalytics' in locals() and getattr(geoanalytics, 'sim_aq', None) is not None:
-                sim_aq_url = geoanalytics.get_tile_url(geoanalytics.sim_aq, geoanalytics.aq_vis_params)
+            if 'geoanalytics' in locals():
+                urls = geoanalytics.sim_tile_urls()
+                sim_temp_url, sim_ndvi_url, sim_aq_url = urls["sim_temp_url"], urls["sim_ndvi_url"], urls["sim_aq_url"]
+        except EEOverloadedError:
+            raise
         except Exception as e:
             print('Warning: failed to generate sim tile URLs in simulate_polygon:', e)
 
@@ -239,6 +346,9 @@ def get_simulation_report():
             'sim_ndvi_url': sim_ndvi_url,
             'sim_aq_url': sim_aq_url,
         }
+        # Tile URLs expire on the Earth Engine side, so the entry does too
+        if scenario_cache is not None and all((sim_temp_url, sim_ndvi_url, sim_aq_url)):
+            scenario_cache.set(cache_key, payload, cache.MAP_ID_TTL_S)
 
         return (
             jsonify(
@@ -251,6 +361,8 @@ def get_simulation_report():
             201,
         )
 
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
     except Exception as e:
         return (
             jsonify(
@@ -294,7 +406,7 @@ def get_initial_data(layer_name):
         buffer = int(buffer_str)
 
         # Create a GeoAnalytics instance
-        analyzer = GeoAnalytics(latitude=latitude, longitude=longitude, buffer=buffer)
+        analyzer = geo_utils.GeoAnalytics(latitude=latitude, longitude=longitude, buffer=buffer)
 
         # Map layer names to their corresponding images and visualization parameters
         layer_map = {
@@ -329,6 +441,8 @@ def get_initial_data(layer_name):
             404,
         )
 
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
     except Exception as e:
         return (
             jsonify(
@@ -342,6 +456,40 @@ def get_initial_data(layer_name):
         )
 
 
+# Endpoint: /geo/get-kpis
+# Retrieves the heat, NDVI and AQ KPIs of an area in one Earth Engine round trip
+@geo_bp.get("/get-kpis")
+def get_all_kpis():
+    data = request.args
+    try:
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        buffer = data.get("buffer")
+        if not latitude or not longitude or not buffer:
+            return jsonify({"status": "error", "message": "Missing params", "payload": None}), 400
+
+        analyzer = geo_utils.GeoAnalytics(
+            latitude=float(latitude),
+            longitude=float(longitude),
+            buffer=int(buffer)
+        )
+
+        kpis = analyzer.get_all_kpis()
+        if kpis is None:
+            return jsonify({"status": "error", "message": "Failed to calculate KPIs", "payload": None}), 500
+
+        return jsonify({
+            "status": "success",
+            "message": "KPIs calculated successfully",
+            "payload": kpis
+        }), 200
+
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
 #Valid layer names are "heat", "NDVI", "AQ" respectively for avg_heat, avg_NVDI and avg_AQ. 
 @geo_bp.get("/get-kpis/<layer_name>")
 def getKpis(layer_name):
@@ -354,7 +502,7 @@ def getKpis(layer_name):
         if not latitude or not longitude or not buffer: 
             return jsonify({"status": "error", "message": "Missing params"}), 400      
 
-        analyzer = GeoAnalytics(
+        analyzer = geo_utils.GeoAnalytics(
             latitude=float(latitude), 
             longitude=float(longitude), 
             buffer=int(buffer)
@@ -370,9 +518,371 @@ def getKpis(layer_name):
             "payload": kpis
         }), 200
 
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500 
 
+# Endpoint: /geo/timeseries
+# Monthly means of one layer ("heat", "NDVI" or "AQ") between two months
+# (from/to as YYYY-MM). Finished months are served from the cache once computed.
+@geo_bp.get("/timeseries")
+def get_timeseries():
+    data = request.args
+    try:
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        buffer = data.get("buffer")
+        layer = data.get("layer")
+        if not latitude or not longitude or not buffer or not data.get("from") or not data.get("to"):
+            return jsonify({"status": "error", "message": "Missing params", "payload": None}), 400
+        if layer not in timeseries_utils.LAYERS:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid layer, expected one of {', '.join(timeseries_utils.LAYERS)}",
+                "payload": None
+            }), 400
+
+        try:
+            start = timeseries_utils.parse_month(data.get("from"))
+            end = timeseries_utils.parse_month(data.get("to"))
+        except ValueError:
+            return jsonify({"status": "error", "message": "from/to must be YYYY-MM", "payload": None}), 400
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        if months < 1 or months > timeseries_utils.MAX_MONTHS:
+            return jsonify({
+                "status": "error",
+                "message": f"from/to must span 1 to {timeseries_utils.MAX_MONTHS} months",
+                "payload": None
+            }), 400
+
+        analyzer = geo_utils.GeoAnalytics(
+            latitude=float(latitude),
+            longitude=float(longitude),
+            buffer=int(buffer)
+        )
+        series = timeseries_utils.monthly_series(analyzer, layer, start, end)
+
+        return jsonify({
+            "status": "success",
+            "message": "Time series calculated successfully",
+            "payload": {"layer": layer, "series": series}
+        }), 200
+
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+def _list_arg(data, name):
+    value = data.get(name)
+    return [v for v in value.split(",") if v.strip()] if value else None
+
+
+def _float_arg(data, name):
+    value = data.get(name)
+    return float(value) if value not in (None, "") else None
+
+
+# Endpoint: /geo/facilities
+# GHGRP facilities filtered by bbox (min_lon,min_lat,max_lon,max_lat) or
+# distance (latitude, longitude, radius_km), industry subparts, sectors, states
+# and CO2e range, with CO2e by sector and the top emitters. Served from the
+# in-memory columnar table (utils/facilities.py), no Earth Engine calls.
+@geo_bp.get("/facilities")
+def get_facilities():
+    data = request.args
+    try:
+        try:
+            bbox = _list_arg(data, "bbox")
+            if bbox is not None:
+                bbox = tuple(float(v) for v in bbox)
+                if len(bbox) != 4:
+                    raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+            near = None
+            if data.get("latitude") and data.get("longitude"):
+                near = (float(data["latitude"]), float(data["longitude"]), float(data.get("radius_km", 50)))
+            filters = {
+                "bbox": bbox,
+                "near": near,
+                "subparts": _list_arg(data, "subparts"),
+                "sectors": _list_arg(data, "sectors"),
+                "states": _list_arg(data, "states"),
+                "min_co2e": _float_arg(data, "min_co2e"),
+                "max_co2e": _float_arg(data, "max_co2e"),
+            }
+            limit = min(max(0, int(data.get("limit", 100))), facilities_utils.MAX_LIMIT)
+            top = min(max(0, int(data.get("top", 10))), facilities_utils.MAX_LIMIT)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": f"Invalid params: {e}", "payload": None}), 400
+
+        result = facilities_utils.get_table().query(limit=limit, top=top, **filters)
+        return jsonify({
+            "status": "success",
+            "message": "Facilities retrieved successfully",
+            "payload": result
+        }), 200
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Site screening limits: candidate rows per request, full simulations of the best ones
+MAX_SCREEN_SITES = 10000
+MAX_SCREEN_SIMULATIONS = 10
+
+
+def _screen_rows(sites):
+    """
+    Feature matrix of candidate sites for the industry model (latitude,
+    longitude, CO2e, industry flags; winds are appended later). Raises
+    ValueError on malformed rows.
+    """
+    rows = np.zeros((len(sites), 3 + len(industries)))
+    unknown = set()
+    for n, site in enumerate(sites):
+        if not isinstance(site, dict) or site.get("latitude") is None or site.get("longitude") is None:
+            raise ValueError(f"site {n} needs latitude and longitude")
+        emissions = site.get("emissions")
+        if emissions is None:
+            emissions = co2e(site.get("co2", 0), site.get("ch4", 0), site.get("n2o", 0))
+        rows[n, :3] = float(site["latitude"]), float(site["longitude"]), float(emissions)
+        for name in site.get("industries_used") or []:
+            if name in industries:
+                rows[n, 3 + industries[name]] = 1
+            else:
+                unknown.add(name)
+    if unknown:
+        print(f"Warning: Unknown industries ignored: {sorted(unknown)}")
+    return rows
+
+
+# Endpoint: /geo/screen-sites
+# Ranks candidate industrial sites by the industry model's predicted ΔLST: the
+# wind features of every site come from one bulk reduction and the model runs
+# once on the whole matrix. "simulate": true runs the full industrial
+# simulation for the best `top_k` sites.
+@geo_bp.post("/screen-sites")
+def screen_sites():
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("sites"), list) or not data["sites"]:
+        return jsonify({"status": "error", "message": "Missing sites", "payload": None}), 400
+
+    try:
+        sites = data["sites"]
+        if len(sites) > MAX_SCREEN_SITES:
+            return jsonify({
+                "status": "error",
+                "message": f"At most {MAX_SCREEN_SITES} sites per request",
+                "payload": None
+            }), 400
+        try:
+            rows = _screen_rows(sites)
+            top_k = max(0, int(data.get("top_k", 10)))
+            buffer = int(data.get("buffer", 5000))
+            site_radius = float(data.get("site_radius_m", 500))
+        except (TypeError, ValueError) as e:
+            return jsonify({"status": "error", "message": f"Invalid params: {e}", "payload": None}), 400
+
+        model = load_model_cached("industry_model.pkl")
+        if model is None:
+            return jsonify({"status": "error", "message": "Industry model not available", "payload": None}), 500
+
+        winds = np.asarray(wind_utils.get_wind_speeds_bulk(rows[:, :2].tolist()), dtype=float)
+        predicted = np.asarray(model.predict(np.column_stack([rows, winds])), dtype=float).reshape(-1)
+
+        # Least warming first
+        order = np.argsort(predicted, kind="stable")
+        ranked = [
+            {
+                "rank": rank + 1,
+                "index": int(i),
+                "id": sites[i].get("id"),
+                "latitude": float(rows[i, 0]),
+                "longitude": float(rows[i, 1]),
+                "emissions": float(rows[i, 2]),
+                "wind_speeds": winds[i].tolist(),
+                "predicted_delta_lst": round(float(predicted[i]), 3),
+            }
+            for rank, i in enumerate(order)
+        ]
+
+        if data.get("simulate"):
+            best = ranked[: min(top_k, MAX_SCREEN_SIMULATIONS)]
+
+            def simulate_site(site):
+                point = {"type": "Point", "coordinates": [site["longitude"], site["latitude"]]}
+                _, report = _industrial_report(
+                    point, site["latitude"], site["longitude"], buffer,
+                    site["emissions"], predicted[site["index"]], buffer_m=site_radius,
+                )
+                return report
+
+            # Sites are independent simulations: run in parallel
+            reports = fanout.run(lambda site=site: simulate_site(site) for site in best)
+            for site, report in zip(best, reports):
+                if isinstance(report, Exception):
+                    print(f"Warning: simulation of site {site['index']} failed: {report}")
+                    report = None
+                site["report"] = report
+
+        return jsonify({
+            "status": "success",
+            "message": "Sites screened successfully",
+            "payload": {
+                "count": len(ranked),
+                "sites": ranked,
+            }
+        }), 200
+
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: /geo/sweep
+# Modeled NDVI/LST/AQ modifiers of a preset over a grid of attribute values
+# (e.g. densidad x trafico x albedo), computed locally in one request
+@geo_bp.post("/sweep")
+def sweep_modifiers():
+    data = request.get_json()
+    if not data or not isinstance(data.get("axes"), dict):
+        return jsonify({"status": "error", "message": "Missing axes", "payload": None}), 400
+
+    try:
+        surface = modifier_utils.sweep(data.get("preset"), data["axes"], units=data.get("units"))
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+    return jsonify({
+        "status": "success",
+        "message": "Sweep calculated successfully",
+        "payload": {"preset": data.get("preset"), **surface}
+    }), 200
+
+
+# Endpoint: /geo/optimize-green
+# Pareto front of green_real designs (arboles, pasto, copa, agua) by cost vs
+# modeled ΔLST/ΔAQ for a drawn area, optionally within a budget. The search is
+# local (utils/optimizer.py); "validate": true runs the full simulation for the
+# best design.
+@geo_bp.post("/optimize-green")
+def optimize_green():
+    data = request.get_json()
+    if not data:
+        return jsonify({"status": "error", "message": "Request body empty", "payload": None}), 400
+
+    try:
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        buffer = data.get("buffer", 5000)
+        geometry = data.get("geometry")
+        if latitude is None or longitude is None or not isinstance(geometry, dict):
+            return jsonify({"status": "error", "message": "Missing params", "payload": None}), 400
+
+        area_ha = area_m2(geometry) / 10000.0
+        if area_ha <= 0:
+            return jsonify({"status": "error", "message": "Geometry must be a polygon", "payload": None}), 400
+
+        analyzer = geo_utils.GeoAnalytics(latitude=latitude, longitude=longitude, buffer=buffer)
+        slopes = analyzer.simple_slopes()
+        slopes_source = "fitted" if slopes else "default"
+        slopes = slopes or optimizer_utils.DEFAULT_SLOPES
+
+        result = optimizer_utils.optimize(
+            area_ha, slopes, costs=data.get("costs"), budget=data.get("budget")
+        )
+
+        validation = None
+        best = result["best"]
+        if data.get("validate") and best:
+            attrs_green = {
+                "arboles": {"value": best["arboles"], "unit": "trees_per_ha"},
+                "pasto": {"value": best["pasto"], "unit": "pct"},
+                "agua": best["agua"],
+                "copa": {"value": best["copa"], "unit": "pct"},
+            }
+            validation = analyzer.impact_report(
+                geojson_area=geometry,
+                preset=("green_real", attrs_green),
+                buffer_m=1000,
+                calibrate=False,
+            )
+
+        return jsonify({
+            "status": "success",
+            "message": "Optimization completed successfully",
+            "payload": {
+                **result,
+                "area_ha": round(area_ha, 4),
+                "slopes": {**slopes, "source": slopes_source},
+                "validation": validation,
+            }
+        }), 200
+
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: /geo/area-kpis
+# Heat, NDVI and AQ means of a drawn area. Answered from the precomputed atlas
+# (utils/atlas.py) when one covers the area; "precise": true, or an area outside
+# every atlas, uses an exact Earth Engine reduction (needs latitude, longitude
+# and buffer of the analysis region).
+@geo_bp.post("/area-kpis")
+def get_area_kpis():
+    data = request.get_json()
+    if not data or not isinstance(data.get("geometry"), dict):
+        return jsonify({"status": "error", "message": "Missing geometry", "payload": None}), 400
+
+    try:
+        geometry = data["geometry"]
+        if not data.get("precise"):
+            kpis = atlas_utils.area_kpis(geometry)
+            if kpis is not None:
+                return jsonify({
+                    "status": "success",
+                    "message": "KPIs calculated successfully",
+                    "payload": kpis
+                }), 200
+
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        buffer = data.get("buffer")
+        if latitude is None or longitude is None or buffer is None:
+            return jsonify({
+                "status": "error",
+                "message": "No atlas covers this area: latitude, longitude and buffer are required",
+                "payload": None
+            }), 400
+
+        analyzer = geo_utils.GeoAnalytics(
+            latitude=float(latitude),
+            longitude=float(longitude),
+            buffer=int(buffer)
+        )
+        kpis = analyzer.get_area_kpis(geometry)
+        if kpis is None:
+            return jsonify({"status": "error", "message": "Failed to calculate KPIs", "payload": None}), 500
+
+        return jsonify({
+            "status": "success",
+            "message": "KPIs calculated successfully",
+            "payload": {**kpis, "source": "earth_engine"}
+        }), 200
+
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
 # Endpoint: /geo/simulate-tiles
 # Simulates and returns tile URLs for different environmental layers
 @geo_bp.post("/simulate-tiles")
@@ -407,7 +917,7 @@ def get_simulation_tiles():
         )  # NOTE: This may need to be parsed as geojson or WKT
 
         # Create a GeoAnalytics instance
-        geoprocessor = GeoAnalytics(
+        geoprocessor = geo_utils.GeoAnalytics(
             latitude=latitude,
             longitude=longitude,
             buffer=buffer,
@@ -419,19 +929,14 @@ def get_simulation_tiles():
         try:
             geojson_multi = {"type": "MultiPolygon", "coordinates": geometry}
             geoprocessor.impact_report(geojson_area=geojson_multi, preset=preset or "residential", buffer_m=buffer, calibrate=False)
+        except EEOverloadedError:
+            raise
         except Exception:
             pass
 
         # Use sim_* images produced by impact_report
-        temp_url = None
-        ndvi_url = None
-        aq_url = None
-        if getattr(geoprocessor, "sim_temp", None) is not None:
-            temp_url = geoprocessor.get_tile_url(geoprocessor.sim_temp, geoprocessor.temp_vis_params)
-        if getattr(geoprocessor, "sim_ndvi", None) is not None:
-            ndvi_url = geoprocessor.get_tile_url(geoprocessor.sim_ndvi, geoprocessor.ndvi_vis_params)
-        if getattr(geoprocessor, "sim_aq", None) is not None:
-            aq_url = geoprocessor.get_tile_url(geoprocessor.sim_aq, geoprocessor.aq_vis_params)
+        urls = geoprocessor.sim_tile_urls()
+        temp_url, ndvi_url, aq_url = urls["sim_temp_url"], urls["sim_ndvi_url"], urls["sim_aq_url"]
         # Return URLs for simulated environmental layers (may be None if generation failed)
         return (
             jsonify(
@@ -447,6 +952,8 @@ def get_simulation_tiles():
             ),
             201,
         )
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
     except Exception as e:
         return (
             jsonify(
@@ -460,6 +967,210 @@ def get_simulation_tiles():
         )
     
 
+# --- Multi-polygon simulation helpers (shared by simulate-polygons and scenarios) ---
+
+def _batch_settings(data):
+    """
+    Area and global (fallback) parameters of a multi-polygon simulation.
+    """
+    return {
+        "latitude": data.get("latitude", 0),
+        "longitude": data.get("longitude", 0),
+        "buffer": data.get("buffer", 5000),
+        # Datos globales (fallback)
+        "preset": data.get("preset"),
+        "co2": data.get("co2", 0),
+        "ch4": data.get("ch4", 0),
+        "n2o": data.get("n2o", 0),
+        "industries_used": data.get("industries_used", []),
+        # Diccionario de atributos globales aplanado
+        "densidad": data.get("densidad", 0),
+        "trafico": data.get("trafico", 0),
+        "albedo": data.get("albedo", 0),
+        "arboles": data.get("arboles", 0),
+        "pasto": data.get("pasto", 0),
+        "agua": data.get("agua", False),
+        "copa": data.get("copa", 0),
+    }
+
+
+def _split_feature(geom):
+    """
+    Normalización GeoJSON/Feature: returns (geometry, properties).
+    """
+    if geom.get("type") == "Feature":
+        return geom.get("geometry"), geom.get("properties") or {}
+    return geom, geom
+
+
+# Parameters each preset reads (from the feature, else from the global settings)
+_PRESET_PARAMS = {
+    "industrial": ("co2", "ch4", "n2o", "industries_used"),
+    "residential_real": ("densidad", "trafico", "albedo"),
+    "green_real": ("arboles", "pasto", "copa", "agua"),
+}
+
+
+def _feature_params(props, settings):
+    """
+    Effective simulation parameters of a feature, or None when it has no preset.
+    """
+    preset = props.get("preset", settings["preset"])
+    if not preset:
+        return None
+    params = {"preset": preset}
+    for key in _PRESET_PARAMS.get(preset, ()):
+        params[key] = props.get(key, settings[key])
+    return params
+
+
+def _feature_hash(geojson_geom, params, settings):
+    """
+    Hash of everything a feature report depends on: geometry, parameters, the
+    analysis point and the day (base layers roll over daily).
+    """
+    content = {
+        "geometry": geometry_hash(geojson_geom),
+        "params": params,
+        "latitude": settings["latitude"],
+        "longitude": settings["longitude"],
+        "day": datetime.date.today().isoformat(),
+    }
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _simulate_feature(geojson_geom, params, settings, industry_model):
+    """
+    Simulate one polygon. Returns its impact report and the inputs of the
+    unified map (geometry, LST/AQ deltas, NDVI target).
+    """
+    latitude, longitude = settings["latitude"], settings["longitude"]
+    local_preset = params["preset"]
+
+    scenario_cache = cache.get_cache()
+    if scenario_cache is not None:
+        cache_key = scenario_key("feature", geojson_geom, latitude=latitude, longitude=longitude, **params)
+        cached = scenario_cache.get(cache_key, cache="scenarios")
+        if cached:
+            return cached["report"], {**cached["visualization"], "geometry": geojson_geom}
+
+    local_temp_delta = 0
+    local_aq_delta = 0
+    local_source = None
+    local_plume = None
+    target_ndvi_val = 0.1
+
+    # A) INDUSTRIAL
+    if local_preset == "industrial":
+        local_emissions = co2e(params["co2"], params["ch4"], params["n2o"])
+        # The AQ delta is the facility's plume (the unified map disperses every source at once)
+        local_source = _emission_source(geojson_geom, local_emissions, latitude, longitude)
+        local_plume = _industrial_plume(
+            [local_source], latitude, longitude, center=(local_source[0], local_source[1])
+        )
+
+        if industry_model:
+            inds_vec = [0] * len(industries)
+            for i in params["industries_used"]:
+                if i in industries: inds_vec[industries[i]] = 1
+            wind = wind_utils.get_wind_speed(latitude, longitude)
+            x_input = [latitude, longitude, local_emissions] + inds_vec + list(wind)
+            try:
+                pred = industry_model.predict(np.array([x_input], dtype=float))
+                local_temp_delta = _industry_delta_lst(pred[0] if hasattr(pred, '__len__') else pred)
+            except Exception as e:
+                print(f"ML Error: {e}")
+
+        target_ndvi_val = 0.15
+
+    # B) RESIDENCIAL
+    elif local_preset == "residential_real":
+        local_temp_delta = 2
+        target_ndvi_val = 0.3
+
+    # C) VERDE
+    elif local_preset == "green_real":
+        local_temp_delta = -2
+        target_ndvi_val = 0.65
+
+    # --- Preparación del Argumento Preset (CORREGIDO: Unidades Explícitas) ---
+    local_analyzer = geo_utils.GeoAnalytics(
+        latitude=latitude, longitude=longitude, buffer=1000, plume=local_plume
+    )
+
+    preset_arg = local_preset
+
+    if local_preset == "residential_real":
+        # Mapeo explícito de unidades requeridas por _GA_CFG
+        attrs = {
+            "densidad": {"value": params["densidad"], "unit": "buildings_per_km2"},
+            "trafico":  {"value": params["trafico"],  "unit": "veh_day"},
+            "albedo":   {"value": params["albedo"],   "unit": "albedo_0_1"}
+        }
+        preset_arg = (local_preset, attrs)
+
+    elif local_preset == "green_real":
+        # Mapeo explícito de unidades requeridas por _GA_CFG
+        attrs = {
+            "arboles": {"value": params["arboles"], "unit": "trees_per_ha"},
+            "pasto":   {"value": params["pasto"],   "unit": "pct"},
+            "copa":    {"value": params["copa"],    "unit": "pct"},
+            "agua":    params["agua"]  # Agua es booleano directo, no dict
+        }
+        preset_arg = (local_preset, attrs)
+
+    # Calculamos reporte
+    report = local_analyzer.impact_report(geojson_geom, preset=preset_arg, calibrate=False)
+
+    visualization = {
+        "geometry": geojson_geom,
+        "lst_extra": local_temp_delta,
+        "aq_extra": local_aq_delta,
+        "ndvi_target": target_ndvi_val,
+        "source": local_source,
+    }
+    if scenario_cache is not None and report:
+        scenario_cache.set(cache_key, {"report": report, "visualization": visualization})
+    return report, visualization
+
+
+def _unified_kpis(global_analyzer, visualizations):
+    """
+    Build the unified simulated layers from every feature and reduce them over
+    the global area.
+    """
+    # --- 4. Generación de Mapa Unificado ---
+    print("🗺️ Generating unified batch visualization...")
+    # Every industrial polygon is a source of one plume over the global area
+    plume = _industrial_plume(
+        [item.get("source") for item in visualizations],
+        global_analyzer.latitude,
+        global_analyzer.longitude,
+        half_size_m=global_analyzer.buffer,
+    )
+    # The unified layers are reduced at 100 m at the finest (get_kpis_post_sim)
+    global_analyzer.sim_batch_visualization([
+        {**item, "geometry": global_analyzer._geojson_to_ee_geom(item["geometry"], 100)}
+        for item in visualizations
+    ], plume=plume)
+    return global_analyzer.get_kpis_post_sim()
+
+
+def _unified_map_urls(global_analyzer):
+    map_urls = {
+        "sim_temp_url": None, "sim_ndvi_url": None, "sim_aq_url": None
+    }
+    try:
+        map_urls = global_analyzer.sim_tile_urls()
+    except EEOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Tile Generation Error: {e}")
+    return map_urls
+
+
 # Endpoint: /geo/simulate-polygon
 # Simulates environmental impact for a given polygon area
 @geo_bp.post("/simulate-polygons")
@@ -472,158 +1183,54 @@ def simulate_polygons():
 
     try:
         # --- 1. Extracción de Datos Generales ---
-        latitude = data.get("latitude", 0)
-        longitude = data.get("longitude", 0)
-        buffer = data.get("buffer", 5000) 
-        
+        settings = _batch_settings(data)
+
         geometries = data.get("geometries") or ([data.get("geometry")] if data.get("geometry") else [])
-        
+
         if not geometries:
             return jsonify({"status": "error", "message": "No geometries provided"}), 400
 
-        # Datos globales (fallback)
-        global_preset = data.get("preset")
-        global_co2 = data.get("co2", 0)
-        global_ch4 = data.get("ch4", 0)
-        global_n2o = data.get("n2o", 0)
-        global_industries = data.get("industries_used", [])
-        
-        # Diccionario de atributos globales aplanado
-        global_vals = {
-            "densidad": data.get("densidad", 0),
-            "trafico": data.get("trafico", 0),
-            "albedo": data.get("albedo", 0),
-            "arboles": data.get("arboles", 0),
-            "pasto": data.get("pasto", 0),
-            "agua": data.get("agua", False),
-            "copa": data.get("copa", 0)
-        }
-
         # --- 2. Inicializar Analizador GLOBAL ---
-        global_analyzer = GeoAnalytics(latitude=latitude, longitude=longitude, buffer=buffer)
-        
-        individual_reports = []
+        global_analyzer = geo_utils.GeoAnalytics(
+            latitude=settings["latitude"], longitude=settings["longitude"], buffer=settings["buffer"]
+        )
+
         batch_visualization_data = []
-        
+
         industry_model = load_model_cached('industry_model.pkl')
 
         # --- 3. Bucle de Cálculo ---
-        for geom in geometries:
-            # Normalización GeoJSON/Feature
-            geojson_geom = geom.get("geometry") if geom.get("type") == "Feature" else geom
-            props = geom.get("properties", {}) if geom.get("type") == "Feature" else geom
-            
-            local_preset = props.get("preset", global_preset)
-            if not local_preset:
-                continue 
-
-            local_temp_delta = 0
-            local_aq_delta = 0
-            target_ndvi_val = 0.1 
-
-            # A) INDUSTRIAL
-            if local_preset == "industrial":
-                l_co2 = props.get("co2", global_co2)
-                l_ch4 = props.get("ch4", global_ch4)
-                l_n2o = props.get("n2o", global_n2o)
-                l_inds = props.get("industries_used", global_industries)
-                
-                local_emissions = l_co2 + (l_ch4 * GWP_CH4) + (l_n2o * GWP_N2O)
-                local_aq_delta = local_emissions 
-
-                if industry_model:
-                    inds_vec = [0] * len(industries)
-                    for i in l_inds:
-                        if i in industries: inds_vec[industries[i]] = 1
-                    wind = get_wind_speed(latitude, longitude)
-                    x_input = [latitude, longitude, local_emissions] + inds_vec + list(wind)
-                    try:
-                        pred = industry_model.predict(np.array([x_input], dtype=float))
-                        local_temp_delta = int(pred[0]) if hasattr(pred, '__len__') else int(pred)
-                    except Exception as e:
-                        print(f"ML Error: {e}")
-                
-                target_ndvi_val = 0.15
-
-            # B) RESIDENCIAL
-            elif local_preset == "residential_real":
-                local_temp_delta = 2 
-                target_ndvi_val = 0.3 
-
-            # C) VERDE
-            elif local_preset == "green_real":
-                local_temp_delta = -2 
-                target_ndvi_val = 0.65 
-
-            
-            # --- Preparación del Argumento Preset (CORREGIDO: Unidades Explícitas) ---
-            local_analyzer = GeoAnalytics(latitude=latitude, longitude=longitude, buffer=1000)
-            
-            preset_arg = local_preset
-            
-            if local_preset == "residential_real":
-                # Mapeo explícito de unidades requeridas por _GA_CFG
-                attrs = {
-                    "densidad": {"value": props.get("densidad", global_vals["densidad"]), "unit": "buildings_per_km2"},
-                    "trafico":  {"value": props.get("trafico", global_vals["trafico"]),   "unit": "veh_day"},
-                    "albedo":   {"value": props.get("albedo", global_vals["albedo"]),     "unit": "albedo_0_1"}
-                }
-                preset_arg = (local_preset, attrs)
-                
-            elif local_preset == "green_real":
-                # Mapeo explícito de unidades requeridas por _GA_CFG
-                attrs = {
-                    "arboles": {"value": props.get("arboles", global_vals["arboles"]), "unit": "trees_per_ha"},
-                    "pasto":   {"value": props.get("pasto", global_vals["pasto"]),     "unit": "pct"},
-                    "copa":    {"value": props.get("copa", global_vals["copa"]),       "unit": "pct"},
-                    "agua":    props.get("agua", global_vals["agua"]) # Agua es booleano directo, no dict
-                }
-                preset_arg = (local_preset, attrs)
-
-            # Calculamos reporte
-            report = local_analyzer.impact_report(geojson_geom, preset=preset_arg, calibrate=False)
-            
+        # Everything is computed before the response starts, so an Earth Engine
+        # failure in any polygon still becomes a 503 or an error envelope
+        individual_reports = []
+        for index, geom in enumerate(geometries):
+            geojson_geom, props = _split_feature(geom)
+            params = _feature_params(props, settings)
+            if not params:
+                continue
+
+            report, visualization = _simulate_feature(geojson_geom, params, settings, industry_model)
+            batch_visualization_data.append(visualization)
             individual_reports.append({
-                "geometry_index": geometries.index(geom),
+                "geometry_index": index,
                 "report": report
             })
 
-            batch_visualization_data.append({
-                "geometry": global_analyzer._geojson_to_ee_geom(geojson_geom),
-                "lst_extra": local_temp_delta,
-                "aq_extra": local_aq_delta,
-                "ndvi_target": target_ndvi_val
-            })
-
-        # --- 4. Generación de Mapa Unificado ---
-        print("🗺️ Generating unified batch visualization...")
-        global_analyzer.sim_batch_visualization(batch_visualization_data)
-
-        global_kpis = global_analyzer.get_kpis_post_sim()
-
-        map_urls = {
-            "sim_temp_url": None, "sim_ndvi_url": None, "sim_aq_url": None
-        }
-        try:
-            if getattr(global_analyzer, 'sim_temp', None):
-                map_urls["sim_temp_url"] = global_analyzer.get_tile_url(global_analyzer.sim_temp, global_analyzer.temp_vis_params)
-            if getattr(global_analyzer, 'sim_ndvi', None):
-                map_urls["sim_ndvi_url"] = global_analyzer.get_tile_url(global_analyzer.sim_ndvi, global_analyzer.ndvi_vis_params)
-            if getattr(global_analyzer, 'sim_aq', None):
-                map_urls["sim_aq_url"] = global_analyzer.get_tile_url(global_analyzer.sim_aq, global_analyzer.aq_vis_params)
-        except Exception as e:
-            print(f"Tile Generation Error: {e}")
+        global_kpis = _unified_kpis(global_analyzer, batch_visualization_data)
+        map_urls = _unified_map_urls(global_analyzer)
 
         return jsonify({
             "status": "success",
             "message": "Batch simulation completed",
             "payload": {
-                "global_kpis" : global_kpis, 
                 "individual_reports": individual_reports,
+                "global_kpis": global_kpis,
                 "map_urls": map_urls
             }
         }), 201
 
+    except EEOverloadedError as e:
+        return retry_later_response(str(e), e.retry_after)
     except Exception as e:
         print(f"Critical Error: {e}")
         import traceback
@@ -631,5 +1238,198 @@ def simulate_polygons():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+# --- Scenario sessions ---
+# A scenario stores its features with a content hash and their last report. An
+# edit (PATCH) sends only the changed features: features whose hash did not
+# change keep their report, the others are re-simulated, and the global KPIs
+# and unified map are rebuilt from all of them.
+
+def _feature_id(geom):
+    """
+    Client id of a feature, or a new random one: ids of removed features are
+    never handed out again, so a new feature cannot replace an existing one.
+    """
+    feature_id = geom.get("id")
+    if feature_id is None and geom.get("type") == "Feature":
+        feature_id = (geom.get("properties") or {}).get("id")
+    return str(feature_id) if feature_id is not None else uuid.uuid4().hex
+
+
+def _run_scenario(scenario, settings, incoming, removed=()):
+    """
+    Apply feature changes to a scenario and re-simulate what changed.
+    `incoming` is a list of GeoJSON features/geometries (new or edited).
+    Returns the number of features recomputed and reused.
+    """
+    industry_model = load_model_cached('industry_model.pkl')
+    existing = {feature.feature_id: feature for feature in scenario.features}
+
+    for feature_id in removed:
+        if feature_id in existing:
+            scenario.features.remove(existing.pop(feature_id))
+
+    next_position = max((f.position for f in existing.values()), default=-1) + 1
+    for geom in incoming:
+        feature_id = _feature_id(geom)
+        geojson_geom, props = _split_feature(geom)
+        feature = existing.get(feature_id)
+        if feature is None:
+            feature = ScenarioFeature(feature_id=feature_id, position=next_position, content_hash="")
+            next_position += 1
+            scenario.features.append(feature)
+            existing[feature_id] = feature
+        feature.geometry = geojson_geom
+        feature.properties = {k: v for k, v in props.items() if k not in ("type", "coordinates")}
+
+    recomputed = reused = 0
+    visualizations = []
+    for feature in sorted(existing.values(), key=lambda f: f.position):
+        params = _feature_params(feature.properties, settings)
+        if not params:
+            feature.content_hash, feature.report, feature.visualization = "", None, None
+            continue
+
+        content_hash = _feature_hash(feature.geometry, params, settings)
+        if content_hash != feature.content_hash or feature.visualization is None:
+            feature.report, feature.visualization = _simulate_feature(
+                feature.geometry, params, settings, industry_model
+            )
+            feature.content_hash = content_hash
+            recomputed += 1
+        else:
+            reused += 1
+        visualizations.append(feature.visualization)
+
+    global_analyzer = geo_utils.GeoAnalytics(
+        latitude=settings["latitude"], longitude=settings["longitude"], buffer=settings["buffer"]
+    )
+    scenario.global_kpis = _unified_kpis(global_analyzer, visualizations) if visualizations else None
+    scenario.map_urls = _unified_map_urls(global_analyzer) if visualizations else None
+    return recomputed, reused
+
+
+def _scenario_payload(scenario, recomputed, reused):
+    payload = scenario.to_dict()
+    payload["recomputed"] = recomputed
+    payload["reused"] = reused
+    return payload
+
+
+# Endpoint: /geo/scenarios
+# Creates a scenario session and simulates all its features (same body as /geo/simulate-polygons)
+@geo_bp.post("/scenarios")
+def create_scenario():
+    data = request.get_json()
+    if not data:
+        return jsonify({"status": "error", "message": "Request body empty", "payload": None}), 400
+
+    try:
+        geometries = data.get("geometries") or ([data.get("geometry")] if data.get("geometry") else [])
+        if not geometries:
+            return jsonify({"status": "error", "message": "No geometries provided", "payload": None}), 400
+
+        settings = _batch_settings(data)
+        scenario = Scenario(
+            latitude=settings["latitude"],
+            longitude=settings["longitude"],
+            buffer=settings["buffer"],
+            settings=settings,
+        )
+        recomputed, reused = _run_scenario(scenario, settings, geometries)
+
+        db.session.add(scenario)
+        db.session.commit()
+
+        return jsonify({
+            "status": "success",
+            "message": "Scenario created",
+            "payload": _scenario_payload(scenario, recomputed, reused)
+        }), 201
+
+    except EEOverloadedError as e:
+        db.session.rollback()
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: /geo/scenarios/<scenario_id>
+# Returns the stored state of a scenario (no recomputation)
+@geo_bp.get("/scenarios/<scenario_id>")
+def get_scenario(scenario_id):
+    try:
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            return jsonify({"status": "error", "message": "Scenario not found", "payload": None}), 404
 
+        return jsonify({
+            "status": "success",
+            "message": "Scenario retrieved",
+            "payload": scenario.to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: /geo/scenarios/<scenario_id>
+# Applies an edit: "features" (new or changed features, matched by id),
+# "remove" (feature ids) and optional global parameter changes. Only features
+# whose content changed are re-simulated.
+@geo_bp.patch("/scenarios/<scenario_id>")
+def update_scenario(scenario_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({"status": "error", "message": "Request body empty", "payload": None}), 400
 
+    try:
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            return jsonify({"status": "error", "message": "Scenario not found", "payload": None}), 404
+
+        settings = dict(scenario.settings)
+        settings.update({k: v for k, v in data.items() if k in settings})
+        scenario.settings = settings
+        scenario.latitude = settings["latitude"]
+        scenario.longitude = settings["longitude"]
+        scenario.buffer = settings["buffer"]
+
+        recomputed, reused = _run_scenario(
+            scenario,
+            settings,
+            data.get("features", []),
+            removed=[str(feature_id) for feature_id in data.get("remove", [])],
+        )
+        db.session.commit()
+
+        return jsonify({
+            "status": "success",
+            "message": "Scenario updated",
+            "payload": _scenario_payload(scenario, recomputed, reused)
+        }), 200
+
+    except EEOverloadedError as e:
+        db.session.rollback()
+        return retry_later_response(str(e), e.retry_after)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: /geo/scenarios/<scenario_id>
+# Deletes a scenario and its features
+@geo_bp.delete("/scenarios/<scenario_id>")
+def delete_scenario(scenario_id):
+    try:
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            return jsonify({"status": "error", "message": "Scenario not found", "payload": None}), 404
+
+        db.session.delete(scenario)
+        db.session.commit()
+        return jsonify({"status": "success", "message": "Scenario deleted", "payload": None}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
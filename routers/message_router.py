@@ -5,10 +5,61 @@
 
 from flask import Blueprint, jsonify, request
 from sqlalchemy import func
-from models import Message, User, Tag, db, message_tags
+from sqlalchemy.orm import contains_eager, selectinload
+from models import (
+    Message, User, Tag, db, message_tags,
+    TagStat, LocationStat, CellTagStat, MessageStats,
+)
+from models.StatsModel import GRID_CELL_DEG, grid_cell
+from utils import bulkhead
+from utils.responses import (
+    iter_csv, iter_json_array, iter_ndjson,
+    stream_file_response, stream_list_response, stream_query,
+)
 
 # Define the Blueprint for message-related routes
 message_bp = Blueprint("messages", __name__, url_prefix="/messages")
+# CRUD pool, isolated from the slow geo endpoints (utils/bulkhead.py)
+bulkhead.install(message_bp, bulkhead.CRUD)
+
+
+def _message_to_dict(message):
+    return {
+        "id": message.id,
+        "content": message.content,
+        "latitude": message.latitude,
+        "longitude": message.longitude,
+        "location": message.location,
+        "tags": [tag.name for tag in message.tags],
+    }
+
+
+def _message_rows(query):
+    # Tags are loaded with one IN query per chunk instead of the model's
+    # subquery loader, which cannot be combined with yield_per
+    return stream_query(query.options(selectinload(Message.tags)), db.session.session_factory)
+
+
+def _stream_messages(query, message):
+    return stream_list_response(_message_rows(query), _message_to_dict, message)
+
+
+def _parse_tags(tags_param):
+    return [t.strip() for t in tags_param.split(",") if t.strip()]
+
+
+def _filter_by_tags(query, tag_names, match_mode):
+    if match_mode == "all":
+        # Messages that have ALL provided tags
+        return (
+            query.join(message_tags)
+            .join(Tag)
+            .filter(Tag.name.in_(tag_names))
+            .group_by(Message.id)
+            .having(func.count(Tag.id) == len(tag_names))
+        )
+    # Messages that have ANY of the provided tags
+    return query.filter(Message.tags.any(Tag.name.in_(tag_names)))
 
 
 # Endpoint: POST /messages/
@@ -46,6 +97,7 @@ def create_message():
         )
 
         db.session.add(new_message)
+        MessageStats.record(new_message, 1)
         db.session.commit()
 
         return (
@@ -74,26 +126,7 @@ def create_message():
 @message_bp.get("/")
 def get_messages():
     try:
-        messages = Message.query.all()
-        messages_list = []
-        for message in messages:
-            messages_list.append({
-                "id": message.id,
-                "content": message.content,
-                "latitude": message.latitude,
-                "longitude": message.longitude,
-                "location": message.location,
-                "tags": [tag.name for tag in message.tags],
-            })
-
-        return (
-            jsonify({
-                "status": "success",
-                "message": "Messages retrieved successfully",
-                "payload": messages_list,
-            }),
-            200,
-        )
+        return _stream_messages(Message.query, "Messages retrieved successfully")
     except Exception as e:
         return jsonify({"status": "error", "message": str(e), "payload": None}), 500
 
@@ -108,14 +141,7 @@ def get_message(message_id):
             jsonify({
                 "status": "success",
                 "message": "Message retrieved successfully",
-                "payload": {
-                    "id": message.id,
-                    "content": message.content,
-                    "latitude": message.latitude,
-                    "longitude": message.longitude,
-                    "location": message.location,
-                    "tags": [tag.name for tag in message.tags],
-                },
+                "payload": _message_to_dict(message),
             }),
             200,
         )
@@ -140,25 +166,9 @@ def get_messages_by_location():
         )
 
     try:
-        messages = Message.query.filter_by(location=location).all()
-        messages_list = []
-        for message in messages:
-            messages_list.append({
-                "id": message.id,
-                "content": message.content,
-                "latitude": message.latitude,
-                "longitude": message.longitude,
-                "location": message.location,
-                "tags": [tag.name for tag in message.tags],
-            })
-
-        return (
-            jsonify({
-                "status": "success",
-                "message": "Messages retrieved successfully",
-                "payload": messages_list,
-            }),
-            200,
+        return _stream_messages(
+            Message.query.filter_by(location=location),
+            "Messages retrieved successfully",
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e), "payload": None}), 500
@@ -170,6 +180,7 @@ def get_messages_by_location():
 def delete_message(message_id):
     try:
         message = Message.query.get_or_404(message_id)
+        MessageStats.record(message, -1)
         db.session.delete(message)
         db.session.commit()
         return (
@@ -200,6 +211,7 @@ def update_message(message_id):
 
     try:
         message = Message.query.get_or_404(message_id)
+        before = MessageStats.snapshot(message)
 
         # Update fields if present in request
         message.content = data.get("content", message.content)
@@ -209,6 +221,7 @@ def update_message(message_id):
         if "tags" in data:
             message.tags = [Tag.query.filter_by(name=tag).first() for tag in data["tags"]]
 
+        MessageStats.record_change(before, MessageStats.snapshot(message))
         db.session.commit()
 
         return (
@@ -248,7 +261,7 @@ def get_messages_by_tags():
             400,
         )
 
-    tag_names = [t.strip() for t in tags_param.split(",") if t.strip()]
+    tag_names = _parse_tags(tags_param)
     if not tag_names:
         return (
             jsonify({
@@ -260,49 +273,176 @@ def get_messages_by_tags():
         )
 
     try:
-        if match_mode == "all":
-            # Messages that have ALL provided tags
-            messages = (
-                Message.query.join(message_tags)
-                .join(Tag)
-                .filter(Tag.name.in_(tag_names))
-                .group_by(Message.id)
-                .having(func.count(Tag.id) == len(tag_names))
-                .all()
-            )
-        else:
-            # Messages that have ANY of the provided tags
-            messages = Message.query.filter(
-                Message.tags.any(Tag.name.in_(tag_names))
-            ).all()
-
-        payload = [
-            {
-                "id": m.id,
-                "content": m.content,
-                "latitude": getattr(m, "latitude", None),
-                "longitude": getattr(m, "longitude", None),
-                "location": getattr(m, "location", None),
-                "tags": [t.name for t in m.tags],
-            }
-            for m in messages
-        ]
+        query = _filter_by_tags(Message.query, tag_names, match_mode)
+        return _stream_messages(query, "Messages retrieved")
+    except Exception as e:
+        db.session.rollback()
+        return (
+            jsonify({
+                "status": "error",
+                "message": str(e),
+                "payload": None,
+            }),
+            500,
+        )
 
+
+def _message_to_feature(message):
+    return {
+        "type": "Feature",
+        "id": message.id,
+        "geometry": {"type": "Point", "coordinates": [message.longitude, message.latitude]},
+        "properties": {
+            "content": message.content,
+            "location": message.location,
+            "tags": [tag.name for tag in message.tags],
+        },
+    }
+
+
+_CSV_COLUMNS = ("id", "content", "latitude", "longitude", "location", "tags")
+
+
+def _message_to_row(message):
+    return [
+        message.id,
+        message.content,
+        message.latitude,
+        message.longitude,
+        message.location,
+        ";".join(tag.name for tag in message.tags),
+    ]
+
+
+def _geojson_chunks(rows):
+    yield b'{"type":"FeatureCollection","features":'
+    yield from iter_json_array(rows, _message_to_feature)
+    yield b"}\n"
+
+
+# format -> (mimetype, body writer)
+_EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", lambda rows: iter_ndjson(rows, _message_to_dict)),
+    "geojson": ("application/geo+json", _geojson_chunks),
+    "csv": ("text/csv", lambda rows: iter_csv(rows, _CSV_COLUMNS, _message_to_row)),
+}
+
+
+# Endpoint: GET /messages/export
+# Download messages as NDJSON, GeoJSON or CSV, with the filters of the list
+# endpoints (location, tags and match). Rows are streamed from the database in
+# chunks, so memory stays flat however many messages are exported.
+@message_bp.get("/export")
+def export_messages():
+    export_format = request.args.get("format", "ndjson").lower()
+    location = request.args.get("location")
+    tag_names = _parse_tags(request.args.get("tags", ""))
+    match_mode = request.args.get("match", "any").lower()
+
+    if export_format not in _EXPORT_FORMATS:
         return (
             jsonify({
-                "status": "success",
-                "message": "Messages retrieved",
-                "payload": payload,
+                "status": "error",
+                "message": f"format must be one of: {', '.join(_EXPORT_FORMATS)}",
+                "payload": None,
             }),
-            200,
+            400,
         )
+
+    try:
+        query = Message.query
+        if location:
+            query = query.filter_by(location=location)
+        if tag_names:
+            query = _filter_by_tags(query, tag_names, match_mode)
+
+        mimetype, write = _EXPORT_FORMATS[export_format]
+        rows = _message_rows(query.order_by(Message.id))
+        return stream_file_response(write(rows), mimetype, f"messages.{export_format}")
     except Exception as e:
         db.session.rollback()
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
+
+
+# Endpoint: GET /messages/stats
+# Retrieve precomputed message counts per tag, per location and per grid cell and tag
+@message_bp.get("/stats")
+def get_message_stats():
+    location = request.args.get("location")
+    tags_param = request.args.get("tags", "")
+    bbox_param = request.args.get("bbox")  # min_lon,min_lat,max_lon,max_lat
+
+    tag_names = [t.strip() for t in tags_param.split(",") if t.strip()]
+
+    try:
+        tag_query = TagStat.query.join(Tag).options(contains_eager(TagStat.tag))
+        location_query = LocationStat.query
+        cell_query = CellTagStat.query.join(Tag).options(
+            contains_eager(CellTagStat.tag)
+        )
+
+        if tag_names:
+            tag_query = tag_query.filter(Tag.name.in_(tag_names))
+            cell_query = cell_query.filter(Tag.name.in_(tag_names))
+
+        if location:
+            location_query = location_query.filter_by(location=location)
+
+        if bbox_param:
+            try:
+                min_lon, min_lat, max_lon, max_lat = [
+                    float(v) for v in bbox_param.split(",")
+                ]
+            except ValueError:
+                return (
+                    jsonify({
+                        "status": "error",
+                        "message": "bbox must be min_lon,min_lat,max_lon,max_lat",
+                        "payload": None,
+                    }),
+                    400,
+                )
+            # Same cell indexes as the ones the messages were counted in
+            min_cell_lat, min_cell_lon = grid_cell(min_lat, min_lon)
+            max_cell_lat, max_cell_lon = grid_cell(max_lat, max_lon)
+            cell_query = cell_query.filter(
+                CellTagStat.cell_lat.between(min_cell_lat, max_cell_lat),
+                CellTagStat.cell_lon.between(min_cell_lon, max_cell_lon),
+            )
+
+        payload = {
+            "grid_cell_deg": GRID_CELL_DEG,
+            "tags": [
+                {"tag": stat.tag.name, "count": stat.count} for stat in tag_query.all()
+            ],
+            "locations": [
+                {"location": stat.location, "count": stat.count}
+                for stat in location_query.all()
+            ],
+            "cells": [
+                {
+                    "cell_lat": stat.cell_lat,
+                    "cell_lon": stat.cell_lon,
+                    "bbox": [
+                        stat.cell_lon * GRID_CELL_DEG,
+                        stat.cell_lat * GRID_CELL_DEG,
+                        (stat.cell_lon + 1) * GRID_CELL_DEG,
+                        (stat.cell_lat + 1) * GRID_CELL_DEG,
+                    ],
+                    "tag": stat.tag.name,
+                    "count": stat.count,
+                }
+                for stat in cell_query.all()
+            ],
+        }
+
         return (
             jsonify({
-                "status": "error",
-                "message": str(e),
-                "payload": None,
+                "status": "success",
+                "message": "Message stats retrieved successfully",
+                "payload": payload,
             }),
-            500,
+            200,
         )
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e), "payload": None}), 500
@@ -4,10 +4,15 @@
 # This module defines the API endpoints for managing users.
 
 from flask import Blueprint, jsonify, request
-from models import Message, User, Tag, db
+from sqlalchemy.orm import selectinload
+from models import Message, User, Tag, db, MessageStats
+from utils import bulkhead
+from utils.responses import stream_list_response, stream_query
 
 # Define the Blueprint for user-related routes
 user_bp = Blueprint("users", __name__, url_prefix="/users")
+# CRUD pool, isolated from the slow geo endpoints (utils/bulkhead.py)
+bulkhead.install(user_bp, bulkhead.CRUD)
 
 
 # Endpoint: POST /users/register
@@ -72,19 +77,10 @@ def register_user():
 @user_bp.get("/")
 def get_users():
     try:
-        users = User.query.all()
-        users_list = [
-            {"id": user.id, "username": user.username, "email": user.email}
-            for user in users
-        ]
-
-        return (
-            jsonify({
-                "status": "success",
-                "message": "Users retrieved successfully",
-                "payload": users_list,
-            }),
-            200,
+        return stream_list_response(
+            stream_query(User.query, db.session.session_factory),
+            lambda user: {"id": user.id, "username": user.username, "email": user.email},
+            "Users retrieved successfully",
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e), "payload": None}), 500
@@ -102,6 +98,10 @@ def delete_user(user_id):
                 404,
             )
 
+        # The user's messages are removed by cascade, take them out of the stats
+        for message in user.messages:
+            MessageStats.record(message, -1)
+
         db.session.delete(user)
         db.session.commit()
 
@@ -156,17 +156,12 @@ def update_user(user_id):
 def get_user_messages(user_id):
     try:
         user = User.query.get_or_404(user_id)
-        messages = Message.query.filter_by(user_id=user.id).all()
-        messages_list = [
-            {
-                "id": message.id,
-                "content": message.content,
-                "tags": [tag.name for tag in message.tags],
-            }
-            for message in messages
-        ]
+        messages = stream_query(
+            Message.query.filter_by(user_id=user.id).options(selectinload(Message.tags)),
+            db.session.session_factory,
+        )
 
-        if not messages_list:
+        if messages.empty:
             return (
                 jsonify({
                     "status": "success",
@@ -175,14 +170,15 @@ def get_user_messages(user_id):
                 }),
                 200,
             )
-        # Return messages when found
-        return (
-            jsonify({
-                "status": "success",
-                "message": "Messages retrieved successfully",
-                "payload": messages_list,
-            }),
-            200,
+        # Stream messages when found
+        return stream_list_response(
+            messages,
+            lambda message: {
+                "id": message.id,
+                "content": message.content,
+                "tags": [tag.name for tag in message.tags],
+            },
+            "Messages retrieved successfully",
         )
     except Exception as e:
         return jsonify({"status": "error", "message": str(e), "payload": None}), 500
@@ -0,0 +1,84 @@
+# tests/test_atlas.py
+#
+# Hexagonal grids, the resolutions used for a region and the local
+# aggregation of area KPIs from a stored atlas.
+#
+# Run from the repository root: python -m pytest tests
+
+import math
+
+from utils import atlas, ee_client
+
+
+def test_hex_grid_covers_the_circle_with_closed_rings():
+    cells = atlas.hex_grid(25.67, -100.31, 1000, 200)
+    ids = [cell_id for cell_id, _, _ in cells]
+    assert len(ids) == len(set(ids))
+    assert "0:0" in ids
+    for _, center, ring in cells:
+        assert len(ring) == 7 and ring[0] == ring[-1]
+    origin = next(center for cell_id, center, _ in cells if cell_id == "0:0")
+    assert origin == [-100.31, 25.67]
+
+
+def test_hex_grid_cell_count_grows_with_the_buffer():
+    small = len(atlas.hex_grid(0.0, 0.0, 5000, 200))
+    large = len(atlas.hex_grid(0.0, 0.0, 10000, 200))
+    assert 3 < large / small < 5
+
+
+def test_small_regions_keep_the_base_resolutions():
+    assert atlas.resolutions_for(5000) == list(atlas.RESOLUTIONS)
+
+
+def test_large_regions_coarsen_every_grid_below_the_getinfo_limit():
+    for buffer_m in (20000, 50000, 100000):
+        resolutions = atlas.resolutions_for(buffer_m)
+        edges = [edge_m for edge_m, _ in resolutions]
+        assert edges == sorted(set(edges))
+        for edge_m, scale_m in resolutions:
+            assert len(atlas.hex_grid(0.0, 0.0, buffer_m, edge_m)) <= ee_client.MAX_DOWNLOAD_FEATURES
+            assert scale_m >= 30
+
+    # 50 km at 200 m edges would be ~74k cells; the finest edge is derived instead
+    finest_edge, finest_scale = atlas.resolutions_for(50000)[0]
+    assert finest_edge > 600
+    assert math.isclose(finest_scale / finest_edge, 30 / 200, rel_tol=0.01)
+
+
+def _square(lon, lat, half_deg):
+    return {"type": "Polygon", "coordinates": [[
+        [lon - half_deg, lat - half_deg], [lon + half_deg, lat - half_deg],
+        [lon + half_deg, lat + half_deg], [lon - half_deg, lat + half_deg],
+        [lon - half_deg, lat - half_deg],
+    ]]}
+
+
+def _atlas(edges):
+    resolutions = {}
+    for edge_m in edges:
+        resolutions[str(edge_m)] = [
+            {"cell": cell_id, "center": center, "avg_surface_temp": float(edge_m), "avg_NVDI": 0.5, "avg_air_quality": None}
+            for cell_id, center, _ in atlas.hex_grid(0.0, 0.0, 5000, edge_m)
+        ]
+    return {"name": "Test", "latitude": 0.0, "longitude": 0.0, "buffer": 5000,
+            "built_on": "2026-01-01", "resolutions": resolutions}
+
+
+def test_query_uses_the_finest_stored_resolution_with_enough_cells():
+    result = atlas.query_atlas(_square(0.0, 0.0, 0.01), _atlas([1800, 600, 200]))
+    assert result["resolution_m"] == 200
+    assert result["cells"] >= atlas.MIN_CELLS
+    assert result["avg_surface_temp"] == 200.0
+    assert result["avg_air_quality"] is None
+
+
+def test_query_uses_coarsened_edges_when_the_base_ones_are_missing():
+    result = atlas.query_atlas(_square(0.0, 0.0, 0.02), _atlas([817, 1800]))
+    assert result["resolution_m"] == 817
+
+
+def test_tiny_polygon_falls_back_to_the_nearest_finest_cell():
+    result = atlas.query_atlas(_square(0.0005, 0.0005, 0.0001), _atlas([1800, 600]))
+    assert result["cells"] == 1
+    assert result["resolution_m"] == 600
@@ -0,0 +1,82 @@
+# tests/test_bulkhead.py
+#
+# The bulkhead slot of a blueprint must be held until its response is closed,
+# including while a streamed body is being generated.
+#
+# Run from the repository root: python -m pytest tests
+
+from flask import Blueprint, Flask, Response, stream_with_context
+
+from utils.bulkhead import Bulkhead, install
+
+
+def _make_app(pool):
+    app = Flask(__name__)
+    bp = Blueprint("pooled", __name__)
+    install(bp, pool)
+    seen = []
+
+    @bp.get("/stream")
+    def stream():
+        def body():
+            for chunk in range(3):
+                seen.append(pool.in_flight)
+                yield f"{chunk}\n"
+
+        return Response(stream_with_context(body()), mimetype="text/plain")
+
+    @bp.get("/plain")
+    def plain():
+        seen.append(pool.in_flight)
+        return "ok"
+
+    @bp.get("/fails")
+    def fails():
+        raise RuntimeError("boom")
+
+    app.register_blueprint(bp)
+    return app, seen
+
+
+def test_slot_held_while_streamed_body_is_consumed():
+    pool = Bulkhead("test", max_concurrent=2, queue_timeout_s=0)
+    app, seen = _make_app(pool)
+
+    response = app.test_client().get("/stream", buffered=False)
+    assert pool.in_flight == 1
+    assert b"".join(response.response) == b"0\n1\n2\n"
+    assert seen == [1, 1, 1]
+
+    response.close()
+    assert pool.in_flight == 0
+
+
+def test_slot_released_after_plain_and_failed_requests():
+    pool = Bulkhead("test", max_concurrent=1, queue_timeout_s=0)
+    app, seen = _make_app(pool)
+    client = app.test_client()
+
+    # WSGI servers close every response; the test client leaves it to the caller
+    with client.get("/plain") as response:
+        assert response.status_code == 200
+    assert seen == [1]
+    assert pool.in_flight == 0
+
+    with client.get("/fails") as response:
+        assert response.status_code == 500
+    assert pool.in_flight == 0
+
+
+def test_full_pool_answers_503_while_a_stream_is_open():
+    pool = Bulkhead("test", max_concurrent=1, queue_timeout_s=0, retry_after_s=3)
+    app, _ = _make_app(pool)
+    client = app.test_client()
+
+    streaming = client.get("/stream", buffered=False)
+    rejected = client.get("/plain")
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "3"
+
+    streaming.close()
+    with client.get("/plain") as response:
+        assert response.status_code == 200
@@ -0,0 +1,95 @@
+# tests/test_cache.py
+#
+# The shared result cache (expiry, purging, bad values) and the schedule of
+# cache warming runs.
+#
+# Run from the repository root: python -m pytest tests
+
+import datetime
+import json
+
+import pytest
+
+from utils import cache, warming
+from utils.cache import ResultCache
+
+
+@pytest.fixture
+def results(tmp_path):
+    return ResultCache(str(tmp_path / "ee_cache.db"))
+
+
+def test_values_round_trip_as_json(results):
+    results.set("k", {"mean": 1.5, "bands": ["LST"]})
+    assert results.get("k") == {"mean": 1.5, "bands": ["LST"]}
+    assert results.get("missing") is None
+
+
+def test_expired_entries_are_misses(results, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    results.set("short", 1, ttl_s=10)
+    results.set("long", 2, ttl_s=1000)
+
+    now += 60
+    assert results.get("short") is None
+    assert results.get("long") == 2
+
+
+def test_writes_purge_expired_entries_once_per_interval(results, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    results.set("a", 1, ttl_s=10)   # first write purges and schedules the next purge
+    now += 60
+    results.set("b", 2, ttl_s=10)
+    assert len(results) == 2        # "a" expired, but the interval has not passed
+
+    now += cache.PURGE_INTERVAL_S
+    results.set("c", 3)
+    assert len(results) == 1
+    assert results.get("c") == 3
+
+
+def test_values_that_are_not_json_are_not_stored(results):
+    results.set("bad", {"geometry": object()})
+    assert results.get("bad") is None
+    assert len(results) == 0
+
+
+def test_entries_are_shared_between_instances_on_the_same_file(tmp_path):
+    path = str(tmp_path / "shared.db")
+    ResultCache(path).set("k", [1, 2, 3])
+    assert ResultCache(path).get("k") == [1, 2, 3]
+
+
+def test_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("EE_CACHE", "0")
+    assert cache.get_cache() is None
+
+
+def test_schedule_parsing():
+    assert warming.parse_schedule("10:00, 04:30") == [datetime.time(4, 30), datetime.time(10, 0)]
+    assert warming.parse_schedule("") == []
+    with pytest.raises(ValueError):
+        warming.parse_schedule("4am")
+
+
+def test_malformed_schedule_disables_warming(monkeypatch):
+    monkeypatch.setenv("WARM_CACHE_AT", "25:00")
+    assert warming.schedule_from_env() == []
+
+
+def test_next_run_wraps_to_the_next_day():
+    schedule = [datetime.time(4, 0), datetime.time(10, 0)]
+    now = datetime.datetime(2026, 3, 1, 9, 0)
+    assert warming.next_run(schedule, now) == datetime.datetime(2026, 3, 1, 10, 0)
+    now = datetime.datetime(2026, 3, 1, 11, 0)
+    assert warming.next_run(schedule, now) == datetime.datetime(2026, 3, 2, 4, 0)
+    assert warming.next_run([], now) is None
+
+
+def test_regions_must_have_every_field(tmp_path):
+    path = tmp_path / "regions.json"
+    path.write_text(json.dumps([{"name": "Monterrey", "latitude": 25.67, "longitude": -100.31}]))
+    with pytest.raises(ValueError):
+        warming.load_regions(str(path))
@@ -0,0 +1,113 @@
+# tests/test_coalesce.py
+#
+# Identical concurrent computations run once; every caller gets its own copy of
+# the result, errors reach every waiter, and nothing is kept afterwards.
+#
+# Run from the repository root: python -m pytest tests
+
+import threading
+import time
+
+import pytest
+
+from utils.coalesce import Coalescer, FileCoalescer, expression_key, fcntl
+
+
+class _Expression:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def serialize(self):
+        return self.graph
+
+
+class _Unserializable:
+    def serialize(self):
+        raise TypeError("not an EE object")
+
+
+def _run_together(coalescer, key, compute, callers=4):
+    results, errors = [None] * callers, [None] * callers
+
+    def call(i):
+        try:
+            results[i] = coalescer.run(key, compute)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_expression_key_depends_on_call_graph_and_extra():
+    image = _Expression('{"values": {"0": 1}}')
+    key = expression_key("getInfo", image)
+    assert key == expression_key("getInfo", _Expression('{"values": {"0": 1}}'))
+    assert key != expression_key("getMapId", image)
+    assert key != expression_key("getInfo", image, extra={"scale": 30})
+    assert expression_key("getInfo", _Unserializable()) is None
+
+
+def test_concurrent_callers_share_one_computation():
+    coalescer, calls = Coalescer(), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"mean": 1.5}
+
+    results, errors = _run_together(coalescer, "k", compute)
+    assert calls == [1]
+    assert errors == [None] * 4
+    assert all(result == {"mean": 1.5} for result in results)
+    # Callers may mutate what they got without affecting each other
+    assert len({id(result) for result in results}) == 4
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    coalescer, calls = Coalescer(), []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError("EE failed")
+
+    _, errors = _run_together(coalescer, "k", compute)
+    assert calls == [1]
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert coalescer.run("k", lambda: "recomputed") == "recomputed"
+
+
+def test_sequential_calls_and_unkeyed_calls_always_compute():
+    coalescer, calls = Coalescer(), []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert coalescer.run("k", compute) == 1
+    assert coalescer.run("k", compute) == 2
+    assert coalescer.run(None, compute) == 3
+
+
+@pytest.mark.skipif(fcntl is None, reason="process coalescing needs flock")
+def test_file_coalescer_hands_the_result_to_a_waiting_worker(tmp_path):
+    leader, follower = FileCoalescer(str(tmp_path)), FileCoalescer(str(tmp_path))
+    computing = threading.Event()
+    results = {}
+
+    def slow():
+        computing.set()
+        time.sleep(0.2)
+        return {"tile": "abc"}
+
+    thread = threading.Thread(target=lambda: results.setdefault("leader", leader.run("k", slow)))
+    thread.start()
+    computing.wait(5)
+    results["follower"] = follower.run("k", lambda: pytest.fail("follower must not compute"))
+    thread.join(5)
+    assert results == {"leader": {"tile": "abc"}, "follower": {"tile": "abc"}}
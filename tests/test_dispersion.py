@@ -0,0 +1,98 @@
+# tests/test_dispersion.py
+#
+# Gaussian plume kernel, direct vs FFT-convolved fields and the AQ points
+# sent to Earth Engine.
+#
+# Run from the repository root: python -m pytest tests
+
+import math
+
+import numpy as np
+import pytest
+
+from utils import dispersion
+from utils.dispersion import PlumeField
+
+
+def test_kernel_is_zero_upwind_and_symmetric_across_the_wind():
+    # Wind from the west, blowing east
+    assert dispersion.kernel(np.array(-500.0), np.array(0.0), 5.0, 0.0) == 0.0
+    left = dispersion.kernel(np.array(1000.0), np.array(80.0), 5.0, 0.0)
+    right = dispersion.kernel(np.array(1000.0), np.array(-80.0), 5.0, 0.0)
+    centre = dispersion.kernel(np.array(1000.0), np.array(0.0), 5.0, 0.0)
+    assert left == pytest.approx(right)
+    assert 0 < left < centre
+
+
+def test_kernel_follows_the_wind_direction_and_dilutes_with_speed():
+    east = dispersion.kernel(np.array(1000.0), np.array(0.0), 4.0, 0.0)
+    north = dispersion.kernel(np.array(0.0), np.array(1000.0), 0.0, 4.0)
+    assert east == pytest.approx(north)
+    assert dispersion.kernel(np.array(1000.0), np.array(0.0), 8.0, 0.0) == pytest.approx(east / 2)
+    # Calm air is clamped instead of diverging
+    assert math.isfinite(float(dispersion.kernel(np.array(1000.0), np.array(0.0), 0.0, 0.0)))
+
+
+def test_unknown_stability_class_is_rejected():
+    with pytest.raises(ValueError):
+        dispersion.kernel(np.array(1.0), np.array(0.0), 1.0, 0.0, stability="G")
+
+
+def _sources(n, spread_m=2000.0, center=(25.67, -100.31), seed=0):
+    rng = np.random.default_rng(seed)
+    kx = dispersion.M_PER_DEG_LON * math.cos(math.radians(center[0]))
+    # Cell centres of a 100-cell grid over ±5 km, so snapping does not move them
+    cells = rng.integers(-int(spread_m / 100), int(spread_m / 100), size=(n, 2)) * 100 + 50
+    return [
+        (center[0] + dy / dispersion.M_PER_DEG_LAT, center[1] + dx / kx, float(rng.uniform(1e4, 1e6)))
+        for dx, dy in cells
+    ]
+
+
+def test_convolved_field_matches_the_direct_sum():
+    center = (25.67, -100.31)
+    sources = _sources(dispersion.DIRECT_MAX_SOURCES + 4)
+    convolved = dispersion.field(sources, 3.0, 2.0, center, cells=100).values
+    direct = sum(dispersion.field([s], 3.0, 2.0, center, cells=100).values for s in sources)
+    assert np.allclose(convolved, direct, rtol=1e-3, atol=1e-6 * direct.max())
+
+
+def test_field_bounds_and_empty_sources():
+    center = (25.67, -100.31)
+    plume = dispersion.field([(25.67, -100.31, 0.0)], 3.0, 0.0, center, half_size_m=1000, cells=50)
+    assert plume.values.shape == (50, 50)
+    assert not plume.values.any()
+    assert plume.north - plume.south == pytest.approx(2000 / dispersion.M_PER_DEG_LAT)
+    assert (plume.west + plume.east) / 2 == pytest.approx(center[1])
+
+
+def test_aq_points_are_on_a_capped_log_scale():
+    ref = dispersion.AQ_REF_G_M3
+    values = np.array([
+        [ref, 9 * ref, 1e6 * ref, 0.0],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 0.01 * ref],
+    ])
+    grid, _ = PlumeField(values, 0.0, 0.0, 4.0, 4.0).aq_delta(cells=4)
+    per_decade = dispersion.AQ_POINTS_PER_DECADE
+    assert grid[0, 0] == pytest.approx(per_decade * math.log10(2), abs=0.01)
+    assert grid[0, 1] == pytest.approx(per_decade, abs=0.01)
+    assert grid[0, 2] == dispersion.AQ_MAX_POINTS
+    # 0.01 x reference is ~0.1 points: below AQ_MIN_POINTS, so cropped away
+    assert grid.shape == (1, 3)
+
+
+def test_aq_grid_is_block_averaged_and_cropped_with_its_bounds():
+    values = np.zeros((8, 8))
+    values[2:4, 4:6] = dispersion.AQ_REF_G_M3 * 99
+    grid, bounds = PlumeField(values, -1.0, 10.0, 1.0, 12.0).aq_delta(cells=4)
+    assert grid.tolist() == [[pytest.approx(2 * dispersion.AQ_POINTS_PER_DECADE, abs=0.01)]]
+    # Block (row 1, col 2) of a 4 x 4 grid of 0.5° cells, row 0 north
+    assert bounds == pytest.approx((0.0, 11.0, 0.5, 11.5))
+
+
+def test_field_without_plume_gives_an_empty_grid():
+    grid, bounds = PlumeField(np.zeros((8, 8)), 0.0, 0.0, 1.0, 1.0).aq_delta(cells=4)
+    assert grid.size == 0
+    assert bounds == (0.0, 0.0, 1.0, 1.0)
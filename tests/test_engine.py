@@ -0,0 +1,77 @@
+# tests/test_engine.py
+#
+# Database engine profiles: environment overrides, SQLite pragmas and the
+# query timing hooks, including statements that fail.
+#
+# Run from the repository root: python -m pytest tests
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models.engine import configure_engine, get_engine_profile
+from utils import metrics
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_engine_profile("staging")
+
+
+def test_environment_overrides_the_profile(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_BUSY_TIMEOUT_MS", "100")
+    monkeypatch.setenv("DB_SLOW_QUERY_MS", "50")
+    monkeypatch.setenv("DB_LOG_STATEMENTS", "yes")
+    profile = get_engine_profile("production")
+    assert profile["pool"]["pool_size"] == 3
+    assert profile["sqlite_pragmas"]["busy_timeout"] == 100
+    assert profile["slow_query_ms"] == 50.0
+    assert profile["log_statements"] is True
+    # The module-level profiles are not modified
+    monkeypatch.delenv("DB_POOL_SIZE")
+    assert get_engine_profile("production")["pool"]["pool_size"] == 10
+
+
+def _app(tmp_path, uri=None):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri or f"sqlite:///{tmp_path / 'engine.db'}"
+    return app
+
+
+def test_sqlite_gets_the_pragmas_and_no_pool_options(tmp_path):
+    app, db = _app(tmp_path), SQLAlchemy()
+    configure_engine(app, db, get_engine_profile("production"))
+    assert not app.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+    assert app.config["DB_PROFILE"] == "production"
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_server_databases_get_the_pool_options(tmp_path):
+    pytest.importorskip("psycopg2")
+    app = _app(tmp_path, "postgresql://user@localhost/greengrowth")
+    configure_engine(app, SQLAlchemy(), get_engine_profile("production"))
+    assert app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"] == 10
+
+
+def _count(operation):
+    return metrics.DB_QUERIES.labels(operation=operation).value
+
+
+def test_queries_are_timed_and_failed_ones_do_not_leak_timers(tmp_path):
+    app, db = _app(tmp_path), SQLAlchemy()
+    configure_engine(app, db, get_engine_profile("development"))
+    with app.app_context():
+        with db.engine.connect() as conn:
+            before = _count("SELECT")
+            conn.execute(text("SELECT 1"))
+            assert _count("SELECT") == before + 1
+
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 2"))
+            assert conn.info["query_start"] == []
@@ -0,0 +1,79 @@
+# tests/test_export.py
+#
+# GET /messages/export in its three formats, with the list filters.
+#
+# Run from the repository root: python -m pytest tests
+
+import csv
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from models import Message, Tag, db
+from routers.message_router import message_bp
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'export.db'}"
+    db.init_app(app)
+    app.register_blueprint(message_bp)
+    with app.app_context():
+        db.create_all()
+        heat, trees = Tag(name="heat"), Tag(name="trees")
+        db.session.add_all([
+            Message(content="hot, sunny", latitude=25.67, longitude=-100.31, location="Centro", tags=[heat]),
+            Message(content="shade", latitude=25.70, longitude=-100.30, location="Norte", tags=[heat, trees]),
+            Message(content="no tags", latitude=25.60, longitude=-100.40, location="Centro", tags=[]),
+        ])
+        db.session.commit()
+        yield app.test_client()
+        db.session.remove()
+
+
+def _get(client, query):
+    with client.get(f"/messages/export?{query}") as response:
+        return response.status_code, response.headers, response.get_data()
+
+
+def test_ndjson_is_the_default(client):
+    status, headers, body = _get(client, "")
+    assert status == 200
+    assert headers["Content-Type"] == "application/x-ndjson"
+    assert headers["Content-Disposition"] == 'attachment; filename="messages.ndjson"'
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert [row["content"] for row in rows] == ["hot, sunny", "shade", "no tags"]
+    assert rows[1]["tags"] == ["heat", "trees"]
+
+
+def test_geojson_is_a_feature_collection_of_points(client):
+    status, headers, body = _get(client, "format=geojson&location=Centro")
+    assert headers["Content-Type"] == "application/geo+json"
+    collection = json.loads(body)
+    assert collection["type"] == "FeatureCollection"
+    assert [f["properties"]["content"] for f in collection["features"]] == ["hot, sunny", "no tags"]
+    assert collection["features"][0]["geometry"] == {"type": "Point", "coordinates": [-100.31, 25.67]}
+
+
+def test_csv_quotes_values_and_joins_tags(client):
+    status, headers, body = _get(client, "format=CSV&tags=trees,heat&match=all")
+    assert headers["Content-Type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert rows[0] == ["id", "content", "latitude", "longitude", "location", "tags"]
+    assert rows[1][1:] == ["shade", "25.7", "-100.3", "Norte", "heat;trees"]
+    assert len(rows) == 2
+
+
+def test_empty_exports_are_still_valid(client):
+    assert _get(client, "location=Sur")[2] == b""
+    assert json.loads(_get(client, "format=geojson&location=Sur")[2])["features"] == []
+    assert _get(client, "format=csv&location=Sur")[2] == b"id,content,latitude,longitude,location,tags\r\n"
+
+
+def test_unknown_format_is_rejected(client):
+    status, _, body = _get(client, "format=xlsx")
+    assert status == 400
+    assert json.loads(body)["status"] == "error"
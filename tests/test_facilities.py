@@ -0,0 +1,103 @@
+# tests/test_facilities.py
+#
+# Column-oriented facility queries: filters, ordering, limits and the
+# per-sector aggregation, on a small synthetic table.
+#
+# Run from the repository root: python -m pytest tests
+
+import numpy as np
+import pytest
+
+from utils import facilities
+from utils.facilities import FacilityTable
+
+FACILITIES = [
+    # id, state, latitude, longitude, subparts, sectors, co2e, co2
+    (1, "TX", 29.76, -95.37, "C,Y (RPT)", "Refineries", 900.0, 850.0),
+    (2, "TX", 29.70, -95.20, "C", "Chemicals,Power Plants", 500.0, np.nan),
+    (3, "TX", 30.50, -97.70, "D", "Power Plants", 700.0, 690.0),
+    (4, "LA", 30.20, -93.20, "C,X", "Chemicals", 100.0, 95.0),
+]
+
+
+@pytest.fixture
+def table():
+    ids, states, lats, lons, subparts, sectors, co2e, co2 = zip(*FACILITIES)
+    columns = {
+        "id": np.array(ids, dtype=np.int64),
+        "name": np.array([f"Plant {i}" for i in ids]),
+        "city": np.array(["" for _ in ids]),
+        "state": np.array(states),
+        "latitude": np.array(lats),
+        "longitude": np.array(lons),
+        "naics": np.array([325110.0, np.nan, 221112.0, 325199.0]),
+        "subparts": np.array(subparts),
+        "sectors": np.array(sectors),
+        "co2e": np.array(co2e),
+        "co2": np.array(co2),
+        "ch4": np.full(len(ids), np.nan),
+        "n2o": np.full(len(ids), np.nan),
+    }
+    columns["subpart_labels"], columns["subpart_matrix"] = facilities._membership(columns["subparts"], facilities._subpart_code)
+    columns["sector_labels"], columns["sector_matrix"] = facilities._membership(columns["sectors"], str.strip)
+    return FacilityTable(columns)
+
+
+def _ids(result):
+    return [row["id"] for row in result["facilities"]]
+
+
+def test_co2e_uses_the_ghgrp_warming_potentials():
+    assert facilities.co2e(1.0, 1.0, 1.0) == 1.0 + 25 + 298
+
+
+def test_membership_splits_codes_and_labels():
+    labels, matrix = facilities._membership(np.array(["C,Y (RPT)", "C", ""]), facilities._subpart_code)
+    assert labels.tolist() == ["C", "Y"]
+    assert matrix.tolist() == [[True, True], [True, False], [False, False]]
+
+
+def test_query_orders_by_emissions_and_aggregates_sectors(table):
+    result = table.query()
+    assert _ids(result) == [1, 3, 2, 4]
+    assert result["count"] == 4
+    assert result["total_co2e"] == 2200.0
+    # Facility 2 counts in both of its sectors
+    assert result["by_sector"] == [
+        {"sector": "Power Plants", "co2e": 1200.0, "facilities": 2},
+        {"sector": "Refineries", "co2e": 900.0, "facilities": 1},
+        {"sector": "Chemicals", "co2e": 600.0, "facilities": 2},
+    ]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"subparts": ["Y (RPT)"]}, [1]),
+    ({"subparts": ["D", "X"]}, [3, 4]),
+    ({"sectors": [" Chemicals "]}, [2, 4]),
+    ({"states": ["la"]}, [4]),
+    ({"min_co2e": 500, "max_co2e": 700}, [3, 2]),
+    ({"bbox": (-96.0, 29.0, -95.0, 30.0)}, [1, 2]),
+    ({"near": (29.76, -95.37, 20)}, [1, 2]),
+    ({"sectors": ["Chemicals"], "states": ["TX"]}, [2]),
+    ({"sectors": ["Cement"]}, []),
+])
+def test_filters_combine(table, filters, expected):
+    assert _ids(table.query(**filters)) == expected
+
+
+def test_near_adds_distances(table):
+    rows = table.query(near=(29.76, -95.37, 20))["facilities"]
+    assert rows[0]["distance_km"] == 0.0
+    assert 10 < rows[1]["distance_km"] < 20
+
+
+def test_limit_and_top_are_clamped_at_zero(table):
+    result = table.query(limit=-1, top=-3)
+    assert result["facilities"] == [] and result["top"] == []
+    assert result["count"] == 4
+    assert [row["id"] for row in table.query(limit=2, top=1)["top"]] == [1]
+
+
+def test_missing_values_are_null(table):
+    row = next(r for r in table.query()["facilities"] if r["id"] == 2)
+    assert row["naics"] is None and row["co2"] is None and row["ch4"] is None
@@ -0,0 +1,98 @@
+# tests/test_geometry.py
+#
+# Canonical GeoJSON hashing and the scale-aware, cached simplification of
+# polygons sent to Earth Engine.
+#
+# Run from the repository root: python -m pytest tests
+
+import math
+
+import pytest
+
+from utils import geometry
+
+
+def _traced_circle(vertices, radius_m=300.0, noise_m=1.0, lat=25.67, lon=-100.31):
+    """Closed ring of a traced circle, with a zigzag of `noise_m` metres."""
+    kx = geometry.M_PER_DEG_LON * math.cos(math.radians(lat))
+    ring = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius_m + (noise_m if i % 2 else -noise_m)
+        ring.append([lon + r * math.cos(angle) / kx, lat + r * math.sin(angle) / geometry.M_PER_DEG_LAT])
+    return {"type": "Polygon", "coordinates": [[*ring, ring[0]]]}
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    geometry._simplified.clear()
+
+
+def test_hash_ignores_orientation_start_vertex_and_float_noise():
+    ring = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+    rotated = [[1.0, 1.0 + 1e-9], [0.0, 1.0], [0.0, 0.0], [1.0, 0.0], [1.0, 1.0]]
+    reversed_ring = list(reversed(ring))
+    hashes = {
+        geometry.geometry_hash({"type": "Polygon", "coordinates": [r]})
+        for r in (ring, rotated, reversed_ring)
+    }
+    assert len(hashes) == 1
+
+
+def test_simplification_keeps_the_area_within_the_allowed_error():
+    polygon = _traced_circle(2000)
+    simplified = geometry.simplify_geometry(polygon, 20)
+
+    assert geometry.count_vertices(simplified) < geometry.count_vertices(polygon) / 10
+    area, simplified_area = geometry.area_m2(polygon), geometry.area_m2(simplified)
+    assert abs(simplified_area - area) / area <= geometry.SIMPLIFY_MAX_AREA_ERROR
+
+
+def test_tolerance_follows_the_reduction_scale():
+    polygon = _traced_circle(2000, radius_m=3000.0, noise_m=8.0)
+    fine = geometry.simplify_geometry(polygon, 10)
+    coarse = geometry.simplify_geometry(polygon, 100)
+    # Half a 10 m pixel keeps the 8 m zigzag; half a 100 m pixel removes it
+    assert geometry.count_vertices(coarse) < geometry.count_vertices(fine)
+
+
+def test_results_are_cached_per_geometry_and_scale():
+    polygon = _traced_circle(500)
+    first = geometry.simplify_geometry(polygon, 20)
+    # Same area drawn from another vertex: same canonical hash, same entry
+    ring = polygon["coordinates"][0][:-1]
+    redrawn = {"type": "Polygon", "coordinates": [[*ring[7:], *ring[:7], ring[7]]]}
+    assert geometry.simplify_geometry(redrawn, 20) is first
+    assert geometry.simplify_geometry(polygon, 100) is not first
+    assert len(geometry._simplified) == 2
+
+
+def test_cache_drops_the_least_recently_used_entries(monkeypatch):
+    monkeypatch.setattr(geometry, "MAX_SIMPLIFIED", 2)
+    polygons = [_traced_circle(50, radius_m=100.0 + i) for i in range(3)]
+    for polygon in polygons:
+        geometry.simplify_geometry(polygon, 20)
+    assert len(geometry._simplified) == 2
+    assert (geometry.geometry_hash(polygons[0]), 20, geometry.SIMPLIFY_MAX_AREA_ERROR) not in geometry._simplified
+
+
+def test_features_keep_their_properties():
+    feature = {"type": "Feature", "geometry": _traced_circle(500), "properties": {"name": "parcel"}}
+    simplified = geometry.simplify_geometry(feature, 20)
+    assert simplified["properties"] == {"name": "parcel"}
+    assert geometry.count_vertices(simplified) < geometry.count_vertices(feature)
+
+
+@pytest.mark.parametrize("geojson", [
+    {"type": "Point", "coordinates": [-100.3, 25.7]},
+    {"type": "Polygon", "coordinates": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]},
+    {"type": "Polygon", "coordinates": [[[0.0, 0.0], [1.0]]]},
+])
+def test_other_and_small_or_malformed_geometries_are_left_alone(geojson):
+    assert geometry.simplify_geometry(geojson, 20)["coordinates"] == geojson["coordinates"]
+
+
+def test_zero_tolerance_disables_simplification(monkeypatch):
+    monkeypatch.setattr(geometry, "SIMPLIFY_TOLERANCE_PX", 0.0)
+    polygon = _traced_circle(500)
+    assert geometry.simplify_geometry(polygon, 20) is polygon
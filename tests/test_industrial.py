@@ -0,0 +1,38 @@
+# tests/test_industrial.py
+#
+# /geo/simulate and /geo/screen-sites both hand the industry model's prediction
+# to _industrial_report, which must apply the same ΔLST whatever its type.
+#
+# Run from the repository root: python -m pytest tests
+
+import numpy as np
+import pytest
+
+import utils.geoprocessor
+from routers import geo_router
+
+
+class _Analytics:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def impact_report(self, **kwargs):
+        return {"preset": kwargs["preset"]}
+
+
+@pytest.mark.parametrize("prediction, applied", [
+    (np.array([2.93])[0], 2),                    # /geo/simulate: model.predict(x)[0]
+    (np.array([0.5, 2.93], dtype=float)[1], 2),  # /geo/screen-sites: predicted[i]
+    (2.93, 2),
+    (-1.4, -1),
+])
+def test_prediction_is_applied_as_whole_degrees(monkeypatch, prediction, applied):
+    monkeypatch.setattr(utils.geoprocessor, "GeoAnalytics", _Analytics)
+    monkeypatch.setattr(geo_router, "_industrial_plume", lambda *args, **kwargs: None)
+
+    analyzer, report = geo_router._industrial_report(
+        {"type": "Point", "coordinates": [-100.3, 25.7]}, 25.7, -100.3, 5000, 1e5, prediction
+    )
+    assert report == {"preset": "industrial"}
+    assert analyzer.kwargs["temp_industry"] == applied
+    assert type(analyzer.kwargs["temp_industry"]) is int
@@ -0,0 +1,119 @@
+# tests/test_limiter.py
+#
+# Error classification, the AIMD concurrency limit and the retry loop around
+# Earth Engine round trips.
+#
+# Run from the repository root: python -m pytest tests
+
+import pytest
+
+from utils import limiter
+from utils.limiter import (
+    FATAL, OVERLOAD, TRANSIENT, AdaptiveLimiter, EEOverloadedError, RetryPolicy, classify_error,
+)
+
+
+class _Resp:
+    def __init__(self, status):
+        self.status = status
+
+
+class _HttpError(Exception):
+    def __init__(self, status, message="error"):
+        super().__init__(message)
+        self.resp = _Resp(status)
+
+
+@pytest.mark.parametrize("error, kind", [
+    (_HttpError(429), OVERLOAD),
+    (_HttpError("503"), TRANSIENT),
+    (_HttpError(400, "Too many concurrent aggregations"), OVERLOAD),
+    (Exception("429 Too Many Requests"), OVERLOAD),
+    (Exception("<HttpError 503 when requesting https://earthengine...>"), TRANSIENT),
+    (Exception("status: 502"), TRANSIENT),
+    (Exception("Computation timed out."), FATAL),
+    (Exception("Too many concurrent aggregations."), OVERLOAD),
+    (Exception("Quota exceeded for project"), OVERLOAD),
+    (Exception("Backend error"), TRANSIENT),
+    (ConnectionError("peer closed"), TRANSIENT),
+    (TimeoutError(), TRANSIENT),
+    (Exception("Image.load: Image asset 'x' not found."), FATAL),
+    (EEOverloadedError("queue full"), OVERLOAD),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_numbers_in_a_message_are_not_taken_for_a_status():
+    assert classify_error(Exception("Feature 429 has no geometry; point -100.503, 25.429")) == FATAL
+
+
+def test_limit_grows_by_one_per_window_of_successes():
+    pool = AdaptiveLimiter(initial=4, maximum=10)
+    for _ in range(4):
+        pool.acquire()
+        pool.release("ok")
+    assert 4.9 < pool.limit < 5.1
+    assert pool.in_flight == 0
+
+
+def test_overload_halves_the_limit_once_per_cooldown():
+    pool = AdaptiveLimiter(initial=16, minimum=2, cooldown_s=60)
+    for _ in range(3):
+        pool.acquire()
+    for _ in range(3):
+        pool.release(OVERLOAD)
+    assert pool.limit == 8
+
+    pool = AdaptiveLimiter(initial=3, minimum=2, cooldown_s=0)
+    for _ in range(2):
+        pool.acquire()
+        pool.release(OVERLOAD)
+    assert pool.limit == 2
+
+
+def test_full_limiter_times_out_with_overloaded_error():
+    pool = AdaptiveLimiter(initial=1)
+    pool.acquire()
+    with pytest.raises(EEOverloadedError) as excinfo:
+        pool.acquire(timeout=0.05)
+    assert excinfo.value.retry_after >= 1
+    pool.release("ok")
+    pool.acquire(timeout=0.05)
+
+
+def _policy(retries=3):
+    return RetryPolicy(max_retries=retries, base_s=0.0, cap_s=0.0, budget_s=5.0)
+
+
+def test_call_retries_transient_failures_then_succeeds():
+    failures = [ConnectionError("reset"), Exception("503 Service Unavailable")]
+
+    def fetch():
+        if failures:
+            raise failures.pop(0)
+        return 42
+
+    pool = AdaptiveLimiter(initial=2)
+    assert limiter.call(fetch, limiter=pool, policy=_policy()) == 42
+    assert pool.in_flight == 0
+
+
+def test_call_does_not_retry_fatal_errors():
+    attempts = []
+
+    def fetch():
+        attempts.append(1)
+        raise ValueError("Invalid GeoJSON geometry")
+
+    with pytest.raises(ValueError):
+        limiter.call(fetch, limiter=AdaptiveLimiter(), policy=_policy())
+    assert attempts == [1]
+
+
+def test_persistent_overload_becomes_overloaded_error():
+    def fetch():
+        raise Exception("429 Too Many Requests")
+
+    with pytest.raises(EEOverloadedError):
+        limiter.call(fetch, limiter=AdaptiveLimiter(cooldown_s=0), policy=_policy(retries=2))
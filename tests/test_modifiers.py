@@ -0,0 +1,73 @@
+# tests/test_modifiers.py
+#
+# Attribute modifiers of the residential and green-area presets, on scalars and
+# broadcast arrays, and the /geo/sweep grids built from them.
+#
+# Run from the repository root: python -m pytest tests
+
+import numpy as np
+import pytest
+
+from utils import modifiers
+
+
+def test_residential_extremes():
+    ndvi, lst, aq = modifiers.residential(1000, 20000, 0.0)
+    assert (float(ndvi), float(lst), float(aq)) == pytest.approx((-0.12, 4.5, 25.0))
+    ndvi, lst, aq = modifiers.residential(0, 0, 1.0)
+    assert (float(ndvi), float(lst), float(aq)) == pytest.approx((0.0, -5.0, -5.0))
+
+
+def test_values_outside_the_unit_range_are_clamped():
+    assert modifiers.residential(5000, 1e6, -1)[1] == pytest.approx(modifiers.residential(1000, 20000, 0)[1])
+
+
+def test_unknown_unit_is_rejected():
+    with pytest.raises(ValueError):
+        modifiers.residential(1, 1, 1, units={"densidad": "people_per_km2"})
+
+
+def test_green_is_clipped_and_water_helps():
+    dry = modifiers.green(400, 100, 100, False)
+    wet = modifiers.green(400, 100, 100, True)
+    assert float(dry[0]) == pytest.approx(0.30)  # 0.34 before clipping
+    assert float(wet[1]) < float(dry[1])
+    assert float(wet[2]) < float(dry[2])
+
+
+def test_arrays_broadcast_like_scalar_calls():
+    densidad = np.array([0.0, 250.0, 900.0])
+    ndvi, lst, aq = np.broadcast_arrays(*modifiers.residential(densidad, 5000, 0.3))
+    assert lst.shape == (3,)
+    for i, d in enumerate(densidad):
+        assert (ndvi[i], lst[i], aq[i]) == pytest.approx(tuple(map(float, modifiers.residential(d, 5000, 0.3))))
+
+
+def test_sweep_grid_is_row_major_over_the_preset_axes():
+    result = modifiers.sweep("residential_real", {
+        "densidad": {"min": 0, "max": 1000, "steps": 3},
+        "albedo": [0.1, 0.9],
+    })
+    assert result["dims"] == ["densidad", "trafico", "albedo"]
+    assert result["shape"] == [3, 1, 2]
+    assert result["axes"]["densidad"] == [0.0, 500.0, 1000.0]
+    assert result["axes"]["trafico"] == [0]
+    assert len(result["lst_extra"]) == 6
+    # Element (1, 0, 1): densidad 500, trafico 0, albedo 0.9
+    expected = float(modifiers.residential(500, 0, 0.9)[1])
+    assert result["lst_extra"][1 * 2 + 1] == pytest.approx(expected)
+
+
+def test_sweep_water_axis_is_boolean():
+    result = modifiers.sweep("green_real", {"agua": [0, 1], "arboles": [100]})
+    assert result["axes"]["agua"] == [False, True]
+    assert result["shape"] == [1, 1, 1, 2]
+
+
+def test_sweep_rejects_unknown_presets_and_huge_grids():
+    with pytest.raises(ValueError):
+        modifiers.sweep("industrial", {})
+    with pytest.raises(ValueError):
+        modifiers.sweep("residential_real", {
+            name: {"min": 0, "max": 1, "steps": 100} for name in ("densidad", "trafico", "albedo")
+        })
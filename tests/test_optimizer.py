@@ -0,0 +1,75 @@
+# tests/test_optimizer.py
+#
+# Pareto front of the green-area design optimizer.
+#
+# Run from the repository root: python -m pytest tests
+
+import numpy as np
+
+from utils import optimizer
+
+SLOPES = optimizer.DEFAULT_SLOPES
+
+
+def test_pareto_mask_drops_only_dominated_points():
+    cost = np.array([1.0, 2.0, 2.0, 3.0, 1.0])
+    delta_lst = np.array([0.0, -1.0, -1.0, -1.0, 0.5])
+    delta_aq = np.array([0.0, -1.0, -1.0, -2.0, 0.0])
+    # 4 is worse than 0; 1 and 2 tie (neither beats the other); 3 trades cost for AQ
+    assert optimizer.pareto_mask(cost, delta_lst, delta_aq).tolist() == [True, True, True, True, False]
+
+
+def test_evaluate_costs_and_cools_with_vegetation():
+    designs = np.array([[0.0, 0.0, 0.0, 0.0], [200.0, 50.0, 50.0, 1.0]])
+    cost, delta_lst, delta_aq = optimizer.evaluate(designs, 2.0, SLOPES, optimizer.DEFAULT_COSTS)
+    assert cost[0] == 0.0
+    expected = 200 * 2 * 350.0 + 0.5 * 20000 * 12.0 + 0.5 * 20000 * 25.0 + 2 * 40000.0
+    assert np.isclose(cost[1], expected)
+    assert delta_lst[1] < delta_lst[0] and delta_aq[1] < delta_aq[0]
+
+
+def _dominated(row, rows):
+    key = lambda r: (r["cost"], r["delta_lst"], r["delta_aq"])
+    return any(
+        all(a <= b for a, b in zip(key(other), key(row))) and key(other) != key(row)
+        for other in rows
+    )
+
+
+def test_front_is_sorted_by_cost_and_non_dominated():
+    result = optimizer.optimize(1.0, SLOPES, max_front=1000)
+    front = result["front"]
+    assert len(front) > 3
+    assert [r["cost"] for r in front] == sorted(r["cost"] for r in front)
+    assert not any(_dominated(row, front) for row in front)
+    assert result["best"]["delta_lst"] == min(r["delta_lst"] for r in front)
+    assert result["evaluated"] > optimizer.COARSE_STEPS ** 3
+
+
+def test_unbounded_search_refines_a_bounded_number_of_designs():
+    # Without a budget the front has thousands of designs; only MAX_REFINED
+    # of them get a 3x3x3 neighbourhood per round (all grids x2 for water)
+    result = optimizer.optimize(2.0, SLOPES)
+    limit = 2 * (optimizer.COARSE_STEPS ** 3 + optimizer.REFINE_ROUNDS * optimizer.MAX_REFINED * 27)
+    assert result["evaluated"] <= limit
+    assert len(result["front"]) == 50
+
+
+def test_budget_limits_the_front():
+    budget = 50000.0
+    result = optimizer.optimize(1.0, SLOPES, budget=budget)
+    assert result["front"]
+    assert all(r["cost"] <= budget for r in result["front"])
+    assert result["best"]["cost"] <= budget
+
+
+def test_no_design_within_budget():
+    result = optimizer.optimize(1.0, SLOPES, budget=-1.0)
+    assert result["front"] == [] and result["best"] is None
+
+
+def test_large_fronts_are_thinned_keeping_both_ends():
+    full = optimizer.optimize(1.0, SLOPES, max_front=1000)["front"]
+    thinned = optimizer.optimize(1.0, SLOPES, max_front=5)["front"]
+    assert len(thinned) == 5
+    assert thinned[0] == full[0] and thinned[-1] == full[-1]
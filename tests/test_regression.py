@@ -0,0 +1,73 @@
+# tests/test_regression.py
+#
+# Local least squares fits of the calibrated models and their k-fold
+# cross-validated scores.
+#
+# Run from the repository root: python -m pytest tests
+
+import numpy as np
+import pytest
+
+from utils import regression
+
+COLUMNS = ["NDVI", "NDBI", "LST", "AQ"]
+
+
+def _table(n=400, noise=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    ndvi, ndbi = rng.uniform(0, 0.8, n), rng.uniform(-0.3, 0.4, n)
+    lst = 38.0 - 12.0 * ndvi + 6.0 * ndbi + rng.normal(0, noise, n)
+    aq = 55.0 - 20.0 * ndvi + rng.normal(0, noise, n)
+    return np.column_stack([ndvi, ndbi, lst, aq])
+
+
+def test_sample_table_drops_incomplete_rows():
+    result = {"features": [
+        {"properties": {"NDVI": 0.3, "NDBI": 0.1, "LST": 31.0, "AQ": 40}},
+        {"properties": {"NDVI": None, "NDBI": 0.1, "LST": 31.0, "AQ": 40}},
+        {"properties": {"NDVI": 0.5, "LST": 29.0, "AQ": 35}},
+        {"properties": {"NDVI": 0.2, "NDBI": -0.1, "LST": 33.5, "AQ": 45.5}},
+    ]}
+    table = regression.sample_table(result, COLUMNS)
+    assert table.tolist() == [[0.3, 0.1, 31.0, 40.0], [0.2, -0.1, 33.5, 45.5]]
+    assert regression.sample_table(None, COLUMNS).shape == (0, 4)
+
+
+def test_fit_recovers_the_coefficients():
+    fit = regression.fit(_table(), COLUMNS, "LST", ["NDVI", "NDBI"])
+    assert fit["coefficients"] == pytest.approx([38.0, -12.0, 6.0], abs=0.3)
+    assert fit["n"] == 400
+    assert fit["r2"] > 0.9
+    assert fit["cv"]["folds"] == regression.DEFAULT_FOLDS
+    # Out-of-fold scores are close to, and not better than, the in-sample ones
+    assert fit["cv"]["r2"] <= fit["r2"]
+    assert fit["cv"]["rmse"] == pytest.approx(0.5, abs=0.1)
+
+
+def test_cross_validation_matches_refitting_each_fold():
+    table = _table(n=60, noise=2.0, seed=3)
+    X = np.column_stack([np.ones(len(table)), table[:, 0]])
+    y = table[:, 3]
+    cv = regression.cross_validate(X, y, folds=4, seed=7)
+
+    fold = np.random.default_rng(7).permutation(len(y)) % 4
+    y_pred = np.empty_like(y)
+    for k in range(4):
+        coefs, *_ = np.linalg.lstsq(X[fold != k], y[fold != k], rcond=None)
+        y_pred[fold == k] = X[fold == k] @ coefs
+    assert cv["r2"] == pytest.approx(regression.scores(y, y_pred)["r2"])
+    assert cv["rmse"] == pytest.approx(regression.scores(y, y_pred)["rmse"])
+
+
+def test_pure_noise_scores_no_better_than_the_mean():
+    rng = np.random.default_rng(1)
+    table = np.column_stack([rng.uniform(0, 1, 200), rng.uniform(0, 1, 200), rng.normal(30, 2, 200), rng.normal(50, 5, 200)])
+    fit = regression.fit(table, COLUMNS, "AQ", ["NDVI"])
+    assert fit["cv"]["r2"] < 0.05
+
+
+def test_too_few_rows_and_constant_targets():
+    assert regression.fit(_table(n=3), COLUMNS, "LST", ["NDVI", "NDBI"]) is None
+    # More folds than rows: one row per fold
+    assert regression.cross_validate(np.ones((3, 1)), np.array([1.0, 2.0, 3.0]), folds=10)["folds"] == 3
+    assert regression.scores(np.full(5, 2.0), np.full(5, 2.0)) == {"r2": 0.0, "rmse": 0.0}
@@ -0,0 +1,92 @@
+# tests/test_responses.py
+#
+# JSON encoding, the streamed list envelope and the chunked writers, including
+# a streamed list endpoint that outlives the request's database session.
+#
+# Run from the repository root: python -m pytest tests
+
+import json
+
+import pytest
+from flask import Flask
+
+from models import Message, db
+from routers.message_router import message_bp
+from utils import responses
+from utils.responses import RowStream, dumps_bytes, iter_csv, iter_json_array, iter_ndjson
+
+
+def test_dumps_bytes_is_compact_and_sorted():
+    assert dumps_bytes({"b": 1, "a": [1.5, None, "ñ"]}) == '{"a":[1.5,null,"ñ"],"b":1}'.encode()
+
+
+def test_row_stream_pulls_the_first_row_eagerly():
+    assert RowStream([]).empty
+    stream = RowStream(iter([1, 2, 3]))
+    assert not stream.empty
+    assert list(stream) == [1, 2, 3]
+
+    def failing():
+        raise RuntimeError("query failed")
+        yield
+
+    with pytest.raises(RuntimeError):
+        RowStream(failing())
+
+
+def test_json_array_is_flushed_in_chunks():
+    chunks = list(iter_json_array(range(100), lambda i: {"id": i}, flush_bytes=64))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == [{"id": i} for i in range(100)]
+    assert list(iter_json_array([], lambda i: i)) == [b"[]"]
+
+
+def test_ndjson_has_one_row_per_line():
+    body = b"".join(iter_ndjson(range(3), lambda i: {"id": i}, flush_bytes=8))
+    assert [json.loads(line) for line in body.splitlines()] == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert list(iter_ndjson([], lambda i: i)) == []
+
+
+def test_csv_yields_the_header_before_the_first_row():
+    def rows():
+        yield ["1", 'say "hi", ok']
+        raise AssertionError("only the header and first row are consumed")
+
+    chunks = iter_csv(rows(), ("id", "content"), lambda row: row, flush_bytes=1)
+    assert next(chunks) == b"id,content\r\n"
+    assert next(chunks) == b'1,"say ""hi"", ok"\r\n'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'messages.db'}"
+    db.init_app(app)
+    app.register_blueprint(message_bp)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def test_list_streams_more_rows_than_one_chunk(app):
+    count = responses.STREAM_CHUNK_ROWS * 2 + 7
+    db.session.add_all(
+        Message(content=f"m{i}", latitude=25.0, longitude=-100.0, location="Centro")
+        for i in range(count)
+    )
+    db.session.commit()
+
+    with app.test_client().get("/messages/") as response:
+        assert response.status_code == 200
+        body = response.get_json()
+    assert body["status"] == "success"
+    assert [m["content"] for m in body["payload"]][-1] == f"m{count - 1}"
+    assert len(body["payload"]) == count
+
+
+def test_empty_list_keeps_the_envelope(app):
+    with app.test_client().get("/messages/") as response:
+        body = response.get_json()
+    assert body["payload"] == []
+    assert body["status"] == "success"
@@ -0,0 +1,67 @@
+# tests/test_startup.py
+#
+# Deferred imports and the startup import timer.
+#
+# Run from the repository root: python -m pytest tests
+
+import importlib
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from utils.startup import ImportTimer, LazyModule
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """A throwaway package `slowpkg` whose import is observable."""
+    root = tmp_path / "slowpkg"
+    root.mkdir()
+    (root / "__init__.py").write_text("import time\ntime.sleep(0.02)\nfrom . import child\nLOADED = True\n")
+    (root / "child.py").write_text("import time\ntime.sleep(0.03)\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "slowpkg"
+    for name in ("slowpkg", "slowpkg.child"):
+        sys.modules.pop(name, None)
+
+
+def test_lazy_module_imports_on_first_attribute_access(package):
+    lazy = LazyModule(package)
+    assert package not in sys.modules
+    assert lazy.LOADED is True
+    assert package in sys.modules
+    assert lazy.child.VALUE == 42
+
+
+def test_import_timer_records_nested_modules(package):
+    timer = ImportTimer().start()
+    try:
+        importlib.import_module(package)
+    finally:
+        timer.stop()
+
+    parent, child = timer.timings["slowpkg"], timer.timings["slowpkg.child"]
+    assert child["self_ms"] >= 25
+    assert parent["total_ms"] >= parent["self_ms"] + child["total_ms"] - 1
+    assert 15 <= parent["self_ms"] < child["self_ms"]
+    # The module keeps its own loader, not the timing proxy
+    assert type(sys.modules["slowpkg.child"].__loader__).__name__ != "_TimedLoader"
+    assert timer not in sys.meta_path
+
+    report = timer.report(top=5)
+    assert report["modules_imported"] == 2
+    assert report["packages"][0] == {"package": "slowpkg", "self_ms": pytest.approx(parent["self_ms"] + child["self_ms"], abs=0.05)}
+
+
+def test_blueprints_do_not_import_earth_engine_or_numpy():
+    script = textwrap.dedent("""
+        import sys
+        import routers
+        print(",".join(m for m in ("ee", "numpy", "pandas", "utils.geoprocessor") if m in sys.modules))
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,82 @@
+# tests/test_stats.py
+#
+# Message aggregates: grid cells, the upserts that keep the counts in sync and
+# the bbox filter of GET /messages/stats, on a throwaway SQLite database.
+#
+# Run from the repository root: python -m pytest tests
+
+import pytest
+from flask import Flask
+
+from models import CellTagStat, LocationStat, Message, MessageStats, Tag, TagStat, db, grid_cell
+from routers.message_router import message_bp
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'stats.db'}"
+    db.init_app(app)
+    app.register_blueprint(message_bp)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Tag(name="heat"), Tag(name="trees")])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+def _post(client, latitude, longitude, tags, location="Centro"):
+    with client.post("/messages/", json={
+        "content": "hot street", "latitude": latitude, "longitude": longitude,
+        "location": location, "tags": tags,
+    }) as response:
+        assert response.status_code == 201
+        return response.get_json()["payload"]["id"]
+
+
+def test_grid_cell_floors_negative_and_float_coordinates():
+    assert grid_cell(0.005, 0.015) == (0, 1)
+    assert grid_cell(-0.005, -0.015) == (-1, -2)
+    # 19.43 // 0.01 is 1942.0, one cell below the division that is floored
+    assert grid_cell(19.43, -99.13)[0] == 1943
+
+
+def test_repeated_writes_add_to_the_same_rows(app):
+    client = app.test_client()
+    _post(client, 19.43, -99.13, ["heat"])
+    _post(client, 19.435, -99.125, ["heat", "trees"])
+
+    counts = {stat.tag.name: stat.count for stat in TagStat.query.all()}
+    assert counts == {"heat": 2, "trees": 1}
+    assert db.session.get(LocationStat, "Centro").count == 2
+    cells = CellTagStat.query.filter_by(tag_id=Tag.query.filter_by(name="heat").one().id).all()
+    assert [(c.cell_lat, c.cell_lon, c.count) for c in cells] == [(*grid_cell(19.43, -99.13), 2)]
+
+
+def test_counting_out_removes_rows_that_reach_zero(app):
+    client = app.test_client()
+    message_id = _post(client, 19.43, -99.13, ["heat"])
+    message = db.session.get(Message, message_id)
+
+    MessageStats.record(message, -1)
+    db.session.commit()
+    assert TagStat.query.count() == 0
+    assert LocationStat.query.count() == 0
+    assert CellTagStat.query.count() == 0
+
+
+def test_bbox_on_a_cell_boundary_includes_the_message_cell(app):
+    client = app.test_client()
+    _post(client, 19.43, -99.13, ["heat"])
+    _post(client, 19.50, -99.13, ["heat"])
+
+    with client.get("/messages/stats?bbox=-99.13,19.43,-99.13,19.43") as response:
+        cells = response.get_json()["payload"]["cells"]
+    assert [(c["cell_lat"], c["cell_lon"]) for c in cells] == [grid_cell(19.43, -99.13)]
+
+
+def test_bad_bbox_is_rejected(app):
+    with app.test_client().get("/messages/stats?bbox=1,2,3") as response:
+        assert response.status_code == 400
+        assert response.get_json()["status"] == "error"
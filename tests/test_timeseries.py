@@ -0,0 +1,73 @@
+# tests/test_timeseries.py
+#
+# Month ranges of a time series request and the permanent caching of finished
+# months.
+#
+# Run from the repository root: python -m pytest tests
+
+import datetime
+
+import pytest
+
+from utils import cache, timeseries
+from utils.cache import ResultCache
+from utils.timeseries import month_ranges, parse_month
+
+
+def test_finished_months_span_the_whole_month():
+    ranges = month_ranges(parse_month("2024-11"), parse_month("2025-01"), today=datetime.date(2025, 6, 1))
+    assert ranges == [
+        ("2024-11", "2024-11-01", "2024-12-01", True),
+        ("2024-12", "2024-12-01", "2025-01-01", True),
+        ("2025-01", "2025-01-01", "2025-02-01", True),
+    ]
+
+
+def test_current_month_ends_at_the_data_lag_and_later_months_are_left_out():
+    today = datetime.date(2025, 6, 20)
+    ranges = month_ranges(parse_month("2025-05"), parse_month("2025-08"), today=today)
+    assert ranges == [
+        ("2025-05", "2025-05-01", "2025-06-01", True),
+        ("2025-06", "2025-06-01", "2025-06-13", False),
+    ]
+
+
+def test_month_still_within_the_lag_is_not_finished():
+    # June 3rd: the last available day is May 27th
+    ranges = month_ranges(parse_month("2025-05"), parse_month("2025-06"), today=datetime.date(2025, 6, 3))
+    assert ranges == [("2025-05", "2025-05-01", "2025-05-27", False)]
+
+
+def test_bad_month_is_rejected():
+    with pytest.raises(ValueError):
+        parse_month("2025-13")
+
+
+class _Analyzer:
+    latitude, longitude, buffer = 25.67, -100.31, 5000
+
+    def __init__(self):
+        self.requested = []
+
+    def monthly_means(self, layer, ranges):
+        self.requested.append([start for start, _ in ranges])
+        return [float(start[5:7]) for start, _ in ranges]
+
+
+def test_finished_months_are_computed_once(tmp_path, monkeypatch):
+    results = ResultCache(str(tmp_path / "ee_cache.db"))
+    monkeypatch.setattr(cache, "get_cache", lambda: results)
+    analyzer = _Analyzer()
+    start, end = parse_month("2024-01"), parse_month("2024-03")
+
+    first = timeseries.monthly_series(analyzer, "heat", start, end)
+    assert [(p["month"], p["value"], p["final"]) for p in first] == [
+        ("2024-01", 1.0, True), ("2024-02", 2.0, True), ("2024-03", 3.0, True),
+    ]
+
+    wider = timeseries.monthly_series(analyzer, "heat", start, parse_month("2024-04"))
+    assert [p["value"] for p in wider] == [1.0, 2.0, 3.0, 4.0]
+    assert analyzer.requested == [
+        ["2024-01-01", "2024-02-01", "2024-03-01"],
+        ["2024-04-01"],
+    ]
@@ -1,8 +1,19 @@
-
 # utils/__init__.py
 #
 # This module exposes utility classes and functions for use throughout the application.
+# The geo utilities are resolved on first access so that importing a light helper
+# (e.g. utils.responses) does not pull in Earth Engine.
+
+import importlib
+
+_LAZY_EXPORTS = {
+    "GeoAnalytics": ".geoprocessor",  # Geospatial processing utility class
+    "get_wind_speed": ".wind",  # Function to retrieve wind speed data from Google Earth Engine
+}
 
-from .geoprocessor import GeoAnalytics  # Geospatial processing utility class
 
-from .wind import get_wind_speed  # Function to retrieve wind speed data from Google Earth Engine
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,288 @@
+# utils/atlas.py
+#
+# Precomputed KPI atlas. For each configured city (data/warm_regions.json) the
+# temperature, NDVI and AQ means are computed on hexagonal grids at a few
+# resolutions, with one `reduceRegions` round trip per resolution, and stored in
+# instance/atlas/<city>.json. Area KPIs inside a city are then answered locally
+# by averaging the cells whose centers fall inside the polygon, without calling
+# Earth Engine; /geo/area-kpis falls back to an exact reduction when `precise`
+# is requested or no atlas covers the area.
+#
+# Built with `flask build-atlas`; rebuild it periodically (ATLAS_MAX_AGE_DAYS).
+
+import datetime
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+
+from . import ee_client, metrics
+from .geometry import M_PER_DEG_LAT, M_PER_DEG_LON, point_in_polygon
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ATLAS_DIR = os.getenv("ATLAS_DIR", os.path.join(BASE_DIR, "instance", "atlas"))
+ATLAS_MAX_AGE_DAYS = int(os.getenv("ATLAS_MAX_AGE_DAYS", "7"))
+
+# (hexagon edge, reduction scale) in metres, finest first. Large regions
+# coarsen them (see resolutions_for) so each grid fits in one getInfo.
+RESOLUTIONS = ((200, 30), (600, 100), (1800, 300))
+
+# Cells needed inside a polygon before a resolution is used
+MIN_CELLS = 3
+
+_BANDS = {
+    "avg_surface_temp": "LST_Day_1km",
+    "avg_NVDI": "NDVI",
+    "avg_air_quality": "AQ_Composite_0_100",
+}
+
+
+def _slug(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+
+
+def atlas_path(name):
+    return os.path.join(ATLAS_DIR, f"{_slug(name)}.json")
+
+
+# --- Hexagonal grid ---
+
+def hex_grid(latitude, longitude, radius_m, edge_m):
+    """
+    Pointy-top hexagons of edge `edge_m` covering a circle of `radius_m`
+    around the point. Returns a list of (cell id, [lon, lat] center, ring).
+    """
+    kx = M_PER_DEG_LON * math.cos(math.radians(latitude))
+
+    def to_lonlat(x, y):
+        return [round(longitude + x / kx, 7), round(latitude + y / M_PER_DEG_LAT, 7)]
+
+    corners = [
+        (edge_m * math.cos(math.radians(60 * k + 30)), edge_m * math.sin(math.radians(60 * k + 30)))
+        for k in range(6)
+    ]
+    width, height = math.sqrt(3) * edge_m, 1.5 * edge_m
+    rows = int(radius_m / height) + 1
+    cells = []
+    for r in range(-rows, rows + 1):
+        cols = int(radius_m / width) + 2
+        for q in range(-cols - abs(r), cols + 1):
+            x, y = width * (q + r / 2), height * r
+            if math.hypot(x, y) > radius_m + edge_m:
+                continue
+            ring = [to_lonlat(x + cx, y + cy) for cx, cy in corners]
+            cells.append((f"{q}:{r}", to_lonlat(x, y), [*ring, ring[0]]))
+    return cells
+
+
+def resolutions_for(buffer_m):
+    """
+    RESOLUTIONS for a region of radius `buffer_m`, with each edge grown (and
+    its reduction scale with it) until the grid has at most
+    ee_client.MAX_DOWNLOAD_FEATURES cells. Resolutions that end up no finer
+    than a previous one are dropped.
+    """
+    limit = ee_client.MAX_DOWNLOAD_FEATURES
+    # Hexagon area is 3·√3/2·edge², so this edge roughly fills the circle with `limit` cells
+    smallest_edge = buffer_m * math.sqrt(math.pi / (1.5 * math.sqrt(3) * limit))
+    resolutions = []
+    for base_edge, base_scale in RESOLUTIONS:
+        edge_m = max(base_edge, math.ceil(smallest_edge))
+        while len(hex_grid(0.0, 0.0, buffer_m, edge_m)) > limit:
+            edge_m = math.ceil(edge_m * 1.05)
+        if resolutions and edge_m <= resolutions[-1][0]:
+            continue
+        resolutions.append((edge_m, round(base_scale * edge_m / base_edge)))
+    return resolutions
+
+
+# --- Build ---
+
+def build_atlas(region):
+    """
+    Compute and store the atlas of one region ({"name", "latitude",
+    "longitude", "buffer"}). One Earth Engine round trip per resolution; a
+    resolution that fails is left out, and the build fails only when none
+    succeeds.
+    """
+    import ee
+
+    from .geoprocessor import GeoAnalytics
+    from .limiter import EEOverloadedError
+
+    latitude, longitude = float(region["latitude"]), float(region["longitude"])
+    buffer = int(region["buffer"])
+    analyzer = GeoAnalytics(latitude=latitude, longitude=longitude, buffer=buffer)
+    image = analyzer.cube.select(*_BANDS.values())
+
+    resolutions = {}
+    for edge_m, scale_m in resolutions_for(buffer):
+        cells = hex_grid(latitude, longitude, buffer, edge_m)
+        collection = ee.FeatureCollection({
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": {"cell": cell_id}}
+                for cell_id, _, ring in cells
+            ],
+        })
+        try:
+            result = ee_client.get_info(
+                image.reduceRegions(collection=collection, reducer=ee.Reducer.mean(), scale=scale_m, tileScale=4),
+                "reduceRegions",
+            ) or {}
+        except EEOverloadedError:
+            raise
+        except Exception as e:
+            print(f"Warning: atlas {region['name']} skips {edge_m} m cells: {e}")
+            continue
+        values = {
+            feature["properties"].get("cell"): feature["properties"]
+            for feature in result.get("features", [])
+        }
+        resolutions[str(edge_m)] = [
+            {
+                "cell": cell_id,
+                "center": center,
+                **{key: values.get(cell_id, {}).get(band) for key, band in _BANDS.items()},
+            }
+            for cell_id, center, _ in cells
+        ]
+        print(f"🗺️ Atlas {region['name']}: {len(cells)} cells at {edge_m} m")
+
+    if not resolutions:
+        raise RuntimeError(f"No atlas resolution of {region['name']} could be computed")
+
+    atlas = {
+        "name": region["name"],
+        "latitude": latitude,
+        "longitude": longitude,
+        "buffer": buffer,
+        "built_on": datetime.date.today().isoformat(),
+        "resolutions": resolutions,
+    }
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    tmp_path = atlas_path(region["name"]) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(atlas, fh, ensure_ascii=False)
+    os.replace(tmp_path, atlas_path(region["name"]))
+    return atlas
+
+
+# --- Query ---
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _load_atlases():
+    """Atlases on disk, reloaded when their file changes."""
+    if not os.path.isdir(ATLAS_DIR):
+        return []
+    atlases = []
+    with _loaded_lock:
+        for filename in sorted(os.listdir(ATLAS_DIR)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(ATLAS_DIR, filename)
+            mtime = os.path.getmtime(path)
+            cached = _loaded.get(path)
+            if cached is None or cached[0] != mtime:
+                try:
+                    with open(path, encoding="utf-8") as fh:
+                        cached = (mtime, json.load(fh))
+                except (OSError, ValueError) as e:
+                    print(f"Warning: could not read atlas {path}: {e}")
+                    continue
+                _loaded[path] = cached
+            atlases.append(cached[1])
+    return atlases
+
+
+def _polygons(geojson):
+    kind = geojson.get("type")
+    if kind == "Feature":
+        return _polygons(geojson.get("geometry") or {})
+    if kind == "Polygon":
+        return [geojson["coordinates"]]
+    if kind == "MultiPolygon":
+        return list(geojson["coordinates"])
+    return []
+
+
+def _distance_m(lat1, lon1, lat2, lon2):
+    kx = M_PER_DEG_LON * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot((lon2 - lon1) * kx, (lat2 - lat1) * M_PER_DEG_LAT)
+
+
+def find_atlas(geojson):
+    """
+    Return a fresh atlas whose area contains every vertex of the polygon, or
+    None.
+    """
+    vertices = [p for polygon in _polygons(geojson) for ring in polygon for p in ring]
+    if not vertices:
+        return None
+    oldest = (datetime.date.today() - datetime.timedelta(days=ATLAS_MAX_AGE_DAYS)).isoformat()
+    for atlas in _load_atlases():
+        if atlas.get("built_on", "") < oldest:
+            continue
+        if all(
+            _distance_m(atlas["latitude"], atlas["longitude"], lat, lon) <= atlas["buffer"]
+            for lon, lat in vertices
+        ):
+            return atlas
+    return None
+
+
+def _mean(cells, key):
+    values = [cell[key] for cell in cells if cell.get(key) is not None]
+    return sum(values) / len(values) if values else None
+
+
+def query_atlas(geojson, atlas):
+    """
+    Area KPIs from the finest resolution with at least MIN_CELLS cell centers
+    inside the polygon. Polygons smaller than that use the finest cell nearest
+    to their first vertex.
+    """
+    polygons = _polygons(geojson)
+    edges = sorted(int(edge) for edge in atlas["resolutions"])
+    chosen, resolution = [], None
+    for edge_m in edges:
+        cells = [
+            cell for cell in atlas["resolutions"][str(edge_m)]
+            if any(point_in_polygon(cell["center"], rings) for rings in polygons)
+        ]
+        if len(cells) >= MIN_CELLS:
+            chosen, resolution = cells, edge_m
+            break
+        if cells and not chosen:
+            chosen, resolution = cells, edge_m
+
+    if not chosen and edges:
+        lon, lat = polygons[0][0][0]
+        finest = atlas["resolutions"][str(edges[0])]
+        if finest:
+            chosen = [min(finest, key=lambda c: _distance_m(lat, lon, c["center"][1], c["center"][0]))]
+            resolution = edges[0]
+
+    return {
+        **{key: _mean(chosen, key) for key in _BANDS},
+        "source": "atlas",
+        "atlas": atlas["name"],
+        "built_on": atlas["built_on"],
+        "resolution_m": resolution,
+        "cells": len(chosen),
+    }
+
+
+def area_kpis(geojson):
+    """
+    Area KPIs from a covering atlas, or None when there is none.
+    """
+    atlas = find_atlas(geojson)
+    metrics.record_cache("atlas", atlas is not None)
+    return query_atlas(geojson, atlas) if atlas else None
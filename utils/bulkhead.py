@@ -0,0 +1,119 @@
+# utils/bulkhead.py
+#
+# Bulkheads: separate concurrency limits for groups of blueprints, so slow geo
+# requests (up to minutes of Earth Engine work) cannot take every worker thread
+# and leave the cheap CRUD endpoints waiting. Each blueprint group gets a pool
+# of slots per process; a request waits at most the pool's queue timeout for a
+# slot and is otherwise answered 503 with a Retry-After header.
+#
+# Pools only isolate anything when a worker serves several requests at once:
+# gunicorn runs the gthread worker (see Dockerfile), and the geo pool must be
+# smaller than the threads per worker so some threads are always left for CRUD.
+
+import math
+import os
+import threading
+import time
+
+from flask import g
+
+from . import metrics
+from .responses import retry_later_response
+
+
+class BulkheadFullError(Exception):
+    """
+    No slot of a bulkhead freed up within its queue timeout.
+    """
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """
+    Fixed pool of concurrent requests with a bounded wait for a slot.
+    """
+
+    def __init__(self, name, max_concurrent, queue_timeout_s, retry_after_s=None):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self.retry_after_s = retry_after_s or max(1, math.ceil(self.queue_timeout_s) or 1)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a slot, waiting up to the queue timeout. Raises BulkheadFullError.
+        """
+        start = time.perf_counter()
+        deadline = start + self.queue_timeout_s
+        with self._cond:
+            while self.in_flight >= self.max_concurrent:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    metrics.BULKHEAD_REJECTED.labels(pool=self.name).inc()
+                    raise BulkheadFullError(
+                        f"Too many {self.name} requests in progress, try again later",
+                        retry_after=self.retry_after_s,
+                    )
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            metrics.BULKHEAD_IN_FLIGHT.labels(pool=self.name).set(self.in_flight)
+        metrics.BULKHEAD_QUEUE_WAIT_SECONDS.labels(pool=self.name).observe(time.perf_counter() - start)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            metrics.BULKHEAD_IN_FLIGHT.labels(pool=self.name).set(self.in_flight)
+            self._cond.notify()
+
+
+def install(blueprint, bulkhead):
+    """
+    Run every request of `blueprint` inside `bulkhead`. The slot is released
+    when the response is closed, i.e. after the last byte of a streamed
+    response (teardown runs as soon as the view returns, before the body).
+    """
+
+    @blueprint.before_request
+    def _enter_bulkhead():
+        try:
+            bulkhead.acquire()
+        except BulkheadFullError as e:
+            return retry_later_response(str(e), e.retry_after)
+        g.bulkhead = bulkhead
+
+    @blueprint.after_request
+    def _release_on_close(response):
+        held = g.pop("bulkhead", None)
+        if held is not None:
+            response.call_on_close(held.release)
+        return response
+
+    @blueprint.teardown_request
+    def _leave_bulkhead(exc=None):
+        # Only still held when no response was produced (unhandled error)
+        held = g.pop("bulkhead", None)
+        if held is not None:
+            held.release()
+
+
+def from_env(name, default_size, default_timeout_s):
+    """
+    Bulkhead sized by <NAME>_MAX_CONCURRENCY and <NAME>_QUEUE_TIMEOUT_S.
+    """
+    prefix = name.upper()
+    return Bulkhead(
+        name,
+        int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(default_size))),
+        float(os.getenv(f"{prefix}_QUEUE_TIMEOUT_S", str(default_timeout_s))),
+    )
+
+
+# Per-process pools. The geo pool stays below the gunicorn threads per worker
+# (8), so CRUD requests always find a free thread.
+GEO = from_env("geo", 4, 1)
+CRUD = from_env("crud", 8, 5)
@@ -0,0 +1,122 @@
+# utils/cache.py
+#
+# Persistent cache of Earth Engine results, shared by all workers of a host
+# through a small SQLite file (instance/ee_cache.db by default, EE_CACHE_PATH to
+# change it). Entries are keyed by the serialized expression (see
+# utils/coalesce.expression_key), so a result is reused only for exactly the same
+# computation; the base layers pin their dates to the day, which makes the keys
+# roll over daily on their own. Map ids expire on the Earth Engine side, so they
+# get a shorter TTL.
+#
+# The cache is filled by requests and ahead of time by `flask warm-cache`
+# (see utils/warming.py). Expired entries are deleted at most every
+# PURGE_INTERVAL_S by the next write, and before each warming run.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import metrics
+
+DEFAULT_TTL_S = int(os.getenv("EE_CACHE_TTL_S", str(24 * 3600)))
+MAP_ID_TTL_S = int(os.getenv("EE_CACHE_MAP_TTL_S", str(4 * 3600)))
+# Results over closed periods (e.g. finished months) never change
+IMMUTABLE_TTL_S = 10 * 365 * 24 * 3600
+# Expired entries are deleted by the first write after this interval
+PURGE_INTERVAL_S = int(os.getenv("EE_CACHE_PURGE_INTERVAL_S", "3600"))
+
+
+class ResultCache:
+    """
+    Key/value store with per-entry expiry. Values must be JSON serializable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._next_purge = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, cache="ee_results"):
+        """
+        Return the cached value for `key`, or None when missing or expired.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Warning: cache read failed: {e}")
+            row = None
+
+        hit = row is not None and row[1] > time.time()
+        metrics.record_cache(cache, hit)
+        return json.loads(row[0]) if hit else None
+
+    def set(self, key, value, ttl_s=DEFAULT_TTL_S):
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_s),
+            )
+            self._purge_if_due()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Warning: cache write failed: {e}")
+
+    def _purge_if_due(self):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL_S
+        removed = self.purge_expired()
+        if removed:
+            print(f"🧹 Result cache: {removed} expired entries removed")
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide result cache, or None when EE_CACHE=0.
+    """
+    global _cache
+    if os.getenv("EE_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                base_dir = os.path.dirname(os.path.dirname(__file__))
+                _cache = ResultCache(
+                    os.getenv("EE_CACHE_PATH", os.path.join(base_dir, "instance", "ee_cache.db"))
+                )
+    return _cache
@@ -0,0 +1,202 @@
+# utils/coalesce.py
+#
+# In-flight de-duplication of identical Earth Engine computations. When several
+# requests evaluate the same expression at the same time (e.g. many users opening
+# the same region), the first caller runs it and the others wait for its result.
+#
+# - Threads of one worker share futures (always on, EE_COALESCE=0 disables it).
+# - With EE_COALESCE_PROCESSES=1, gunicorn workers on the same host also
+#   coalesce through lock files in EE_COALESCE_DIR: the worker holding the lock
+#   computes and publishes the result, the others wait on the lock and read it.
+#
+# This is not a cache: a result is only handed to callers that were waiting
+# while it was being computed.
+
+import concurrent.futures
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread-level coalescing only
+    fcntl = None
+
+# Lock and result files older than this are removed (results only serve the
+# workers that were waiting for them; requests time out well before this)
+RESULT_TTL_S = 300
+
+
+def expression_key(call: str, obj, extra=None) -> str:
+    """
+    Key an Earth Engine object by its serialized expression graph. Returns None
+    when the object cannot be serialized (it is then never coalesced).
+    """
+    try:
+        serialized = obj.serialize()
+    except Exception:
+        return None
+    digest = hashlib.sha256(call.encode())
+    digest.update(serialized.encode() if isinstance(serialized, str) else serialized)
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class Coalescer:
+    """
+    Share one in-flight computation per key between the threads of a process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def run(self, key, compute, call="getInfo"):
+        if key is None:
+            return compute()
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+
+        if not leader:
+            metrics.EE_COALESCED.labels(call=call, scope="thread").inc()
+            # Every caller gets its own copy, callers may mutate the result
+            return copy.deepcopy(future.result())
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            # The future keeps the original for waiters still reading it
+            return copy.deepcopy(result)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+class FileCoalescer:
+    """
+    Share one in-flight computation per key between processes of the same host,
+    using an exclusive flock on a per-key lock file. Results are exchanged as
+    JSON, so `dumps`/`loads` convert non-JSON results (e.g. map ids).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        return (
+            os.path.join(self.directory, f"{key}.lock"),
+            os.path.join(self.directory, f"{key}.json"),
+        )
+
+    def run(self, key, compute, call="getInfo", dumps=None, loads=None):
+        if key is None or fcntl is None:
+            return compute()
+
+        lock_path, result_path = self._paths(key)
+        waited_since = time.time()
+        with open(lock_path, "a") as lock_file:
+            # Mark the lock file as in use so _cleanup leaves it alone
+            os.utime(lock_path)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is computing it: wait for it to finish
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    result = self._read(result_path, waited_since, loads)
+                    if result is not None:
+                        metrics.EE_COALESCED.labels(call=call, scope="process").inc()
+                        return result["value"]
+                    # The other worker failed, compute it ourselves
+                    result = compute()
+                    self._write(result_path, dumps(result) if dumps else result)
+                    return result
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+            try:
+                result = compute()
+                self._write(result_path, dumps(result) if dumps else result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._cleanup()
+
+    @staticmethod
+    def _read(path, not_before, loads):
+        try:
+            if os.path.getmtime(path) < not_before:
+                return None
+            with open(path) as fh:
+                value = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        return {"value": loads(value) if loads else value}
+
+    def _write(self, path, value):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                json.dump(value, fh)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: could not share EE result between workers: {e}")
+
+    def _cleanup(self):
+        cutoff = time.time() - RESULT_TTL_S
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith((".json", ".lock", ".tmp")) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+
+_threads = Coalescer()
+_processes = None
+_processes_lock = threading.Lock()
+
+
+def _process_coalescer():
+    global _processes
+    if _processes is None:
+        with _processes_lock:
+            if _processes is None:
+                base_dir = os.path.dirname(os.path.dirname(__file__))
+                _processes = FileCoalescer(
+                    os.getenv("EE_COALESCE_DIR", os.path.join(base_dir, "instance", "ee_coalesce"))
+                )
+    return _processes
+
+
+def coalesce(key, compute, call="getInfo", dumps=None, loads=None):
+    """
+    Run `compute` once for all concurrent callers with the same key.
+    """
+    if os.getenv("EE_COALESCE", "1") == "0":
+        return compute()
+
+    if os.getenv("EE_COALESCE_PROCESSES", "0") == "1":
+        processes = _process_coalescer()
+        return _threads.run(
+            key,
+            lambda: processes.run(key, compute, call=call, dumps=dumps, loads=loads),
+            call=call,
+        )
+    return _threads.run(key, compute, call=call)
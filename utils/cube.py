@@ -0,0 +1,93 @@
+# utils/cube.py
+#
+# Analysis cube: the base layers of one region and epoch (LST, NDVI, NDBI, AQ
+# and the NDVI p10/p50/p90 of the preset month) as the bands of one image. The
+# cube is built once per process and shared by every GeoAnalytics of the same
+# region and day, so the Sentinel-2 composite, the monthly NDVI percentiles and
+# the five Sentinel-5P collections are not rebuilt for each request, preset or
+# model fit. Consumers take single bands (KPIs, tiles) or band stacks
+# (calibration samples, atlas reductions) from the same expressions.
+
+import os
+import threading
+from collections import OrderedDict
+
+from . import metrics
+
+BANDS = (
+    "LST_Day_1km",
+    "NDVI",
+    "NDBI",
+    "AQ_Composite_0_100",
+    "NDVI_p10",
+    "NDVI_p50",
+    "NDVI_p90",
+)
+
+# Cubes kept in memory (regions x days); the images are only expressions
+MAX_CUBES = int(os.getenv("ANALYSIS_CUBE_MAX", "64"))
+
+
+class AnalysisCube:
+    """
+    Base layers of one region and epoch, by band name.
+    """
+
+    def __init__(self, layers, stacks=None, region=None):
+        self.layers = layers
+        # Geometry the layers were built for, shared so expressions stay identical
+        self.region = region
+        # Band stacks already available as one image, e.g. the NDVI percentiles
+        self._stacks = dict(stacks or {})
+        self._lock = threading.Lock()
+
+    def band(self, name):
+        return self.layers[name]
+
+    def select(self, *names):
+        """Multi-band image of the given bands (all of them by default)."""
+        names = names or BANDS
+        with self._lock:
+            image = self._stacks.get(names)
+            if image is None:
+                image = self.layers[names[0]]
+                for name in names[1:]:
+                    image = image.addBands(self.layers[name])
+                self._stacks[names] = image
+        return image
+
+    @property
+    def image(self):
+        return self.select()
+
+
+_cubes = OrderedDict()
+_cubes_lock = threading.Lock()
+
+
+def get_cube(key, build):
+    """
+    Cube of `key` (region and epoch), built with `build()` -> ({band: image},
+    {band names: stacked image}, region) the first time it is needed. Least recently
+    used cubes are dropped past MAX_CUBES.
+    """
+    with _cubes_lock:
+        cube = _cubes.get(key)
+        if cube is not None:
+            _cubes.move_to_end(key)
+    metrics.record_cache("cube", cube is not None)
+    if cube is not None:
+        return cube
+
+    cube = AnalysisCube(*build())
+    with _cubes_lock:
+        cube = _cubes.setdefault(key, cube)
+        _cubes.move_to_end(key)
+        while len(_cubes) > MAX_CUBES:
+            _cubes.popitem(last=False)
+    return cube
+
+
+def clear():
+    with _cubes_lock:
+        _cubes.clear()
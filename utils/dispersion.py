@@ -0,0 +1,203 @@
+# utils/dispersion.py
+#
+# Gaussian plume dispersion of industrial emissions for the industrial preset.
+# Each facility is a continuous point source (its reported CO2e per year) in a
+# uniform wind (the ERA5 monthly mean u/v at the analysis point); the
+# ground-level concentration is computed on a square grid around the analysis
+# point with NumPy. A few sources are evaluated directly; many sources are
+# rasterized and convolved with the plume of a unit source by FFT, so 100
+# sources on a 1000 x 1000 grid cost about as much as one.
+#
+# The field is block-averaged to a small grid, turned into AQ index points on a
+# capped log scale and cropped to the plume; GeoAnalytics sends it to Earth
+# Engine as the AQ delta of the simulation.
+
+import math
+import os
+
+from .geometry import M_PER_DEG_LAT, M_PER_DEG_LON
+from .startup import LazyModule
+
+# NumPy is only loaded when a plume is first computed
+np = LazyModule("numpy")
+
+# Briggs rural dispersion coefficients per Pasquill stability class:
+# sigma(x) = a * x * (1 + b * x) ** c, with x the downwind distance in metres
+_SIGMA_Y = {
+    "A": (0.22, 1e-4, -0.5),
+    "B": (0.16, 1e-4, -0.5),
+    "C": (0.11, 1e-4, -0.5),
+    "D": (0.08, 1e-4, -0.5),
+    "E": (0.06, 1e-4, -0.5),
+    "F": (0.04, 1e-4, -0.5),
+}
+_SIGMA_Z = {
+    "A": (0.20, 0.0, 0.0),
+    "B": (0.12, 0.0, 0.0),
+    "C": (0.08, 2e-4, -0.5),
+    "D": (0.06, 1.5e-3, -0.5),
+    "E": (0.03, 3e-4, -1.0),
+    "F": (0.016, 3e-4, -1.0),
+}
+STABILITY_CLASSES = tuple(_SIGMA_Y)
+DEFAULT_STABILITY = os.getenv("PLUME_STABILITY", "D")
+
+# GHGRP reports no stack heights: one effective release height for every source
+STACK_HEIGHT_M = float(os.getenv("PLUME_STACK_HEIGHT_M", "30"))
+# The plume formula diverges in calm air
+MIN_WIND_M_S = 0.5
+
+# Grid the field is computed on, and the grid sent to Earth Engine
+GRID_CELLS = int(os.getenv("PLUME_GRID_CELLS", "1000"))
+IMAGE_CELLS = int(os.getenv("PLUME_IMAGE_CELLS", "64"))
+DEFAULT_HALF_SIZE_M = 5000
+
+# AQ points of a CO2e concentration: +AQ_POINTS_PER_DECADE per tenfold increase
+# over AQ_REF_G_M3, capped per cell. Peak cells of GHGRP facilities span three
+# orders of magnitude (about 0.08 g/m3 for the median facility, 6 g/m3 for the
+# top 1 %), which a linear scale either flattens or saturates: on this scale the
+# median facility peaks near 47 points and only cells over 10 g/m3 reach the cap.
+AQ_REF_G_M3 = float(os.getenv("PLUME_AQ_REF_G_M3", "0.001"))
+AQ_POINTS_PER_DECADE = float(os.getenv("PLUME_AQ_POINTS_PER_DECADE", "25"))
+AQ_MAX_POINTS = 100.0
+# Smaller deltas are not visible and would only widen the grid sent to Earth Engine
+AQ_MIN_POINTS = 0.5
+
+# Up to this many sources the field is evaluated directly (exact positions)
+DIRECT_MAX_SOURCES = 8
+
+SECONDS_PER_YEAR = 365.25 * 86400
+
+
+def rate_g_s(tons_per_year):
+    """Emission rate in g/s of an annual emission in metric tons."""
+    return tons_per_year * 1e6 / SECONDS_PER_YEAR
+
+
+def _sigma(x, coefficients):
+    a, b, c = coefficients
+    return a * x * (1 + b * x) ** c
+
+
+def kernel(dx, dy, u, v, height=STACK_HEIGHT_M, stability=DEFAULT_STABILITY):
+    """
+    Ground-level concentration (g/m3) of a 1 g/s source at offsets `dx` (east)
+    and `dy` (north), in metres, for a wind of components `u` and `v` (m/s).
+    Ground reflection included; zero upwind.
+    """
+    if stability not in _SIGMA_Y:
+        raise ValueError(f"Unknown stability class: {stability}")
+    norm = math.hypot(u, v)
+    ex, ey = (u / norm, v / norm) if norm > 0 else (1.0, 0.0)
+    speed = max(norm, MIN_WIND_M_S)
+
+    x = dx * ex + dy * ey
+    y = dy * ex - dx * ey
+    downwind = x > 0
+    x = np.where(downwind, x, 1.0)
+    sigma_y = _sigma(x, _SIGMA_Y[stability])
+    sigma_z = _sigma(x, _SIGMA_Z[stability])
+    c = np.exp(-0.5 * (y / sigma_y) ** 2 - 0.5 * (height / sigma_z) ** 2) / (math.pi * speed * sigma_y * sigma_z)
+    return np.where(downwind, c, 0.0)
+
+
+class PlumeField:
+    """
+    Ground-level concentration (g/m3) on a square lon/lat grid, row 0 north.
+    """
+
+    def __init__(self, values, west, south, east, north):
+        self.values = values
+        self.west, self.south, self.east, self.north = west, south, east, north
+
+    def aq_delta(self, cells=IMAGE_CELLS, decimals=2):
+        """
+        AQ index points of the field (log scale, see AQ_REF_G_M3), block-averaged
+        to `cells` x `cells`, rounded and cropped to the cells the plume reaches.
+        Returns the grid (possibly empty) and its (west, south, east, north) bounds.
+        """
+        size = self.values.shape[0]
+        cells = max(1, min(cells, size))
+        block = size // cells
+        values = self.values[: block * cells, : block * cells].astype(float)
+        means = values.reshape(cells, block, cells, block).mean(axis=(1, 3))
+        points = np.minimum(AQ_POINTS_PER_DECADE * np.log10(1.0 + means / AQ_REF_G_M3), AQ_MAX_POINTS)
+        points[points < AQ_MIN_POINTS] = 0.0
+        grid = np.round(points, decimals)
+
+        # Most of the grid is upwind or too far away: only the plume is sent
+        rows = np.flatnonzero(grid.any(axis=1))
+        cols = np.flatnonzero(grid.any(axis=0))
+        if not len(rows):
+            return grid[:0, :0], (self.west, self.south, self.east, self.north)
+        dlon = (self.east - self.west) / cells
+        dlat = (self.north - self.south) / cells
+        bounds = (
+            float(self.west + cols[0] * dlon),
+            float(self.north - (rows[-1] + 1) * dlat),
+            float(self.west + (cols[-1] + 1) * dlon),
+            float(self.north - rows[0] * dlat),
+        )
+        return grid[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1], bounds
+
+
+def _direct(rates, sx, sy, xs, ys, u, v, height, stability):
+    values = np.zeros((len(ys), len(xs)), dtype=np.float32)
+    for rate, x0, y0 in zip(rates, sx, sy):
+        values += rate * kernel(xs[None, :] - x0, ys[:, None] - y0, u, v, height, stability)
+    return values
+
+
+def _convolved(rates, sx, sy, half_size_m, cells, u, v, height, stability):
+    """Sources snapped to their cells, convolved with the unit plume by FFT."""
+    cell_m = 2 * half_size_m / cells
+    cols = np.clip(np.floor((sx + half_size_m) / cell_m).astype(int), 0, cells - 1)
+    rows = np.clip(np.floor((half_size_m - sy) / cell_m).astype(int), 0, cells - 1)
+    emissions = np.zeros((cells, cells), dtype=np.float32)
+    np.add.at(emissions, (rows, cols), rates)
+
+    # Unit plume at every offset between two cells, (2 cells - 1) per side
+    offsets = (np.arange(-(cells - 1), cells) * cell_m).astype(np.float32)
+    unit = kernel(offsets[None, :], -offsets[:, None], u, v, height, stability)
+
+    shape = (2 * cells, 2 * cells)
+    spectrum = np.fft.rfft2(emissions, s=shape) * np.fft.rfft2(unit, s=shape)
+    full = np.fft.irfft2(spectrum, s=shape)
+    return np.maximum(full[cells - 1 : 2 * cells - 1, cells - 1 : 2 * cells - 1], 0.0)
+
+
+def field(sources, u, v, center, half_size_m=DEFAULT_HALF_SIZE_M, cells=GRID_CELLS,
+          height=STACK_HEIGHT_M, stability=DEFAULT_STABILITY):
+    """
+    Plume of `sources` ((latitude, longitude, tCO2e per year) each) on a
+    `cells` x `cells` grid spanning `half_size_m` around `center` (latitude,
+    longitude). Sources outside the grid still reach it when they are upwind.
+    """
+    lat0, lon0 = center
+    kx = M_PER_DEG_LON * math.cos(math.radians(lat0))
+    sources = np.asarray(sources, dtype=float).reshape(-1, 3)
+    sources = sources[sources[:, 2] > 0]
+    sx = ((sources[:, 1] - lon0) * kx).astype(np.float32)
+    sy = ((sources[:, 0] - lat0) * M_PER_DEG_LAT).astype(np.float32)
+    rates = rate_g_s(sources[:, 2]).astype(np.float32)
+
+    # Cell centres in metres; float32 halves the cost of the kernel
+    cell_m = 2 * half_size_m / cells
+    xs = (-half_size_m + (np.arange(cells) + 0.5) * cell_m).astype(np.float32)
+    ys = (half_size_m - (np.arange(cells) + 0.5) * cell_m).astype(np.float32)
+
+    # Many sources inside the grid are convolved, the rest evaluated directly
+    inside = (np.abs(sx) < half_size_m) & (np.abs(sy) < half_size_m)
+    if len(rates) <= DIRECT_MAX_SOURCES:
+        inside = np.zeros(len(rates), dtype=bool)
+    values = _direct(rates[~inside], sx[~inside], sy[~inside], xs, ys, u, v, height, stability)
+    if inside.any():
+        values += _convolved(rates[inside], sx[inside], sy[inside], half_size_m, cells, u, v, height, stability)
+
+    return PlumeField(
+        values,
+        west=lon0 - half_size_m / kx,
+        south=lat0 - half_size_m / M_PER_DEG_LAT,
+        east=lon0 + half_size_m / kx,
+        north=lat0 + half_size_m / M_PER_DEG_LAT,
+    )
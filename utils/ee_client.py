@@ -0,0 +1,171 @@
+# utils/ee_client.py
+#
+# Lazy Earth Engine client. ee.Initialize runs the first time a geo feature needs
+# it instead of at import time, so CLI commands and CRUD-only processes never
+# block on the Earth Engine handshake or require GEE credentials.
+#
+# Every round trip to Earth Engine (getInfo, getMapId) goes through get_info and
+# get_map_id, which record call counts and latencies labeled by call type and by
+# the calling GeoAnalytics method (see `traced`). Identical expressions evaluated
+# concurrently are computed once (see utils/coalesce.py), and every round trip
+# runs under the adaptive concurrency limit with retries (see utils/limiter.py).
+# Results are kept in the shared result cache (see utils/cache.py).
+
+import contextvars
+import functools
+import os
+import threading
+import time
+import types
+
+import ee
+from dotenv import load_dotenv
+
+from . import cache, limiter, metrics
+from .coalesce import coalesce, expression_key
+
+load_dotenv()
+
+HIGH_VOLUME_URL = "https://earthengine-highvolume.googleapis.com"
+
+# Earth Engine refuses getInfo of a collection with more elements than this
+MAX_DOWNLOAD_FEATURES = 5000
+
+_lock = threading.Lock()
+_initialized = False
+
+
+def initialize():
+    """
+    Initialize the Earth Engine client once per process (thread-safe, idempotent).
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    with _lock:
+        if _initialized:
+            return
+
+        project_id = os.getenv("GEE_PROJECT")
+        key_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+
+        if not project_id:
+            raise ValueError("Variable 'GEE_PROJECT' is not defined, please check your env variables")
+        if not key_path:
+            raise ValueError("Variable 'GOOGLE_APPLICATION_CREDENTIALS' is not defined, please check your env variables")
+
+        try:
+            credentials = ee.ServiceAccountCredentials(None, key_file=key_path)
+
+            ee.Initialize(
+                credentials=credentials,
+                project=project_id,
+                opt_url=os.getenv("GEE_API_URL", HIGH_VOLUME_URL),
+            )
+        except Exception as e:
+            print(f"Failed to connect to GEE: {e}")
+            raise
+
+        _initialized = True
+        print("GEE LIVE")
+
+
+_current_method = contextvars.ContextVar("ee_method", default="unknown")
+
+
+def traced(func):
+    """
+    Label the Earth Engine calls made inside `func` with its name.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_method.set(func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def get_info(obj, call: str = "getInfo"):
+    """
+    Evaluate an Earth Engine object (one round trip, unless the same expression
+    is cached or already being evaluated). `call` names the kind of computation
+    being fetched: "reduceRegion", "sample" or plain "getInfo".
+    """
+    return _evaluate(
+        expression_key(call, obj),
+        lambda: _round_trip(call, obj.getInfo),
+        call=call,
+        ttl_s=cache.DEFAULT_TTL_S,
+    )
+
+
+def get_map_id(image, vis_params):
+    """
+    Request map tiles for an image (one round trip, unless cached or already
+    being requested).
+    """
+    return _evaluate(
+        expression_key("getMapId", image, vis_params),
+        lambda: _round_trip("getMapId", lambda: image.getMapId(vis_params)),
+        call="getMapId",
+        ttl_s=cache.MAP_ID_TTL_S,
+        dumps=_dump_map_id,
+        loads=_load_map_id,
+    )
+
+
+def _evaluate(key, compute, call, ttl_s, dumps=None, loads=None):
+    result_cache = cache.get_cache() if key else None
+    if result_cache is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return loads(cached) if loads else cached
+
+    def compute_and_store():
+        result = compute()
+        if result_cache is not None and result is not None:
+            result_cache.set(key, dumps(result) if dumps else result, ttl_s)
+        return result
+
+    return coalesce(key, compute_and_store, call=call, dumps=dumps, loads=loads)
+
+
+def _dump_map_id(map_id):
+    return {
+        "mapid": map_id.get("mapid"),
+        "token": map_id.get("token"),
+        "url_format": map_id["tile_fetcher"].url_format,
+    }
+
+
+def _load_map_id(data):
+    # Only the tile URL format of the fetcher is used by the application
+    return {
+        "mapid": data["mapid"],
+        "token": data["token"],
+        "tile_fetcher": types.SimpleNamespace(url_format=data["url_format"]),
+    }
+
+
+def _round_trip(call, fetch):
+    method = _current_method.get()
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        return limiter.call(fetch, call)
+    except limiter.EEOverloadedError:
+        status = "overloaded"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        metrics.EE_CALLS.labels(call=call, method=method, status=status).inc()
+        metrics.EE_CALL_SECONDS.labels(call=call, method=method).observe(
+            time.perf_counter() - start
+        )
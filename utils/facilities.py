@@ -0,0 +1,236 @@
+# utils/facilities.py
+#
+# GHGRP facility emissions (EPA Greenhouse Gas Reporting Program, 2023) for
+# /geo/facilities. The spreadsheet is read once and kept column by column as
+# NumPy arrays: coordinates, emissions with precomputed CO2e, and membership
+# matrices of industry subparts and sectors. Queries combine boolean masks over
+# those columns, so filters and aggregations over the ~6500 facilities run in
+# about a millisecond.
+#
+# Reading the spreadsheet takes seconds, so the columns are also stored next to
+# the instance data (FACILITIES_CACHE) and reloaded from there while the
+# spreadsheet is unchanged.
+
+import math
+import os
+import threading
+
+from .geometry import M_PER_DEG_LAT, M_PER_DEG_LON
+from .startup import LazyModule
+
+# NumPy and pandas are only loaded when the facility table is first needed
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Global warming potentials (IPCC AR4, the ones GHGRP reports with)
+GWP_CH4 = 25
+GWP_N2O = 298
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_PATH = os.getenv("FACILITIES_DATA", os.path.join(BASE_DIR, "data", "ghgp_data_2023.xlsx"))
+CACHE_PATH = os.getenv("FACILITIES_CACHE", os.path.join(BASE_DIR, "instance", "facilities.npz"))
+
+MAX_LIMIT = 1000
+
+# Spreadsheet column -> table column. Gas emissions are in metric tons CO2e.
+_COLUMNS = {
+    "Facility Id": "id",
+    "Facility Name": "name",
+    "City": "city",
+    "State": "state",
+    "Latitude": "latitude",
+    "Longitude": "longitude",
+    "Primary NAICS Code": "naics",
+    "Industry Type (subparts)": "subparts",
+    "Industry Type (sectors)": "sectors",
+    "Total reported direct emissions": "total",
+    "CO2 emissions (non-biogenic)": "co2",
+    "Methane (CH4) emissions": "ch4",
+    "Nitrous Oxide (N2O) emissions": "n2o",
+}
+_TEXT = ("name", "city", "state", "subparts", "sectors")
+_NUMERIC = ("latitude", "longitude", "naics", "total", "co2", "ch4", "n2o")
+
+
+def co2e(co2, ch4, n2o):
+    """CO2 equivalent (t) of emissions given in tons of each gas."""
+    return co2 + ch4 * GWP_CH4 + n2o * GWP_N2O
+
+
+def _subpart_code(token):
+    # "RR (RPT)" -> "RR"
+    return token.strip().split(" ")[0]
+
+
+def _membership(values, split):
+    """Sorted labels and a facilities x labels boolean matrix."""
+    per_row = [sorted({split(t) for t in v.split(",") if t.strip()}) for v in values]
+    labels = sorted({label for row in per_row for label in row})
+    index = {label: i for i, label in enumerate(labels)}
+    matrix = np.zeros((len(values), len(labels)), dtype=bool)
+    for row, row_labels in enumerate(per_row):
+        matrix[row, [index[label] for label in row_labels]] = True
+    return np.asarray(labels), matrix
+
+
+def _read_spreadsheet(path):
+    df = pd.read_excel(path, header=3)
+    df.columns = df.columns.str.strip()
+    df = df[list(_COLUMNS)].rename(columns=_COLUMNS)
+    df = df.dropna(subset=["latitude", "longitude"])
+
+    columns = {"id": df["id"].to_numpy(dtype=np.int64)}
+    for name in _TEXT:
+        columns[name] = df[name].fillna("").astype(str).str.strip().to_numpy(dtype=str)
+    for name in _NUMERIC:
+        columns[name] = df[name].to_numpy(dtype=float)
+
+    # Gases are reported in CO2e already; the total falls back to their sum
+    gases = np.nansum(np.stack([columns["co2"], columns["ch4"], columns["n2o"]]), axis=0)
+    columns["co2e"] = np.where(np.isnan(columns["total"]), gases, columns["total"])
+    columns["subpart_labels"], columns["subpart_matrix"] = _membership(columns["subparts"], _subpart_code)
+    columns["sector_labels"], columns["sector_matrix"] = _membership(columns["sectors"], str.strip)
+    return columns
+
+
+class FacilityTable:
+    """
+    Column-oriented facility data with mask-based queries.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.size = len(columns["id"])
+
+    def mask(self, bbox=None, near=None, subparts=None, sectors=None, states=None,
+             min_co2e=None, max_co2e=None):
+        """
+        Facilities matching every given filter. `bbox` is (min_lon, min_lat,
+        max_lon, max_lat), `near` is (latitude, longitude, radius_km);
+        subparts and sectors match facilities with any of the given values.
+        """
+        c = self.columns
+        keep = np.ones(self.size, dtype=bool)
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            keep &= (c["longitude"] >= min_lon) & (c["longitude"] <= max_lon)
+            keep &= (c["latitude"] >= min_lat) & (c["latitude"] <= max_lat)
+        if near is not None:
+            keep &= self.distance_km(near[0], near[1]) <= near[2]
+        if subparts:
+            keep &= self._any_of("subpart", [_subpart_code(s) for s in subparts])
+        if sectors:
+            keep &= self._any_of("sector", [s.strip() for s in sectors])
+        if states:
+            keep &= np.isin(c["state"], [s.strip().upper() for s in states])
+        if min_co2e is not None:
+            keep &= c["co2e"] >= min_co2e
+        if max_co2e is not None:
+            keep &= c["co2e"] <= max_co2e
+        return keep
+
+    def _any_of(self, kind, values):
+        labels = self.columns[f"{kind}_labels"]
+        selected = np.isin(labels, values)
+        return self.columns[f"{kind}_matrix"][:, selected].any(axis=1)
+
+    def distance_km(self, latitude, longitude):
+        """Equirectangular distance of every facility to a point."""
+        c = self.columns
+        kx = M_PER_DEG_LON * math.cos(math.radians(latitude))
+        dx = (c["longitude"] - longitude) * kx
+        dy = (c["latitude"] - latitude) * M_PER_DEG_LAT
+        return np.hypot(dx, dy) / 1000.0
+
+    def by_sector(self, keep):
+        """CO2e and facility count per sector (multi-sector facilities count in each)."""
+        matrix = self.columns["sector_matrix"][keep]
+        totals = self.columns["co2e"][keep] @ matrix
+        counts = matrix.sum(axis=0)
+        return sorted(
+            (
+                {"sector": str(label), "co2e": round(float(total), 3), "facilities": int(count)}
+                for label, total, count in zip(self.columns["sector_labels"], totals, counts)
+                if count
+            ),
+            key=lambda row: -row["co2e"],
+        )
+
+    def rows(self, indices, distances=None):
+        c = self.columns
+        return [
+            {
+                "id": int(c["id"][i]),
+                "name": str(c["name"][i]),
+                "city": str(c["city"][i]),
+                "state": str(c["state"][i]),
+                "latitude": float(c["latitude"][i]),
+                "longitude": float(c["longitude"][i]),
+                "naics": None if np.isnan(c["naics"][i]) else int(c["naics"][i]),
+                "subparts": str(c["subparts"][i]),
+                "sectors": str(c["sectors"][i]),
+                "co2e": round(float(c["co2e"][i]), 3),
+                **{
+                    gas: None if np.isnan(c[gas][i]) else round(float(c[gas][i]), 3)
+                    for gas in ("co2", "ch4", "n2o")
+                },
+                **({"distance_km": round(float(distances[i]), 3)} if distances is not None else {}),
+            }
+            for i in indices
+        ]
+
+    def query(self, limit=100, top=10, **filters):
+        """
+        Matching facilities (largest emitters first, up to `limit`), their
+        total CO2e, CO2e by sector and the `top` emitters.
+        """
+        # Negative counts would slice from the end
+        limit, top = max(0, limit), max(0, top)
+        keep = self.mask(**filters)
+        near = filters.get("near")
+        distances = self.distance_km(near[0], near[1]) if near is not None else None
+
+        matched = np.flatnonzero(keep)
+        order = matched[np.argsort(-self.columns["co2e"][matched], kind="stable")]
+        return {
+            "count": int(len(matched)),
+            "total_co2e": round(float(self.columns["co2e"][matched].sum()), 3),
+            "by_sector": self.by_sector(keep),
+            "top": self.rows(order[:top], distances),
+            "facilities": self.rows(order[:limit], distances),
+        }
+
+
+def _load_columns():
+    source_mtime = os.path.getmtime(DATA_PATH)
+    if os.path.exists(CACHE_PATH) and os.path.getmtime(CACHE_PATH) >= source_mtime:
+        try:
+            with np.load(CACHE_PATH) as cached:
+                return {name: cached[name] for name in cached.files}
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not read facility cache {CACHE_PATH}: {e}")
+
+    columns = _read_spreadsheet(DATA_PATH)
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp_path = CACHE_PATH + ".tmp.npz"
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: could not write facility cache {CACHE_PATH}: {e}")
+    return columns
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table():
+    """The process-wide facility table, loaded on first use."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = FacilityTable(_load_columns())
+                print(f"🏭 Facility table loaded: {_table.size} facilities")
+    return _table
@@ -0,0 +1,93 @@
+# utils/fanout.py
+#
+# Fan-out of independent Earth Engine evaluations. Calls that do not depend on
+# each other (the three simulated layer map ids, the three post-simulation
+# reductions, the wind radii) are submitted to a small shared thread pool, so a
+# request waits for the slowest of them instead of their sum. Each call runs in
+# a copy of the caller's context (Flask app/request context, the traced method
+# label), still goes through ee_client's cache, coalescing and concurrency
+# limit, and fails or times out on its own.
+
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+from .limiter import EEOverloadedError
+
+MAX_WORKERS = int(os.getenv("EE_FANOUT_WORKERS", "8"))
+DEFAULT_TIMEOUT_S = float(os.getenv("EE_FANOUT_TIMEOUT_S", "120"))
+
+
+class FanoutTimeout(TimeoutError):
+    """
+    A fanned-out call did not finish before its deadline.
+    """
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_worker = threading.local()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix="ee-fanout"
+                )
+    return _executor
+
+
+def _run_in_worker(context, call):
+    _in_worker.active = True
+    try:
+        return context.run(call)
+    finally:
+        _in_worker.active = False
+
+
+def _outcome(call):
+    try:
+        return call()
+    except Exception as e:
+        return e
+
+
+def run(calls, timeout_s=None):
+    """
+    Run independent zero-argument calls concurrently and return their results
+    in order. A call that raised, or did not finish within `timeout_s`, has its
+    exception (FanoutTimeout) in place of the result; EEOverloadedError is
+    re-raised so routes can answer 503.
+    """
+    calls = list(calls)
+    timeout_s = DEFAULT_TIMEOUT_S if timeout_s is None else timeout_s
+
+    if len(calls) <= 1 or getattr(_in_worker, "active", False):
+        # Nothing to overlap, or already inside the pool (avoid waiting on
+        # ourselves for a free worker)
+        results = [_outcome(call) for call in calls]
+    else:
+        executor = _get_executor()
+        futures = [
+            executor.submit(_run_in_worker, contextvars.copy_context(), call) for call in calls
+        ]
+        deadline = time.monotonic() + timeout_s
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except concurrent.futures.TimeoutError:
+                # The call keeps running in the pool; its result is discarded
+                results.append(FanoutTimeout(f"Earth Engine call did not finish in {timeout_s:g} s"))
+            except Exception as e:
+                results.append(e)
+
+    for result in results:
+        if isinstance(result, EEOverloadedError):
+            raise result
+    return results
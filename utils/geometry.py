@@ -0,0 +1,360 @@
+# utils/geometry.py
+#
+# Canonical form of GeoJSON input. The same drawn area can arrive with its rings
+# in either orientation, starting at any vertex, with float noise in the last
+# digits or with its features in another order; the canonical form removes those
+# differences so that identical scenarios hash identically (see scenario_key),
+# whether they come from a retry, a shared link or the same preset on the same
+# block.
+#
+# Also simplifies polygons before they are sent to Earth Engine: drawn and
+# traced parcels can have thousands of vertices, while results are computed at
+# 20-5000 m scale. Every vertex adds to the request payload and to the
+# server-side rasterization of `paint` and `reduceRegion`. The tolerance follows
+# the scale the polygon is reduced at, and simplified polygons are kept per
+# (geometry, scale) so repeated requests do not redo the work.
+
+import datetime
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from . import metrics
+
+# 6 decimals of a degree is ~0.1 m, well below the 10 m+ scales the layers use
+COORD_PRECISION = 6
+
+# Finest scale polygons are reduced at (NDVI, Sentinel-2)
+FINEST_SCALE_M = 20
+# Douglas-Peucker tolerance in pixels of the reduction scale (0 disables)
+SIMPLIFY_TOLERANCE_PX = float(os.getenv("GEO_SIMPLIFY_TOLERANCE_PX", "0.5"))
+# Largest relative area change accepted; the tolerance is halved until it holds
+SIMPLIFY_MAX_AREA_ERROR = float(os.getenv("GEO_SIMPLIFY_MAX_AREA_ERROR", "0.01"))
+# Simplified polygons kept, least recently used dropped first
+MAX_SIMPLIFIED = 256
+
+M_PER_DEG_LAT = 110540.0
+M_PER_DEG_LON = 111320.0
+
+
+def _round_point(point, precision):
+    return [round(float(point[0]), precision), round(float(point[1]), precision)]
+
+
+def _signed_area(ring):
+    """Shoelace formula; positive for counter-clockwise rings."""
+    return sum(
+        x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:])
+    ) / 2.0
+
+
+def _canonical_ring(ring, precision, clockwise):
+    points = []
+    for point in ring:
+        point = _round_point(point, precision)
+        if not points or point != points[-1]:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if len(points) < 3:
+        return [*points, points[0]] if points else []
+
+    # RFC 7946: exterior rings counter-clockwise, holes clockwise
+    if (_signed_area([*points, points[0]]) < 0) != clockwise:
+        points.reverse()
+    start = points.index(min(points))
+    points = points[start:] + points[:start]
+    return [*points, points[0]]
+
+
+def _canonical_polygon(rings, precision):
+    if not rings:
+        return []
+    exterior = _canonical_ring(rings[0], precision, clockwise=False)
+    holes = sorted(_canonical_ring(ring, precision, clockwise=True) for ring in rings[1:])
+    return [exterior, *holes]
+
+
+def canonical_geometry(geojson, precision=COORD_PRECISION):
+    """
+    Return the canonical form of a GeoJSON geometry, Feature or
+    FeatureCollection. Features keep only their geometry and properties.
+    """
+    kind = geojson.get("type")
+    coords = geojson.get("coordinates")
+
+    if kind == "Point":
+        return {"type": kind, "coordinates": _round_point(coords, precision)}
+    if kind == "MultiPoint":
+        return {"type": kind, "coordinates": sorted(_round_point(p, precision) for p in coords)}
+    if kind == "LineString":
+        return {"type": kind, "coordinates": [_round_point(p, precision) for p in coords]}
+    if kind == "MultiLineString":
+        return {
+            "type": kind,
+            "coordinates": sorted([_round_point(p, precision) for p in line] for line in coords),
+        }
+    if kind == "Polygon":
+        return {"type": kind, "coordinates": _canonical_polygon(coords, precision)}
+    if kind == "MultiPolygon":
+        return {
+            "type": kind,
+            "coordinates": sorted(_canonical_polygon(polygon, precision) for polygon in coords),
+        }
+    if kind == "GeometryCollection":
+        geometries = [canonical_geometry(g, precision) for g in geojson.get("geometries", [])]
+        return {"type": kind, "geometries": sorted(geometries, key=_dumps)}
+    if kind == "Feature":
+        geometry = geojson.get("geometry")
+        return {
+            "type": kind,
+            "geometry": canonical_geometry(geometry, precision) if geometry else None,
+            "properties": geojson.get("properties") or {},
+        }
+    if kind == "FeatureCollection":
+        features = [canonical_geometry(f, precision) for f in geojson.get("features", [])]
+        return {"type": kind, "features": sorted(features, key=_dumps)}
+    raise ValueError(f"Unsupported GeoJSON type: {kind}")
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def geometry_hash(geojson, precision=COORD_PRECISION):
+    """sha256 of the canonical form of a GeoJSON object."""
+    return hashlib.sha256(_dumps(canonical_geometry(geojson, precision)).encode()).hexdigest()
+
+
+def scenario_key(kind, geojson, **params):
+    """
+    Cache key of a simulation: what is computed (`kind`), the canonical
+    geometry, the parameters and the day (the base layers roll over daily).
+    """
+    content = {
+        "kind": kind,
+        "geometry": geometry_hash(geojson),
+        "params": params,
+        "day": datetime.date.today().isoformat(),
+    }
+    return f"scenario:{hashlib.sha256(_dumps(content).encode()).hexdigest()}"
+
+
+def point_in_polygon(point, rings):
+    """
+    Even-odd test of a [lon, lat] point against a polygon's rings (exterior
+    and holes).
+    """
+    x, y = point[0], point[1]
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+# --- Simplification ---
+
+def _to_metres(ring, lat0):
+    """Equirectangular projection around `lat0`, good enough at parcel size."""
+    kx = M_PER_DEG_LON * math.cos(math.radians(lat0))
+    return [(p[0] * kx, p[1] * M_PER_DEG_LAT) for p in ring]
+
+
+def _ring_area_m2(ring, lat0):
+    return abs(_signed_area(_to_metres(ring, lat0)))
+
+
+def _polygon_area_m2(rings, lat0):
+    if not rings:
+        return 0.0
+    return _ring_area_m2(rings[0], lat0) - sum(_ring_area_m2(r, lat0) for r in rings[1:])
+
+
+def _douglas_peucker(points, tolerance):
+    """Indices of the points kept from an open polyline of (x, y) metres."""
+    keep = {0, len(points) - 1}
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        farthest, max_dist = None, tolerance
+        for i in range(first + 1, last):
+            x0, y0 = points[i]
+            if length:
+                dist = abs(dy * x0 - dx * y0 + x2 * y1 - y2 * x1) / length
+            else:
+                dist = math.hypot(x0 - x1, y0 - y1)
+            if dist > max_dist:
+                farthest, max_dist = i, dist
+        if farthest is not None:
+            keep.add(farthest)
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return sorted(keep)
+
+
+def _simplify_ring(ring, tolerance, lat0):
+    # Closed ring: split at the vertex farthest from the first one so both
+    # halves are open polylines
+    if len(ring) <= 5 or ring[0] != ring[-1]:
+        return ring
+    points = _to_metres(ring[:-1], lat0)
+    x0, y0 = points[0]
+    split = max(range(len(points)), key=lambda i: math.hypot(points[i][0] - x0, points[i][1] - y0))
+    head = _douglas_peucker(points[: split + 1], tolerance)
+    tail = [split + i for i in _douglas_peucker(points[split:] + [points[0]], tolerance)]
+    kept = sorted(set(head) | {i for i in tail if i < len(points)})
+    if len(kept) < 3:
+        return ring
+    return [ring[i] for i in kept] + [ring[0]]
+
+
+def _simplify_polygon(rings, tolerance_m, max_area_error):
+    lat0 = rings[0][0][1] if rings and rings[0] else 0.0
+    area = _polygon_area_m2(rings, lat0)
+    tolerance = tolerance_m
+    for _ in range(4):
+        simplified = [_simplify_ring(ring, tolerance, lat0) for ring in rings]
+        if not area or abs(_polygon_area_m2(simplified, lat0) - area) / area <= max_area_error:
+            return simplified
+        tolerance /= 2
+    return rings
+
+
+def area_m2(geojson):
+    """Approximate area of the polygons of a GeoJSON geometry or Feature."""
+    kind = geojson.get("type")
+    if kind == "Feature":
+        return area_m2(geojson.get("geometry") or {})
+    if kind == "Polygon":
+        polygons = [geojson["coordinates"]]
+    elif kind == "MultiPolygon":
+        polygons = geojson["coordinates"]
+    else:
+        return 0.0
+    return sum(
+        _polygon_area_m2(rings, rings[0][0][1]) for rings in polygons if rings and rings[0]
+    )
+
+
+def centroid(geojson):
+    """
+    [lon, lat] centroid of the polygons of a GeoJSON geometry or Feature
+    (exterior rings, area-weighted), or None for other geometry types.
+    """
+    kind = geojson.get("type")
+    if kind == "Feature":
+        return centroid(geojson.get("geometry") or {})
+    if kind == "Polygon":
+        polygons = [geojson["coordinates"]]
+    elif kind == "MultiPolygon":
+        polygons = geojson["coordinates"]
+    else:
+        return None
+    rings = [rings[0] for rings in polygons if rings and rings[0]]
+    if not rings:
+        return None
+
+    area = cx = cy = 0.0
+    for ring in rings:
+        ring_area = ring_x = ring_y = 0.0
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            cross = x1 * y2 - x2 * y1
+            ring_area += cross
+            ring_x += (x1 + x2) * cross
+            ring_y += (y1 + y2) * cross
+        if ring_area:
+            # Weighted by absolute area, whatever the ring orientation
+            weight = abs(ring_area)
+            area += weight
+            cx += ring_x / (3 * ring_area) * weight
+            cy += ring_y / (3 * ring_area) * weight
+    if not area:
+        # Degenerate rings: mean of the vertices
+        points = [p for ring in rings for p in ring]
+        return [sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)]
+    return [cx / area, cy / area]
+
+
+def count_vertices(geojson):
+    kind = geojson.get("type")
+    if kind == "Feature":
+        return count_vertices(geojson.get("geometry") or {})
+    if kind == "Polygon":
+        return sum(len(ring) for ring in geojson.get("coordinates", []))
+    if kind == "MultiPolygon":
+        return sum(len(ring) for polygon in geojson.get("coordinates", []) for ring in polygon)
+    return 0
+
+
+_simplified = OrderedDict()
+_simplified_lock = threading.Lock()
+
+
+def _simplify(geojson, tolerance_m, max_area_error):
+    kind = geojson.get("type")
+    if kind == "Feature":
+        geometry = geojson.get("geometry")
+        if not geometry:
+            return geojson
+        return {**geojson, "geometry": _simplify(geometry, tolerance_m, max_area_error)}
+
+    try:
+        if kind == "Polygon":
+            coordinates = _simplify_polygon(geojson["coordinates"], tolerance_m, max_area_error)
+        else:
+            coordinates = [
+                _simplify_polygon(polygon, tolerance_m, max_area_error)
+                for polygon in geojson["coordinates"]
+            ]
+    except (KeyError, IndexError, TypeError, ValueError):
+        # Malformed coordinates: leave them for Earth Engine to reject
+        return geojson
+    return {**geojson, "coordinates": coordinates}
+
+
+def simplify_geometry(geojson, scale_m=FINEST_SCALE_M, max_area_error=None):
+    """
+    Douglas-Peucker simplification of the polygons of a GeoJSON geometry or
+    Feature reduced at `scale_m` metres: within SIMPLIFY_TOLERANCE_PX pixels
+    and a relative area error of at most `max_area_error`. Other geometry
+    types are returned unchanged. Results are cached per (geometry, scale)
+    and shared, so callers must not modify them.
+    """
+    max_area_error = SIMPLIFY_MAX_AREA_ERROR if max_area_error is None else max_area_error
+    tolerance_m = scale_m * SIMPLIFY_TOLERANCE_PX
+    kind = geojson.get("type")
+    if tolerance_m <= 0 or kind not in ("Polygon", "MultiPolygon", "Feature"):
+        return geojson
+
+    try:
+        key = (geometry_hash(geojson), scale_m, max_area_error)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return geojson
+    with _simplified_lock:
+        entry = _simplified.get(key)
+        if entry is not None:
+            _simplified.move_to_end(key)
+    metrics.record_cache("simplified_geometry", entry is not None)
+
+    if entry is None:
+        simplified = _simplify(geojson, tolerance_m, max_area_error)
+        entry = (simplified, count_vertices(geojson), count_vertices(simplified))
+        with _simplified_lock:
+            _simplified[key] = entry
+            while len(_simplified) > MAX_SIMPLIFIED:
+                _simplified.popitem(last=False)
+        if entry[2] < entry[1]:
+            print(f"✂️ Simplified geometry: {entry[1]} -> {entry[2]} vertices (tolerance {tolerance_m:g} m)")
+
+    simplified, before, after = entry
+    metrics.GEOMETRY_VERTICES.labels(stage="input").inc(before)
+    metrics.GEOMETRY_VERTICES.labels(stage="simplified").inc(after)
+    return simplified
@@ -1,40 +1,11 @@
 import ee
 import json
 from typing import Dict, Any, Tuple, Optional, Union, List
-import os
-from dotenv import load_dotenv
 import datetime
-load_dotenv()
 
-project_id = os.getenv("GEE_PROJECT")
-key_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-
-
-print("="*30)
-print(f"DEBUG: GEE_PROJECT leído: {project_id}")
-print(f"DEBUG: GEE_CREDS_PATH leído: {key_path}")
-print("="*30)
-
-if not project_id:
-    raise ValueError("Variable 'GEE_PROJECT' is not defined, please check your env variables")
-if not key_path:
-    raise ValueError("Variable 'GOOGLE_APPLICATION_CREDENTIALS' is not defined, please check your env variables")
-
-try:
-    credentials = ee.ServiceAccountCredentials(None, key_file=key_path)
-
-    ee.Initialize(
-        credentials=credentials,
-        project=project_id,
-        opt_url='https://earthengine-highvolume.googleapis.com'
-    )
-    
-    print("GEE LIVE")
-
-except Exception as e:
-    print(f"Failed to connect to GEE: {e}")
-
-    raise e
+from . import cube, ee_client, fanout, modifiers, regression
+from .geometry import simplify_geometry
+from .limiter import EEOverloadedError
 
 _GA_CFG = {
     "date_month": ("2025-05-01", "2025-05-31"),
@@ -68,19 +39,7 @@ _GA_CFG = {
             "palette": ["#2DC937", "#E7B416", "#E77D11", "#CC3232", "#6B1A6B"],
         },
     },
-    "norm_user": {
-        # existentes (residencial)
-        "densidad": {"buildings_per_km2": {"min": 0.0, "max": 1000.0}},
-        "trafico": {"veh_day": {"min": 0.0, "max": 20000.0}},
-        "albedo": {
-            "albedo_0_1": {"min": 0.0, "max": 1.0},
-            "cool_roof_pct": {"min": 0.0, "max": 100.0},
-        },
-        # nuevos (area verde)
-        "arboles": {"trees_per_ha": {"min": 0.0, "max": 400.0}},
-        "pasto": {"pct": {"min": 0.0, "max": 100.0}},
-        "copa": {"pct": {"min": 0.0, "max": 100.0}},
-    },
+    "norm_user": modifiers.ATTR_NORM,
     "aq_sources": {
         "COPERNICUS/S5P/NRTI/L3_NO2": ("NO2_column_number_density", (0.0, 2e-4)),
         "COPERNICUS/S5P/NRTI/L3_SO2": ("SO2_column_number_density", (0.0, 1e-4)),
@@ -121,7 +80,9 @@ class GeoAnalytics:
         buffer: int = 50000,
         temp_industry=0,
         aq_industry=0,
+        plume=None,
     ):
+        ee_client.initialize()
 
         self.latitude, self.longitude, self.buffer = latitude, longitude, buffer
         self.region = ee.Geometry.Point(self.longitude, self.latitude).buffer(
@@ -140,11 +101,13 @@ class GeoAnalytics:
         self.sim_temp: ee.Image = None
         self.sim_ndvi: ee.Image = None
         self.sim_aq: ee.Image = None
-        self.reg_coefs: Optional[Dict[str, List[ee.Number]]] = None
-        self.metrics: Optional[Dict[str, Dict[str, ee.Number]]] = None
+        self.reg_coefs: Optional[Dict[str, List[float]]] = None
+        self.metrics: Optional[Dict[str, Dict[str, float]]] = None
         self.attr_norm: Dict[str, Any] = self._CFG["norm_user"]
         self.temp_industry = temp_industry
         self.aq_industry = aq_industry
+        # dispersion.PlumeField of the industrial sources, the AQ delta around them
+        self.plume = plume
 
         self._initialize_vis_params()
         self._calculate_base_layers()
@@ -178,28 +141,31 @@ class GeoAnalytics:
         )
 
     @staticmethod
-    def _geojson_to_ee_geom(geojson_area: Dict[str, Any]) -> ee.Geometry:
-        """Converts a GeoJSON dictionary into Earth Engine geometry object."""
-        return ee.Geometry(geojson_area)
+    def _geojson_to_ee_geom(geojson_area: Dict[str, Any], scale_m: int) -> ee.Geometry:
+        """
+        Converts a GeoJSON dictionary into Earth Engine geometry object,
+        simplified first for the finest scale `scale_m` it is reduced at.
+        """
+        return ee.Geometry(simplify_geometry(geojson_area, scale_m))
 
-    def _unit_range(self, var: str, unit: str) -> Tuple[ee.Number, ee.Number]:
+    def _unit_range(self, var: str, unit: str) -> Tuple[float, float]:
         """Gets the minimum and maximun from one variable."""
-        cfg = self.attr_norm.get(var, {}).get(unit)
-        if cfg is None:
-            raise ValueError(f"Unity not suported for {var}: {unit}")
-        return ee.Number(cfg["min"]), ee.Number(cfg["max"])
-
-    def _norm_value(
-        self, x: Union[float, int, ee.Number], vmin: ee.Number, vmax: ee.Number
-    ) -> ee.Number:
+        return modifiers.unit_range(var, unit, self.attr_norm)
+
+    def _norm_value(self, x: float, vmin: float, vmax: float) -> float:
         """Normalize an scalar [0, 1]."""
-        x = ee.Number(x)
-        return x.subtract(vmin).divide(ee.Number(vmax).subtract(vmin)).clamp(0, 1)
+        return float(modifiers.norm_value(x, vmin, vmax))
 
     def _month(self, date_str: str) -> ee.Number:
         """Extract the month from an object"""
         return ee.Date(date_str).get("month")
 
+    def _ndvi_percentiles(self, date_str: str) -> ee.Image:
+        """NDVI p10/p50/p90 of a month; the cube's bands for the preset month."""
+        if date_str[5:7] == self._CFG["date_month"][0][5:7]:
+            return self.cube.select("NDVI_p10", "NDVI_p50", "NDVI_p90")
+        return self._ndvi_percentiles_for_month(self._month(date_str))
+
     def _ndvi_percentiles_for_month(self, month_int: ee.Number) -> ee.Image:
         s2 = (
             ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
@@ -213,13 +179,38 @@ class GeoAnalytics:
             ["NDVI_p10", "NDVI_p50", "NDVI_p90"]
         )
 
+    @ee_client.traced
     def get_tile_url(self, image, vis_params):
         """
         Generates a tile URL for a given Earth Engine image and visualization parameters.
         """
-        map_id = image.clip(self.region).getMapId(vis_params)
+        map_id = ee_client.get_map_id(image.clip(self.region), vis_params)
         return map_id["tile_fetcher"].url_format
 
+    @ee_client.traced
+    def sim_tile_urls(self) -> Dict[str, Optional[str]]:
+        """
+        Tile URLs of the simulated temperature, NDVI and AQ layers, requested
+        in parallel. A layer that is missing or fails has None.
+        """
+        layers = {
+            "sim_temp_url": (self.sim_temp, self.temp_vis_params),
+            "sim_ndvi_url": (self.sim_ndvi, self.ndvi_vis_params),
+            "sim_aq_url": (self.sim_aq, self.aq_vis_params),
+        }
+        available = {name: layer for name, layer in layers.items() if layer[0] is not None}
+        results = fanout.run(
+            lambda image=image, vis=vis: self.get_tile_url(image, vis)
+            for image, vis in available.values()
+        )
+        urls = dict.fromkeys(layers)
+        for name, result in zip(available, results):
+            if isinstance(result, Exception):
+                print(f"Tile Generation Error ({name}): {result}")
+            else:
+                urls[name] = result
+        return urls
+
     def _get_normalized_gas(
         self,
         coll_id: str,
@@ -246,7 +237,34 @@ class GeoAnalytics:
         normalized = self._normalize(collection, vmin, vmax, to=100)
         return normalized.rename("v")
     
-    def sim_batch_visualization(self, features_data: List[Dict[str, any]]): 
+    @staticmethod
+    def _plume_image(plume) -> ee.Image:
+        """
+        AQ delta of a dispersion.PlumeField as an image: the block-averaged grid
+        is sent as one array and looked up per pixel; zero outside the grid.
+        """
+        grid, (west, south, east, north) = plume.aq_delta()
+        if not grid.size:
+            return ee.Image.constant(0).rename("AQ_Composite_0_100")
+        rows, cols = grid.shape
+        lonlat = ee.Image.pixelLonLat()
+        col = (
+            lonlat.select("longitude").subtract(west)
+            .divide((east - west) / cols).floor().toInt()
+        )
+        row = (
+            ee.Image.constant(north).subtract(lonlat.select("latitude"))
+            .divide((north - south) / rows).floor().toInt()
+        )
+        inside = col.gte(0).And(col.lt(cols)).And(row.gte(0)).And(row.lt(rows))
+        values = ee.Image(ee.Array(grid.tolist()))
+        return (
+            values.arrayGet(row.addBands(col).updateMask(inside))
+            .unmask(0)
+            .rename("AQ_Composite_0_100")
+        )
+
+    def sim_batch_visualization(self, features_data: List[Dict[str, any]], plume=None): 
         canvas_lst = ee.Image(0).selfMask()
         canvas_aq = ee.Image(0).selfMask()
 
@@ -275,6 +293,10 @@ class GeoAnalytics:
             if isinstance(tgt_ndvi, (int, float)): 
                 tgt_ndvi = ee.Image.constant(tgt_ndvi)
             final_ndvi = final_ndvi.where(local_mask, tgt_ndvi)
+        if plume is not None:
+            # Dispersed industrial emissions, also outside the painted areas
+            final_aq_deltas = final_aq_deltas.add(self._plume_image(plume))
+
         lst_reg = final_ndvi.multiply(-10).add(35) 
         aq_reg = final_ndvi.multiply(-20).add(50)
 
@@ -291,9 +313,33 @@ class GeoAnalytics:
         Layers: Temperature, NDVI (vegetation), Air Quality (composite index).
         """
    
+        key = (
+            round(self.latitude, 6),
+            round(self.longitude, 6),
+            self.buffer,
+            datetime.date.today().isoformat(),
+            self._CFG["date_month"][0],
+        )
+        self.cube = cube.get_cube(key, self._build_cube)
+        self.region = self.cube.region
+
+        self.base_temp = self.cube.band("LST_Day_1km")
+        self.base_ndvi = self.cube.band("NDVI")
+        self.ndbi = self.cube.band("NDBI")
+        self.base_aq = self.cube.band("AQ_Composite_0_100")
+
+        self.temp_image = self.base_temp
+        self.ndvi = self.base_ndvi
+        self.aq_index = self.base_aq
+        print("🌍 Base layers calculated successfully.")
+
+    def _build_cube(self):
+        """Base layers of the analysis cube (see utils/cube.py)."""
         #Todays date will always be yesterday-
+        # Day resolution: the datasets are daily, and identical expressions across
+        # requests can be coalesced and cached (a timestamp would make each unique)
 
-        end_date = ee.Date(datetime.datetime.now()).advance(-7, 'day')
+        end_date = ee.Date(datetime.date.today().isoformat()).advance(-7, 'day')
 
         #Monthly date will consider the median from the last month.
 
@@ -306,33 +352,46 @@ class GeoAnalytics:
         start_date_annual = end_date.advance(-1, 'year')
         date_range_annual = (start_date_annual, end_date)  
 
-        #Heat layer
-        self.base_temp = (
+        #NDVI layer
+        s2_composite = self._s2_composite(date_range_annual)
+
+        #NDVI percentiles of the preset month
+        percentiles = self._ndvi_percentiles_for_month(self._month(self._CFG["date_month"][0]))
+
+        layers = {
+            "LST_Day_1km": self._heat_image(date_range_monthly),
+            "NDVI": s2_composite.normalizedDifference(["B8", "B4"]).rename("NDVI"),
+            "NDBI": s2_composite.normalizedDifference(["B11", "B8"]).rename("NDBI"),
+            "AQ_Composite_0_100": self._aq_image(date_range_monthly, date_range_annual),
+            **{name: percentiles.select(name) for name in ("NDVI_p10", "NDVI_p50", "NDVI_p90")},
+        }
+        return layers, {("NDVI_p10", "NDVI_p50", "NDVI_p90"): percentiles}, self.region
+
+    def _heat_image(self, date_range) -> ee.Image:
+        """Median land surface temperature (°C) over a date range."""
+        return (
             ee.ImageCollection("MODIS/061/MOD11A1")
             .filterBounds(self.region)
-            .filterDate(*date_range_monthly)
+            .filterDate(*date_range)
             .median()
             .select("LST_Day_1km")
             .multiply(0.02)
             .subtract(273.15)
         )
 
-
-        #NDVI layer
-        s2_composite = (
+    def _s2_composite(self, date_range) -> ee.Image:
+        """Cloud-masked Sentinel-2 median composite over a date range."""
+        return (
             ee.ImageCollection("COPERNICUS/S2_SR_HARMONIZED")
             .filterBounds(self.region)
-            .filterDate(*date_range_annual)
+            .filterDate(*date_range)
             .filter(ee.Filter.lt("CLOUDY_PIXEL_PERCENTAGE", 80))
             .map(mask_s2_scl)  
             .median()
         )
-        self.base_ndvi = s2_composite.normalizedDifference(["B8", "B4"]).rename("NDVI")
-        self.ndbi = s2_composite.normalizedDifference(["B11", "B8"]).rename("NDBI")
 
-    
-
-        #Air quality layer
+    def _aq_image(self, date_range_monthly, date_range_annual) -> ee.Image:
+        """Air quality composite (0-100); aerosols use the longer range."""
         aq_components = [
             self._get_normalized_gas(
                 "COPERNICUS/S5P/OFFL/L3_NO2",
@@ -370,27 +429,51 @@ class GeoAnalytics:
                 date_range_annual,
             ),
         ]
-        self.base_aq = (
-            ee.ImageCollection(aq_components).mean().rename("AQ_Composite_0_100")
-        )
+        return ee.ImageCollection(aq_components).mean().rename("AQ_Composite_0_100")
+
+    # Layer -> (image builder for one date range, band, reduction scale)
+    _SERIES_LAYERS = {
+        "heat": (lambda self, r: self._heat_image(r), "LST_Day_1km", 1000),
+        "NDVI": (
+            lambda self, r: self._s2_composite(r).normalizedDifference(["B8", "B4"]).rename("NDVI"),
+            "NDVI",
+            20,
+        ),
+        "AQ": (lambda self, r: self._aq_image(r, r), "AQ_Composite_0_100", 5000),
+    }
+
+    @ee_client.traced
+    def monthly_means(self, layer_name: str, date_ranges: List[Tuple[str, str]]) -> List[Optional[float]]:
+        """
+        Mean of one layer over the region for each (start, end) date range, in
+        one round trip: the ranges are mapped server side.
+        """
+        build, band, scale = self._SERIES_LAYERS[layer_name]
 
+        def _month_mean(date_range):
+            date_range = ee.List(date_range)
+            image = build(self, (ee.Date(date_range.get(0)), ee.Date(date_range.get(1))))
+            return self._mean(image, scale, self.region).get(band)
 
-        self.temp_image = self.base_temp
-        self.ndvi = self.base_ndvi
-        self.aq_index = self.base_aq
-        print("🌍 Base layers calculated successfully.")
+        values = ee_client.get_info(
+            ee.List([list(r) for r in date_ranges]).map(_month_mean), "reduceRegion"
+        )
+        return list(values) if values else [None] * len(date_ranges)
 
+    @ee_client.traced
     def get_initial_kpis(self, layer_name):      
         if layer_name == 'heat': 
             try: 
                 temp = self._mean(self.temp_image, 1000, self.region)
-                temp_res = temp.getInfo()
+                temp_res = ee_client.get_info(temp, "reduceRegion")
                 temp_kpi = temp_res.get("LST_Day_1km") if temp_res else None
                 self.avg_surface_temp = temp_kpi
 
                 return {
                     "avg_surface_temp": temp_kpi
                 }
+            except EEOverloadedError:
+                raise
             except Exception as error: 
                 print(f"Error while calculating the kpi's: {error}")
                 return None 
@@ -399,13 +482,15 @@ class GeoAnalytics:
         elif layer_name == 'NDVI': 
             try: 
                 ndvi = self._mean(self.ndvi, 20, self.region)
-                ndvi_res = ndvi.getInfo()
+                ndvi_res = ee_client.get_info(ndvi, "reduceRegion")
                 nvdi_kpi = ndvi_res.get("NDVI") if ndvi_res else None
                 self.avg_NVDI = nvdi_kpi
                 
                 return {
                     "avg_NVDI": nvdi_kpi
                 }
+            except EEOverloadedError:
+                raise
             except Exception as error: 
                 print(f"Error while calculating the kpi's: {error}")
                 return None
@@ -414,7 +499,7 @@ class GeoAnalytics:
         elif layer_name == 'AQ': 
             try: 
                 air_q = self._mean(self.aq_index, 5000, self.region)
-                air_q_res = air_q.getInfo()
+                air_q_res = ee_client.get_info(air_q, "reduceRegion")
                 air_q_kpi = air_q_res.get("AQ_Composite_0_100") if air_q_res else None
                 self.avg_air_quality = air_q_kpi
                 
@@ -423,19 +508,69 @@ class GeoAnalytics:
                 }
                 
 
+            except EEOverloadedError:
+                raise
             except Exception as error: 
                 print(f"Error while calculating the kpi's: {error}")
             
 
         
 
+    @ee_client.traced
+    def get_all_kpis(self) -> Optional[Dict[str, Any]]:
+        """
+        Heat, NDVI and AQ KPIs in one round trip: the three reductions (at their
+        1000/20/5000 m scales) are evaluated inside one server-side dictionary.
+        """
+        res = self._layer_means(self.region)
+        if res is None:
+            return None
+
+        self.avg_surface_temp = (res.get("heat") or {}).get("LST_Day_1km")
+        self.avg_NVDI = (res.get("NDVI") or {}).get("NDVI")
+        self.avg_air_quality = (res.get("AQ") or {}).get("AQ_Composite_0_100")
+
+        return {
+            "avg_surface_temp": self.avg_surface_temp,
+            "avg_NVDI": self.avg_NVDI,
+            "avg_air_quality": self.avg_air_quality,
+        }
+
+    @ee_client.traced
+    def get_area_kpis(self, geojson_area: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Exact heat, NDVI and AQ means over a GeoJSON area, in one round trip.
+        """
+        res = self._layer_means(self._geojson_to_ee_geom(geojson_area, 20))
+        if res is None:
+            return None
+        return {
+            "avg_surface_temp": (res.get("heat") or {}).get("LST_Day_1km"),
+            "avg_NVDI": (res.get("NDVI") or {}).get("NDVI"),
+            "avg_air_quality": (res.get("AQ") or {}).get("AQ_Composite_0_100"),
+        }
+
+    def _layer_means(self, geom: ee.Geometry) -> Optional[Dict[str, Any]]:
+        stats = ee.Dictionary({
+            "heat": self._mean(self.temp_image, 1000, geom),
+            "NDVI": self._mean(self.ndvi, 20, geom),
+            "AQ": self._mean(self.aq_index, 5000, geom),
+        })
+        try:
+            return ee_client.get_info(stats, "reduceRegion") or {}
+        except EEOverloadedError:
+            raise
+        except Exception as error:
+            print(f"Error while calculating the kpi's: {error}")
+            return None
+
+    @ee_client.traced
     def _fit_linear_models_simple(
         self, sample_scale: int = 10, n: int = 4000, seed: int = 13
     ) -> Dict[str, Dict[str, ee.Number]]:
         """Ajusta un modelo de regresión lineal simple (NDVI vs LST y NDVI vs AQ)."""
         samples = (
-            self.temp_image.addBands(self.ndvi)
-            .addBands(self.aq_index)
+            self.cube.select("LST_Day_1km", "NDVI", "AQ_Composite_0_100")
             .sample(
                 region=self.region,
                 scale=sample_scale,
@@ -444,82 +579,74 @@ class GeoAnalytics:
                 seed=seed,
             )
         )
-        count = samples.size().getInfo()
+        fits = {
+            "LST": samples.reduceColumns(ee.Reducer.linearFit(), selectors=["NDVI", "LST_Day_1km"]),
+            "AQ": samples.reduceColumns(ee.Reducer.linearFit(), selectors=["NDVI", "AQ_Composite_0_100"]),
+        }
+        # The sample count and both fits are independent: fetched in parallel
+        count, res_lst, res_aq = fanout.run([
+            lambda: ee_client.get_info(samples.size(), "sample"),
+            lambda: ee_client.get_info(fits["LST"], "sample"),
+            lambda: ee_client.get_info(fits["AQ"], "sample"),
+        ])
+        for result in (count, res_lst, res_aq):
+            if isinstance(result, Exception):
+                raise result
         print(f"   Scale: {sample_scale}m", flush=True)
         print(f"   Samples found in polygon: {count}", flush=True)
-
-        def _fit(x: str, y: str) -> Dict[str, ee.Number]:
-            fit = samples.reduceColumns(ee.Reducer.linearFit(), selectors=[x, y])
-            res = fit.getInfo()
-            print(f"   Fit {y} vs {x}: {res}", flush=True)
-            return {"a": ee.Number(fit.get("scale")), "b": ee.Number(fit.get("offset"))}
+        print(f"   Fit LST_Day_1km vs NDVI: {res_lst}", flush=True)
+        print(f"   Fit AQ_Composite_0_100 vs NDVI: {res_aq}", flush=True)
 
         return {
-            "LST": _fit("NDVI", "LST_Day_1km"),
-            "AQ": _fit("NDVI", "AQ_Composite_0_100"),
+            name: {"a": ee.Number(fit.get("scale")), "b": ee.Number(fit.get("offset"))}
+            for name, fit in fits.items()
         }
 
-    def _linreg_metrics(
-        self,
-        features: ee.FeatureCollection,
-        y_true_key: str = "y_true",
-        y_pred_key: str = "y_pred",
-    ) -> ee.List:
-        """Calculates R^2 y RMSE from the FeatureCollection"""
-        fc = features.filter(ee.Filter.notNull([y_true_key, y_pred_key]))
-        y = ee.List(fc.aggregate_array(y_true_key))
-        yhat = ee.List(fc.aggregate_array(y_pred_key))
-        n = y.length().min(yhat.length())
-
-        def _metrics(y: ee.List, yhat: ee.List, n: ee.Number) -> ee.List:
-            mean_y = ee.Number(y.reduce(ee.Reducer.mean()))
-            ss_tot = ee.Number(
-                y.map(lambda v: ee.Number(v).subtract(mean_y).pow(2)).reduce(
-                    ee.Reducer.sum()
-                )
-            )
-            ss_res = ee.Number(
-                y.zip(yhat)
-                .map(
-                    lambda p: ee.Number(ee.List(p).get(0))
-                    .subtract(ee.Number(ee.List(p).get(1)))
-                    .pow(2)
-                )
-                .reduce(ee.Reducer.sum())
-            )
-            r2 = ee.Number(1).subtract(ss_res.divide(ss_tot))
-            rmse = ss_res.divide(ee.Number(n)).sqrt()
-            return ee.List([r2, rmse])
-
-        return ee.Algorithms.If(
-            n.eq(0),
-            ee.List([ee.Number(0), ee.Number(float("nan"))]),
-            _metrics(y.slice(0, n), yhat.slice(0, n), n),
+    @ee_client.traced
+    def simple_slopes(self, sample_scale: int = 250, n: int = 4000, seed: int = 13) -> Optional[Dict[str, float]]:
+        """
+        NDVI slopes of the simple LST and AQ models as numbers, both fits in
+        one round trip. None when the fit fails.
+        """
+        samples = (
+            self.cube.select("LST_Day_1km", "NDVI", "AQ_Composite_0_100")
+            .sample(region=self.region, scale=sample_scale, numPixels=n, geometries=False, seed=seed)
         )
+        fits = ee.Dictionary({
+            "LST": samples.reduceColumns(ee.Reducer.linearFit(), selectors=["NDVI", "LST_Day_1km"]),
+            "AQ": samples.reduceColumns(ee.Reducer.linearFit(), selectors=["NDVI", "AQ_Composite_0_100"]),
+        })
+        try:
+            res = ee_client.get_info(fits, "sample") or {}
+        except EEOverloadedError:
+            raise
+        except Exception as e:
+            print(f"Simple model fit failed: {e}")
+            return None
+        slopes = {name: (res.get(name) or {}).get("scale") for name in ("LST", "AQ")}
+        return slopes if all(v is not None for v in slopes.values()) else None
 
+    @ee_client.traced
     def calibrate_precision(
         self,
-        train_frac: float = 0.7,
+        folds: int = regression.DEFAULT_FOLDS,
         sample_scale: int = 250,
-        n_samples: int = 8000,
+        n_samples: int = 4000,
         seed: int = 42,
     ):
         """
         Adjust multiple linear reg models (LST ~ C + NDVI + NDBI; AQ ~ C + NDVI)
-        and the score metrics (R^2, RMSE).
+        and the cross-validated score metrics (R^2, RMSE). The sample table is
+        downloaded in one round trip (at most ee_client.MAX_DOWNLOAD_FEATURES rows) and
+        fitted locally (utils/regression.py).
         """
         if self.ndbi is None:
             print("NDBI no calculated, using simple model for calibration.", flush=True)
             return
 
-        X = (
-            self.ndvi.rename("NDVI")
-            .addBands(self.ndbi.rename("NDBI"))
-            .addBands(ee.Image.constant(1).rename("C"))
-        )
-        feats = (
-            X.addBands(self.temp_image.rename("LST"))
-            .addBands(self.aq_index.rename("AQ"))
+        columns = ["NDVI", "NDBI", "LST_Day_1km", "AQ_Composite_0_100"]
+        samples = (
+            self.cube.select(*columns)
             .sample(
                 region=self.region,
                 scale=sample_scale,
@@ -527,78 +654,40 @@ class GeoAnalytics:
                 geometries=False,
                 seed=seed,
             )
-            .randomColumn("r", seed)
-        )
-
-        tr, te = feats.filter(ee.Filter.lt("r", train_frac)), feats.filter(
-            ee.Filter.gte("r", train_frac)
-        )
-
-        #LST regression
-        lst_reg = tr.reduceColumns(
-            ee.Reducer.linearRegression(3, 1), selectors=["C", "NDVI", "NDBI", "LST"]
-        )
-        B = ee.Array(lst_reg.get("coefficients"))
-        b0, b1, b2 = B.get([0, 0]), B.get([1, 0]), B.get([2, 0])
-        yhat_LST = te.map(
-            lambda f: f.set("y_true", f.get("LST")).set(
-                "y_pred",
-                ee.Number(b0)
-                .add(ee.Number(f.get("NDVI")).multiply(b1))
-                .add(ee.Number(f.get("NDBI")).multiply(b2)),
-            )
+            # numPixels is approximate, the download must stay under the limit
+            .limit(min(n_samples, ee_client.MAX_DOWNLOAD_FEATURES))
         )
-        mL = ee.List(self._linreg_metrics(yhat_LST))
-        r2_LST, rmse_LST = ee.Number(mL.get(0)), ee.Number(mL.get(1))
+        table = regression.sample_table(ee_client.get_info(samples, "sample"), columns)
+        print(f"   Calibration samples: {len(table)}", flush=True)
 
-        #Air quality regression
-        aq_reg = tr.reduceColumns(
-            ee.Reducer.linearRegression(2, 1), selectors=["C", "NDVI", "AQ"]
-        )
-        A = ee.Array(aq_reg.get("coefficients"))
-        a0, a1 = A.get([0, 0]), A.get([1, 0])
-        yhat_AQ = te.map(
-            lambda f: f.set("y_true", f.get("AQ")).set(
-                "y_pred", ee.Number(a0).add(ee.Number(f.get("NDVI")).multiply(a1))
-            )
-        )
-        mA = ee.List(self._linreg_metrics(yhat_AQ))
-        r2_AQ, rmse_AQ = ee.Number(mA.get(0)), ee.Number(mA.get(1))
+        lst = regression.fit(table, columns, "LST_Day_1km", ["NDVI", "NDBI"], folds=folds, seed=seed)
+        aq = regression.fit(table, columns, "AQ_Composite_0_100", ["NDVI"], folds=folds, seed=seed)
+        if lst is None or aq is None:
+            print("Not enough samples for calibration, using simple model.", flush=True)
+            return
 
         # Storing results
-        self.reg_coefs = {"LST": [b0, b1, b2], "AQ": [a0, a1]}
+        self.reg_coefs = {"LST": lst["coefficients"], "AQ": aq["coefficients"]}
         self.metrics = {
-            "LST": {"r2": r2_LST, "rmse": rmse_LST},
-            "AQ": {"r2": r2_AQ, "rmse": rmse_AQ},
+            name: {"r2": fit["cv"]["r2"], "rmse": fit["cv"]["rmse"], "folds": fit["cv"]["folds"], "n": fit["n"]}
+            for name, fit in (("LST", lst), ("AQ", aq))
         }
-        print(
-            f"Modelo LST: R^2={r2_LST.getInfo():.3f}, RMSE={rmse_LST.getInfo():.2f}°C"
-        )
-        print(f"Modelo AQ: R^2={r2_AQ.getInfo():.3f}, RMSE={rmse_AQ.getInfo():.2f}")
+        print(f"Modelo LST: R^2={lst['cv']['r2']:.3f}, RMSE={lst['cv']['rmse']:.2f}°C ({folds}-fold CV)")
+        print(f"Modelo AQ: R^2={aq['cv']['r2']:.3f}, RMSE={aq['cv']['rmse']:.2f} ({folds}-fold CV)")
 
 
     def _attr_modifiers_real(
         self, densidad: Dict[str, Any], trafico: Dict[str, Any], albedo: Dict[str, Any]
-    ) -> Tuple[ee.Number, ee.Number, ee.Number]:
-        """Calculates moddifiers of NDVI, LST, y AQ based on real data"""
-        dmin, dmax = self._unit_range("densidad", densidad["unit"])
-        tmin, tmax = self._unit_range("trafico", trafico["unit"])
-        amin, amax = self._unit_range("albedo", albedo["unit"])
-
-        a_val = (
-            ee.Number(albedo["value"]).divide(100.0).clamp(0, 1)
-            if albedo["unit"] == "cool_roof_pct"
-            else ee.Number(albedo["value"])
+    ) -> Tuple[float, float, float]:
+        """
+        NDVI, LST and AQ modifiers of the residential attributes, computed
+        locally with NumPy (utils/modifiers.py) and returned as plain floats.
+        """
+        units = {"densidad": densidad["unit"], "trafico": trafico["unit"], "albedo": albedo["unit"]}
+        result = modifiers.residential(
+            densidad["value"], trafico["value"], albedo["value"], units=units, norm=self.attr_norm
         )
-
-        d = self._norm_value(densidad["value"], dmin, dmax)
-        t = self._norm_value(trafico["value"], tmin, tmax)
-        a = self._norm_value(a_val, amin, amax)
-
-        ndvi_adj = ee.Number(0).subtract(d.multiply(0.12))
-        lst_extra = d.multiply(3.0).add(t.multiply(1.5)).subtract(a.multiply(5.0))
-        aq_extra = t.multiply(25.0).subtract(a.multiply(5.0))
-        return ndvi_adj, lst_extra, aq_extra
+        return tuple(float(v) for v in result)
 
     def _attr_modifiers_green(
         self,
@@ -606,29 +695,16 @@ class GeoAnalytics:
         pasto: Dict[str, Any],
         agua_bool: bool,
         copa: Dict[str, Any],
-    ) -> Tuple[ee.Number, ee.Number, ee.Number]:
-        """Calculates modifiers of NDVI, LST, y AQ based on attributes from the green area proposal. """
-        amin, amax = self._unit_range("arboles", arboles["unit"])
-        pmin, pmax = self._unit_range("pasto", pasto["unit"])
-        cmin, cmax = self._unit_range("copa", copa["unit"])
-
-        a_n = self._norm_value(arboles["value"], amin, amax)
-        p_n = self._norm_value(pasto["value"], pmin, pmax)
-        c_n = self._norm_value(copa["value"], cmin, cmax)
-
-        ndvi_adj = a_n.multiply(0.10).add(p_n.multiply(0.06)).add(c_n.multiply(0.18))
-        lst_extra = a_n.multiply(-2.0).add(p_n.multiply(-1.0)).add(c_n.multiply(-2.5))
-        aq_extra = a_n.multiply(-10.0).add(p_n.multiply(-4.0)).add(c_n.multiply(-8.0))
-
-        if agua_bool:
-            ndvi_adj = ndvi_adj.add(0.03)
-            lst_extra = lst_extra.add(-1.5)
-            aq_extra = aq_extra.add(-3.0)
-
-        ndvi_adj = ee.Number(ndvi_adj).clamp(-0.20, 0.30)
-        lst_extra = ee.Number(lst_extra).clamp(-6.0, 6.0)
-        aq_extra = ee.Number(aq_extra).clamp(-25.0, 25.0)
-        return ndvi_adj, lst_extra, aq_extra
+    ) -> Tuple[float, float, float]:
+        """
+        NDVI, LST and AQ modifiers of the green-area attributes, computed
+        locally with NumPy (utils/modifiers.py) and returned as plain floats.
+        """
+        units = {"arboles": arboles["unit"], "pasto": pasto["unit"], "copa": copa["unit"]}
+        result = modifiers.green(
+            arboles["value"], pasto["value"], copa["value"], agua_bool, units=units, norm=self.attr_norm
+        )
+        return tuple(float(v) for v in result)
 
     
 
@@ -638,6 +714,7 @@ class GeoAnalytics:
         ndvi_target: ee.Image,
         lst_extra: ee.Number,
         aq_extra: ee.Number,
+        aq_field: Optional[ee.Image] = None,
     ):
         
         #Default values (to prevent breaking the system if one fails)
@@ -680,6 +757,8 @@ class GeoAnalytics:
                 offset_aq = ee.Image.constant(s["AQ"]["b"]).unmask(def_aq_offset)
 
                 used_model = "SIMPLE CONFIRMED"
+            except EEOverloadedError:
+                raise
             except Exception as e: 
                 print(f"⚠️ Simple model crashed (using defaults): {e}")
                 used_model = "DEFAULT (Rescue)"
@@ -697,13 +776,15 @@ class GeoAnalytics:
             .rename("LST_Day_1km")
         )
 
-        self.sim_aq = (
+        sim_aq = (
             aq_reg
             .where(mask, aq_reg.add(aq_extra))
             .unmask(aq_extra.add(30)) # Si todo es null, se pone 30 + extra
-            .clamp(0, 100)
-            .rename("AQ_Composite_0_100")
         )
+        if aq_field is not None:
+            # Spatial AQ delta (plume), also outside the painted area
+            sim_aq = sim_aq.add(aq_field)
+        self.sim_aq = sim_aq.clamp(0, 100).rename("AQ_Composite_0_100")
 
     def predict_residential_with_real_attributes(
         self,
@@ -714,9 +795,8 @@ class GeoAnalytics:
         date_range_monthly: Tuple[str, str] = ("2025-05-01", "2025-05-31"),
     ):
         """Predicts impact on residencial zone"""
-        ee_geom = self._geojson_to_ee_geom(geojson_area)
-        month = self._month(date_range_monthly[0])
-        ndvi_p = self._ndvi_percentiles_for_month(month)
+        ee_geom = self._geojson_to_ee_geom(geojson_area, 20)
+        ndvi_p = self._ndvi_percentiles(date_range_monthly[0])
 
         # Target NDVI: Percentil 50 ('residential')
         ndvi_adj_base = ndvi_p.select("NDVI_p50").rename("NDVI_target").clamp(0, 1)
@@ -724,9 +804,10 @@ class GeoAnalytics:
         ndvi_adj, lst_extra, aq_extra = self._attr_modifiers_real(
             densidad, trafico, albedo
         )
-        ndvi_target = ndvi_adj_base.add(ndvi_adj).clamp(0, 1)
+        # The modifiers enter the expression as constants
+        ndvi_target = ndvi_adj_base.add(ee.Number(ndvi_adj)).clamp(0, 1)
 
-        self._apply_simulation(ee_geom, ndvi_target, lst_extra, aq_extra)
+        self._apply_simulation(ee_geom, ndvi_target, ee.Number(lst_extra), ee.Number(aq_extra))
         print("Prediction of residential zone with real values.")
 
     def predict_green_area_with_attributes(
@@ -739,9 +820,8 @@ class GeoAnalytics:
         date_range_monthly: Tuple[str, str] = ("2025-05-01", "2025-05-31")
     ):
         """Predicts impact on green areas"""
-        ee_geom = self._geojson_to_ee_geom(geojson_area)
-        month = self._month(date_range_monthly[0])
-        ndvi_p = self._ndvi_percentiles_for_month(month)
+        ee_geom = self._geojson_to_ee_geom(geojson_area, 20)
+        ndvi_p = self._ndvi_percentiles(date_range_monthly[0])
 
         # Target NDVI: Percentil 90 ('green_area')
         ndvi_adj_base = ndvi_p.select("NDVI_p90").rename("NDVI_target").clamp(0, 1)
@@ -749,9 +829,10 @@ class GeoAnalytics:
         ndvi_adj, lst_extra, aq_extra = self._attr_modifiers_green(
             arboles, pasto, agua, copa
         )
-        ndvi_target = ndvi_adj_base.add(ndvi_adj).clamp(0, 1)
+        # The modifiers enter the expression as constants
+        ndvi_target = ndvi_adj_base.add(ee.Number(ndvi_adj)).clamp(0, 1)
 
-        self._apply_simulation(ee_geom, ndvi_target, lst_extra, aq_extra)
+        self._apply_simulation(ee_geom, ndvi_target, ee.Number(lst_extra), ee.Number(aq_extra))
         print("Green Area prediction calculated.")
 
     def _predict_changes_historic_percentiles(
@@ -760,29 +841,33 @@ class GeoAnalytics:
         preset: str,
         date_range_monthly: Tuple[str, str] = ("2025-05-01", "2025-05-31"),
     ):
-        ee_geom = self._geojson_to_ee_geom(geojson_area)
+        ee_geom = self._geojson_to_ee_geom(geojson_area, 20)
         tgt = self._CFG["presets"].get(preset)
         if not tgt:
             print(f"Preset '{preset}' invalid.")
             return
 
-        month = self._month(date_range_monthly[0])
-        ndvi_p = self._ndvi_percentiles_for_month(month)
+        ndvi_p = self._ndvi_percentiles(date_range_monthly[0])
 
         ndvi_target_image = ndvi_p.select(tgt).clamp(0, 1).rename("NDVI_target")
 
         lst_extra = ee.Number(0)
         aq_extra = ee.Number(0)
+        aq_field = None
 
         if preset == "industrial":
             lst_extra = ee.Number(self.temp_industry)
             aq_extra = ee.Number(self.aq_industry)
+            if self.plume is not None:
+                aq_field = self._plume_image(self.plume)
             print(
                 f"Preset 'industrial' apply: ΔTemp={self.temp_industry}, ΔAQ={self.aq_industry}"
+                + (" + plume" if aq_field is not None else "")
             )
 
-        self._apply_simulation(ee_geom, ndvi_target_image, lst_extra, aq_extra)
+        self._apply_simulation(ee_geom, ndvi_target_image, lst_extra, aq_extra, aq_field)
 
+    @ee_client.traced
     def get_kpis_post_sim(self) -> Dict[str, float]: 
         if self.sim_temp is None or self.sim_ndvi is None or self.sim_aq is None: 
             return None
@@ -809,21 +894,31 @@ class GeoAnalytics:
             bestEffort=True
         )
 
+        # The three reductions are independent: fetched in parallel
+        results = fanout.run([
+            lambda: ee_client.get_info(stats_temp.get("LST_Day_1km"), "reduceRegion"),
+            lambda: ee_client.get_info(stats_ndvi.get("NDVI"), "reduceRegion"),
+            lambda: ee_client.get_info(stats_aq.get("AQ_Composite_0_100"), "reduceRegion"),
+        ])
         try: 
-            temp_mean_sim = stats_temp.get("LST_Day_1km").getInfo()
-            NDVI_mean_sim = stats_ndvi.get("NDVI").getInfo()
-            aq_val_sim = stats_aq.get("AQ_Composite_0_100").getInfo()
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            temp_mean_sim, NDVI_mean_sim, aq_val_sim = results
 
             return {
                 "avg_surface_temp_sim" : temp_mean_sim, 
                 "avg_NVDI_sim" : NDVI_mean_sim, 
                 "avg_AQ_sim" : aq_val_sim 
             }
+        except EEOverloadedError:
+            raise
         except Exception as e: 
             print(f"Error while calculating post sim kpis: {e}")
             return None
 
 
+    @ee_client.traced
     def impact_report(
         self,
         geojson_area: Dict[str, Any],
@@ -835,11 +930,13 @@ class GeoAnalytics:
         Calculates and reports the impact of the  simulation (baseline vs. post-simulación)
         in a geojson geometry
         """
-        ee_geom = self._geojson_to_ee_geom(geojson_area)
+        ee_geom = self._geojson_to_ee_geom(geojson_area, 20)
 
         if calibrate:
             try:
                 self.calibrate_precision()
+            except EEOverloadedError:
+                raise
             except Exception as e:
                 print(f"Fine tunning fail, using simple model: {e}")
 
@@ -855,9 +952,6 @@ class GeoAnalytics:
             "ndvi_mean": self._mean(self.ndvi, 20, area),
             "aq_mean": self._mean(self.aq_index, 100, area),
         }
-        print(f"   Temp Raw: {base_stats['temp_c_mean'].getInfo()}", flush=True)
-        print(f"   NDVI Raw: {base_stats['ndvi_mean'].getInfo()}", flush=True)
-        print(f"   AQ Raw:   {base_stats['aq_mean'].getInfo()}", flush=True)
 
         # Prediction time
         if (
@@ -898,19 +992,21 @@ class GeoAnalytics:
         }
 
         # --- 4. Getting results and reporting them back ---
-        def _safe_fetch(m: ee.Dictionary, key: str) -> Optional[float]:
-            try:
-                val = m.getInfo()
-                return val.get(key) if val else None
-            except Exception:
-                return None
-
-        base_temp = _safe_fetch(base_stats["temp_c_mean"], "LST_Day_1km")
-        base_ndvi = _safe_fetch(base_stats["ndvi_mean"], "NDVI")
-        base_aq = _safe_fetch(base_stats["aq_mean"], "AQ_Composite_0_100")
-        post_temp = _safe_fetch(post_stats["temp_c_mean"], "LST_Day_1km")
-        post_ndvi = _safe_fetch(post_stats["ndvi_mean"], "NDVI")
-        post_aq = _safe_fetch(post_stats["aq_mean"], "AQ_Composite_0_100")
+        # The six reductions are independent: fetched in parallel, failures as None
+        keys = {"temp_c_mean": "LST_Day_1km", "ndvi_mean": "NDVI", "aq_mean": "AQ_Composite_0_100"}
+        results = fanout.run(
+            lambda m=stats[name]: ee_client.get_info(m, "reduceRegion")
+            for stats in (base_stats, post_stats)
+            for name in keys
+        )
+        values = [
+            None if isinstance(val, Exception) or not val else val.get(key)
+            for val, key in zip(results, [*keys.values(), *keys.values()])
+        ]
+        base_temp, base_ndvi, base_aq, post_temp, post_ndvi, post_aq = values
+        print(f"   Temp Raw: {results[0]}", flush=True)
+        print(f"   NDVI Raw: {results[1]}", flush=True)
+        print(f"   AQ Raw:   {results[2]}", flush=True)
 
         delta_temp = (
             post_temp - base_temp
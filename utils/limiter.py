@@ -0,0 +1,227 @@
+# utils/limiter.py
+#
+# Client-side concurrency governor for Earth Engine calls. Every round trip
+# takes a slot from an adaptive limit (AIMD: +1 slot per window of successful
+# calls, halved when Earth Engine pushes back with 429 / "Too many concurrent
+# aggregations"), so a worker stays close to its quota without collapsing into
+# errors under bursts. Failed calls are classified; overload and transient
+# errors are retried with jittered exponential backoff, others fail immediately.
+#
+# Limits are per process; with several gunicorn workers each one adapts on its own.
+
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from . import metrics
+
+OVERLOAD = "overload"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+_OVERLOAD_MARKERS = (
+    "too many concurrent aggregations",
+    "too many requests",
+    "rate limit",
+    "quota exceeded",
+    "resource_exhausted",
+)
+_TRANSIENT_MARKERS = (
+    "service unavailable",
+    "backend error",
+    "internal error",
+    "deadline exceeded",
+    "connection reset",
+    "connection aborted",
+    "temporarily unavailable",
+)
+
+# HTTP status in an error text: "429 Too Many Requests", "<HttpError 429 when
+# requesting ...>", "status: 503"; other numbers (ids, coordinates) are ignored
+_STATUS_IN_MESSAGE = re.compile(r"(?:^|httperror\s+|status(?:[ _]code)?[\s:=]+)(\d{3})\b")
+
+
+class EEOverloadedError(Exception):
+    """
+    Earth Engine is over quota and retries did not help. Routes answer 503 with
+    a Retry-After header.
+    """
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify_error(error) -> str:
+    """
+    Classify an Earth Engine failure as OVERLOAD (retry, shrink the limit),
+    TRANSIENT (retry) or FATAL (bad request, missing asset, user computation
+    timeout: retrying would fail the same way).
+    """
+    if isinstance(error, EEOverloadedError):
+        return OVERLOAD
+
+    status = getattr(getattr(error, "resp", None), "status", None)
+    status = status or getattr(error, "status_code", None) or getattr(error, "code", None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        status = None
+    message = str(error).lower()
+    if status is None:
+        match = _STATUS_IN_MESSAGE.search(message.lstrip("<"))
+        status = int(match.group(1)) if match else None
+    if status == 429:
+        return OVERLOAD
+    if status in (500, 502, 503, 504):
+        return TRANSIENT
+
+    if any(marker in message for marker in _OVERLOAD_MARKERS):
+        return OVERLOAD
+    if any(marker in message for marker in _TRANSIENT_MARKERS):
+        return TRANSIENT
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    return FATAL
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=40, decrease_factor=0.5, cooldown_s=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.decrease_factor = decrease_factor
+        self.cooldown_s = cooldown_s
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._export()
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a slot. Raises EEOverloadedError if none frees up in `timeout` s.
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    metrics.EE_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+                    raise EEOverloadedError(
+                        "Earth Engine request queue is full, try again later",
+                        retry_after=max(1, math.ceil(timeout or 1)),
+                    )
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            self._export()
+        metrics.EE_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    def release(self, outcome="ok"):
+        """
+        Free a slot and adapt the limit to the outcome of the call.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "ok":
+                # +1 slot after a full window of successful calls
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome == OVERLOAD:
+                # Errors of calls started at the same time count as one signal
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown_s:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            self._export()
+            self._cond.notify_all()
+
+    def _export(self):
+        metrics.EE_CONCURRENCY_LIMIT.set(int(self.limit))
+        metrics.EE_IN_FLIGHT.set(self.in_flight)
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff ("full jitter") bounded by a total time budget.
+    """
+
+    def __init__(self, max_retries=4, base_s=0.5, cap_s=16.0, budget_s=30.0):
+        self.max_retries = max_retries
+        self.base_s = base_s
+        self.cap_s = cap_s
+        self.budget_s = budget_s
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.cap_s, self.base_s * (2 ** attempt)))
+
+
+def call(fetch, call_name="getInfo", limiter=None, policy=None):
+    """
+    Run one Earth Engine round trip under the concurrency limit, retrying
+    overload and transient failures.
+    """
+    limiter = limiter or get_limiter()
+    policy = policy or _policy
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        limiter.acquire(timeout=_queue_timeout_s)
+        try:
+            result = fetch()
+        except Exception as e:
+            kind = classify_error(e)
+            limiter.release(kind)
+            if kind == FATAL:
+                raise
+
+            delay = policy.backoff(attempt)
+            out_of_budget = time.monotonic() - started + delay > policy.budget_s
+            if attempt >= policy.max_retries or out_of_budget:
+                if kind == OVERLOAD:
+                    raise EEOverloadedError(
+                        f"Earth Engine is over quota: {e}",
+                        retry_after=max(1, math.ceil(policy.cap_s / 2)),
+                    ) from e
+                raise
+
+            metrics.EE_RETRIES.labels(call=call_name, reason=kind).inc()
+            attempt += 1
+            time.sleep(delay)
+        else:
+            limiter.release("ok")
+            return result
+
+
+_queue_timeout_s = float(os.getenv("EE_QUEUE_TIMEOUT_S", "30"))
+_policy = RetryPolicy(
+    max_retries=int(os.getenv("EE_MAX_RETRIES", "4")),
+    base_s=float(os.getenv("EE_BACKOFF_BASE_S", "0.5")),
+    cap_s=float(os.getenv("EE_BACKOFF_MAX_S", "16")),
+    budget_s=float(os.getenv("EE_RETRY_BUDGET_S", "30")),
+)
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """
+    Return the process-wide limiter shared by all Earth Engine calls.
+    """
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = AdaptiveLimiter(
+                    initial=int(os.getenv("EE_INITIAL_CONCURRENCY", "8")),
+                    minimum=int(os.getenv("EE_MIN_CONCURRENCY", "1")),
+                    maximum=int(os.getenv("EE_MAX_CONCURRENCY", "40")),
+                )
+    return _limiter
@@ -0,0 +1,304 @@
+# utils/metrics.py
+#
+# Minimal Prometheus-style metrics (counters, gauges, histograms with labels)
+# rendered in the text exposition format by the /metrics endpoint.
+# Values are kept per process: with several gunicorn workers each one reports
+# its own series.
+
+import threading
+
+# Request latencies go from a few ms (CRUD) to the 120 s gunicorn timeout (geo)
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        self._callbacks = []
+        REGISTRY.register(self)
+
+    def add_callback(self, callback):
+        """
+        Register a callable returning [(labels dict, value), ...] evaluated at
+        render time, for values owned by another object (e.g. lru_cache stats).
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            children = list(self._children.items())
+            callbacks = list(self._callbacks)
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        for callback in callbacks:
+            for labels, value in callback():
+                key = tuple(str(labels[name]) for name in self.labelnames)
+                lines.append(f"{self.name}{self._format_labels(key)} {float(value)}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = float(value)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{self._format_labels(key)} {child.value}"]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount=1.0):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, key, child):
+        lines = []
+        cumulative = 0
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(
+                f"{self.name}_bucket{self._format_labels(key, {'le': bound})} {cumulative}"
+            )
+        lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {count}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Application metrics ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, until the last byte is sent.",
+    ["method", "endpoint", "status"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ["endpoint"],
+)
+
+BULKHEAD_IN_FLIGHT = Gauge(
+    "bulkhead_requests_in_flight",
+    "Requests holding a slot of a bulkhead (geo or crud) in this process.",
+    ["pool"],
+)
+BULKHEAD_REJECTED = Counter(
+    "bulkhead_rejected_total",
+    "Requests answered 503 because their bulkhead had no free slot.",
+    ["pool"],
+)
+BULKHEAD_QUEUE_WAIT_SECONDS = Histogram(
+    "bulkhead_queue_wait_seconds",
+    "Time spent waiting for a bulkhead slot.",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+EE_CALLS = Counter(
+    "ee_calls_total",
+    "Earth Engine round trips by call type and calling GeoAnalytics method.",
+    ["call", "method", "status"],
+)
+EE_CALL_SECONDS = Histogram(
+    "ee_call_duration_seconds",
+    "Earth Engine round trip latency by call type and calling GeoAnalytics method.",
+    ["call", "method"],
+)
+
+EE_RETRIES = Counter(
+    "ee_retries_total",
+    "Earth Engine round trips retried, by call type and error class (overload or transient).",
+    ["call", "reason"],
+)
+EE_QUEUE_WAIT_SECONDS = Histogram(
+    "ee_queue_wait_seconds",
+    "Time spent waiting for a slot of the Earth Engine concurrency limit.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+EE_CONCURRENCY_LIMIT = Gauge(
+    "ee_concurrency_limit",
+    "Current adaptive limit of concurrent Earth Engine round trips in this process.",
+)
+EE_IN_FLIGHT = Gauge(
+    "ee_requests_in_flight",
+    "Earth Engine round trips currently running in this process.",
+)
+EE_COALESCED = Counter(
+    "ee_coalesced_total",
+    "Earth Engine computations served from an identical in-flight call instead of a new round trip.",
+    ["call", "scope"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"],
+)
+
+CACHE_WARM_SECONDS = Gauge(
+    "cache_warm_duration_seconds",
+    "Duration of the last cache warming run.",
+)
+CACHE_WARM_ITEMS = Counter(
+    "cache_warm_items_total",
+    "Computations evaluated by cache warming, by result (ok or error).",
+    ["result"],
+)
+
+GEOMETRY_VERTICES = Counter(
+    "geometry_vertices_total",
+    "Polygon vertices received (input) and sent to Earth Engine after simplification (simplified).",
+    ["stage"],
+)
+
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed by statement type.",
+    ["operation"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency by statement type.",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    Count one lookup in a named cache.
+    """
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_lru_cache(cache: str, func):
+    """
+    Export the hit/miss counters of a functools.lru_cache wrapped function.
+    """
+
+    def collect():
+        info = func.cache_info()
+        return [
+            ({"cache": cache, "result": "hit"}, info.hits),
+            ({"cache": cache, "result": "miss"}, info.misses),
+        ]
+
+    CACHE_REQUESTS.add_callback(collect)
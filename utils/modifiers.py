@@ -0,0 +1,149 @@
+# utils/modifiers.py
+#
+# Attribute modifiers of the residential and green-area presets: how much the
+# user's attributes (building density, traffic, albedo / trees, grass, canopy,
+# water) shift NDVI, LST and AQ inside the painted area. This is plain scalar
+# arithmetic, so it is computed locally with NumPy; GeoAnalytics passes the
+# results to Earth Engine as constants, and /geo/sweep evaluates whole grids of
+# attribute combinations at once.
+
+from .startup import LazyModule
+
+# NumPy is only loaded when a modifier is first evaluated
+np = LazyModule("numpy")
+
+# Normalization range of each attribute, by unit
+ATTR_NORM = {
+    # existentes (residencial)
+    "densidad": {"buildings_per_km2": {"min": 0.0, "max": 1000.0}},
+    "trafico": {"veh_day": {"min": 0.0, "max": 20000.0}},
+    "albedo": {
+        "albedo_0_1": {"min": 0.0, "max": 1.0},
+        "cool_roof_pct": {"min": 0.0, "max": 100.0},
+    },
+    # nuevos (area verde)
+    "arboles": {"trees_per_ha": {"min": 0.0, "max": 400.0}},
+    "pasto": {"pct": {"min": 0.0, "max": 100.0}},
+    "copa": {"pct": {"min": 0.0, "max": 100.0}},
+}
+
+DEFAULT_UNITS = {
+    "densidad": "buildings_per_km2",
+    "trafico": "veh_day",
+    "albedo": "albedo_0_1",
+    "arboles": "trees_per_ha",
+    "pasto": "pct",
+    "copa": "pct",
+}
+
+# Attributes of each preset, in sweep axis order
+PRESET_ATTRIBUTES = {
+    "residential_real": ("densidad", "trafico", "albedo"),
+    "green_real": ("arboles", "pasto", "copa", "agua"),
+}
+
+
+def unit_range(var, unit, norm=ATTR_NORM):
+    """Minimum and maximum of an attribute in the given unit."""
+    cfg = norm.get(var, {}).get(unit)
+    if cfg is None:
+        raise ValueError(f"Unity not suported for {var}: {unit}")
+    return cfg["min"], cfg["max"]
+
+
+def norm_value(x, vmin, vmax):
+    """Normalize to [0, 1]."""
+    return np.clip((np.asarray(x, dtype=float) - vmin) / (vmax - vmin), 0, 1)
+
+
+def residential(densidad, trafico, albedo, units=None, norm=ATTR_NORM):
+    """
+    NDVI, LST and AQ modifiers of the residential preset. Values may be
+    scalars or arrays (broadcast together).
+    """
+    units = {**DEFAULT_UNITS, **(units or {})}
+    d = norm_value(densidad, *unit_range("densidad", units["densidad"], norm))
+    t = norm_value(trafico, *unit_range("trafico", units["trafico"], norm))
+
+    a_val = np.asarray(albedo, dtype=float)
+    if units["albedo"] == "cool_roof_pct":
+        a_val = np.clip(a_val / 100.0, 0, 1)
+    a = norm_value(a_val, *unit_range("albedo", units["albedo"], norm))
+
+    ndvi_adj = 0 - d * 0.12
+    lst_extra = d * 3.0 + t * 1.5 - a * 5.0
+    aq_extra = t * 25.0 - a * 5.0
+    return ndvi_adj, lst_extra, aq_extra
+
+
+def green(arboles, pasto, copa, agua, units=None, norm=ATTR_NORM):
+    """
+    NDVI, LST and AQ modifiers of the green-area preset. Values may be
+    scalars or arrays (broadcast together); `agua` is boolean.
+    """
+    units = {**DEFAULT_UNITS, **(units or {})}
+    a_n = norm_value(arboles, *unit_range("arboles", units["arboles"], norm))
+    p_n = norm_value(pasto, *unit_range("pasto", units["pasto"], norm))
+    c_n = norm_value(copa, *unit_range("copa", units["copa"], norm))
+    water = np.asarray(agua, dtype=bool)
+
+    ndvi_adj = a_n * 0.10 + p_n * 0.06 + c_n * 0.18 + np.where(water, 0.03, 0.0)
+    lst_extra = a_n * -2.0 + p_n * -1.0 + c_n * -2.5 + np.where(water, -1.5, 0.0)
+    aq_extra = a_n * -10.0 + p_n * -4.0 + c_n * -8.0 + np.where(water, -3.0, 0.0)
+
+    return (
+        np.clip(ndvi_adj, -0.20, 0.30),
+        np.clip(lst_extra, -6.0, 6.0),
+        np.clip(aq_extra, -25.0, 25.0),
+    )
+
+
+# --- Sweeps ---
+
+MAX_SWEEP_POINTS = int(1e5)
+
+
+def sweep_axis(spec):
+    """
+    Values of one sweep axis: a list of values, or {"min", "max", "steps"}.
+    """
+    if isinstance(spec, dict):
+        return np.linspace(float(spec["min"]), float(spec["max"]), int(spec.get("steps", 10)))
+    if isinstance(spec, (list, tuple)):
+        return np.asarray(spec)
+    return np.asarray([spec])
+
+
+def sweep(preset, axes, units=None):
+    """
+    Evaluate the modifiers of `preset` on the full grid of the given axes
+    ({attribute: values}). Returns the axes used, their order, the grid shape
+    and the flattened (row-major) NDVI, LST and AQ modifiers.
+    """
+    attributes = PRESET_ATTRIBUTES.get(preset)
+    if attributes is None:
+        raise ValueError(f"Preset must be one of {', '.join(PRESET_ATTRIBUTES)}")
+
+    values = {
+        name: sweep_axis(axes.get(name, [False] if name == "agua" else [0]))
+        for name in attributes
+    }
+    if "agua" in values:
+        values["agua"] = values["agua"].astype(bool)
+    shape = tuple(len(v) for v in values.values())
+    if int(np.prod(shape)) > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep has {int(np.prod(shape))} points, the limit is {MAX_SWEEP_POINTS}")
+
+    grids = np.meshgrid(*values.values(), indexing="ij")
+    func = residential if preset == "residential_real" else green
+    ndvi_adj, lst_extra, aq_extra = func(*grids, units=units)
+
+    return {
+        "axes": {name: v.tolist() for name, v in values.items()},
+        # Axis order of the flattened grids (JSON objects are not ordered)
+        "dims": list(values),
+        "shape": list(shape),
+        "ndvi_adj": np.round(ndvi_adj, 6).ravel().tolist(),
+        "lst_extra": np.round(lst_extra, 6).ravel().tolist(),
+        "aq_extra": np.round(aq_extra, 6).ravel().tolist(),
+    }
@@ -0,0 +1,150 @@
+# utils/optimizer.py
+#
+# Green-area design optimizer. Searches the green_real attribute space
+# (arboles, pasto, copa, agua) for the designs with the best cooling and air
+# quality for their cost. Designs are scored with a local model: the preset's
+# attribute modifiers (utils/modifiers.py) plus the region's fitted NDVI -> LST
+# and NDVI -> AQ slopes, so the whole search runs in NumPy; Earth Engine is
+# only used to fetch the slopes and, optionally, to validate the chosen design.
+#
+# Search: a coarse grid, then a few rounds of refinement around (at most
+# MAX_REFINED designs of) the current Pareto front (cost vs ΔLST vs ΔAQ).
+
+from .modifiers import ATTR_NORM, green, np
+
+# Unit costs (USD), placeholders to be overridden per request with "costs"
+DEFAULT_COSTS = {
+    "arbol": 350.0,          # per tree planted
+    "pasto_m2": 12.0,        # per m² of grass
+    "copa_m2": 25.0,         # per m² of canopy cover (shade structures, mature stock)
+    "agua_ha": 40000.0,      # per hectare with a water feature
+}
+
+# Fallback slopes when the region's models can't be fitted (same as the simulation)
+DEFAULT_SLOPES = {"LST": -10.0, "AQ": -20.0}
+
+COARSE_STEPS = 9
+REFINE_ROUNDS = 3
+# Front designs refined per round (evenly spread over the front)
+MAX_REFINED = 50
+
+
+def _ranges():
+    return {
+        name: (ATTR_NORM[name][unit]["min"], ATTR_NORM[name][unit]["max"])
+        for name, unit in (("arboles", "trees_per_ha"), ("pasto", "pct"), ("copa", "pct"))
+    }
+
+
+def evaluate(designs, area_ha, slopes, costs):
+    """
+    Cost, ΔLST and ΔAQ of each design (array of rows arboles, pasto, copa,
+    agua). Δ values are the modeled change of the area caused by the design
+    attributes, relative to the preset's base vegetation.
+    """
+    arboles, pasto, copa, agua = designs.T
+    ndvi_adj, lst_extra, aq_extra = green(arboles, pasto, copa, agua.astype(bool))
+    delta_lst = slopes["LST"] * ndvi_adj + lst_extra
+    delta_aq = slopes["AQ"] * ndvi_adj + aq_extra
+
+    area_m2 = area_ha * 10000.0
+    cost = (
+        arboles * area_ha * costs["arbol"]
+        + pasto / 100.0 * area_m2 * costs["pasto_m2"]
+        + copa / 100.0 * area_m2 * costs["copa_m2"]
+        + agua * area_ha * costs["agua_ha"]
+    )
+    return cost, delta_lst, delta_aq
+
+
+def _scores(designs, area_ha, slopes, costs):
+    """evaluate(), rounded as reported so float noise does not split ties."""
+    cost, delta_lst, delta_aq = evaluate(designs, area_ha, slopes, costs)
+    return np.round(cost, 2), np.round(delta_lst, 4), np.round(delta_aq, 4)
+
+
+def pareto_mask(cost, delta_lst, delta_aq):
+    """
+    True for designs no other design beats on cost, ΔLST and ΔAQ at once
+    (lower is better for all three).
+    """
+    points = np.stack([cost, delta_lst, delta_aq], axis=1)
+    # Candidates still on the front, cheapest first: no point is dominated by a
+    # later one, so every point visited is on the front and removes what it
+    # dominates, and the work grows with the front size rather than len(points)²
+    candidates = np.lexsort((delta_aq, delta_lst, cost))
+    i = 0
+    while i < len(candidates):
+        point = points[candidates[i]]
+        rest = points[candidates]
+        not_dominated = np.any(rest < point, axis=1) | np.all(rest == point, axis=1)
+        i = int(np.count_nonzero(not_dominated[:i])) + 1
+        candidates = candidates[not_dominated]
+    keep = np.zeros(len(points), dtype=bool)
+    keep[candidates] = True
+    return keep
+
+
+def _grid(bounds, steps):
+    axes = [np.linspace(lo, hi, steps) for lo, hi in bounds] + [np.array([0.0, 1.0])]
+    return np.stack([g.ravel() for g in np.meshgrid(*axes, indexing="ij")], axis=1)
+
+
+def optimize(area_ha, slopes, costs=None, budget=None, max_front=50):
+    """
+    Pareto front of green_real designs for an area of `area_ha` hectares,
+    optionally limited to designs within `budget`. Returns the front sorted by
+    cost and the design with the largest cooling among them.
+    """
+    costs = {**DEFAULT_COSTS, **(costs or {})}
+    ranges = _ranges()
+    limits = np.array([ranges["arboles"], ranges["pasto"], ranges["copa"]])
+    steps = (limits[:, 1] - limits[:, 0]) / (COARSE_STEPS - 1)
+
+    designs = _grid(limits, COARSE_STEPS)
+    for _ in range(REFINE_ROUNDS):
+        cost, delta_lst, delta_aq = _scores(designs, area_ha, slopes, costs)
+        within = cost <= budget if budget is not None else np.ones(len(cost), dtype=bool)
+        mask = pareto_mask(cost[within], delta_lst[within], delta_aq[within])
+        front = designs[within][mask][np.argsort(cost[within][mask], kind="stable")]
+        if len(front) > MAX_REFINED:
+            front = front[np.unique(np.linspace(0, len(front) - 1, MAX_REFINED).round().astype(int))]
+
+        # Refine: half-step neighbourhoods around every front design
+        steps = steps / 2
+        neighbours = [designs]
+        for design in front:
+            bounds = [
+                (max(lo, design[k] - steps[k]), min(hi, design[k] + steps[k]))
+                for k, (lo, hi) in enumerate(limits)
+            ]
+            neighbours.append(_grid(bounds, 3))
+        designs = np.unique(np.round(np.concatenate(neighbours), 4), axis=0)
+
+    cost, delta_lst, delta_aq = _scores(designs, area_ha, slopes, costs)
+    within = cost <= budget if budget is not None else np.ones(len(cost), dtype=bool)
+    if not within.any():
+        return {"front": [], "best": None, "evaluated": int(len(designs))}
+
+    candidates = designs[within]
+    cost, delta_lst, delta_aq = cost[within], delta_lst[within], delta_aq[within]
+    mask = pareto_mask(cost, delta_lst, delta_aq)
+    order = np.argsort(cost[mask])
+    rows = [
+        {
+            "arboles": round(float(d[0]), 2),
+            "pasto": round(float(d[1]), 2),
+            "copa": round(float(d[2]), 2),
+            "agua": bool(d[3]),
+            "cost": round(float(c), 2),
+            "delta_lst": round(float(l), 4),
+            "delta_aq": round(float(a), 4),
+        }
+        for d, c, l, a in zip(candidates[mask][order], cost[mask][order], delta_lst[mask][order], delta_aq[mask][order])
+    ]
+    best = min(rows, key=lambda r: (r["delta_lst"], r["cost"]))
+    if len(rows) > max_front:
+        # Keep the cheapest and most effective ends, thin the middle evenly
+        picks = np.unique(np.linspace(0, len(rows) - 1, max_front).round().astype(int))
+        rows = [rows[i] for i in picks]
+    return {"front": rows, "best": best, "evaluated": int(len(designs))}
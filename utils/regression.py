@@ -0,0 +1,85 @@
+# utils/regression.py
+#
+# Local regression fitting for the calibrated simulation models. The sampled
+# pixel table (NDVI, NDBI, LST, AQ) is downloaded from Earth Engine once and
+# fitted here with NumPy least squares, together with k-fold cross-validated
+# R² and RMSE. Trying another model on the same table costs no round trips.
+
+from .startup import LazyModule
+
+# NumPy is only loaded when a model is first fitted
+np = LazyModule("numpy")
+
+DEFAULT_FOLDS = 5
+
+
+def sample_table(result, columns):
+    """
+    Rows of a downloaded sample (a FeatureCollection as returned by getInfo)
+    as a float array with one column per name. Rows missing any column are
+    dropped.
+    """
+    features = (result or {}).get("features", []) if isinstance(result, dict) else []
+    rows = []
+    for feature in features:
+        props = feature.get("properties") or {}
+        row = [props.get(name) for name in columns]
+        if all(isinstance(v, (int, float)) for v in row):
+            rows.append(row)
+    return np.asarray(rows, dtype=float).reshape(len(rows), len(columns))
+
+
+def _design(x):
+    """Predictor matrix with a leading intercept column."""
+    return np.column_stack([np.ones(len(x)), x])
+
+
+def scores(y, y_pred):
+    """R² and RMSE of a prediction."""
+    residual = y - y_pred
+    ss_res = float(np.sum(residual ** 2))
+    ss_tot = float(np.sum((y - np.mean(y)) ** 2))
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else 0.0
+    return {"r2": r2, "rmse": float(np.sqrt(ss_res / len(y)))}
+
+
+def cross_validate(X, y, folds=DEFAULT_FOLDS, seed=42):
+    """
+    Out-of-fold R² and RMSE of a least squares fit, with every fold solved at
+    once from the per-fold normal equations.
+    """
+    k = max(2, min(folds, len(y)))
+    fold = np.random.default_rng(seed).permutation(len(y)) % k
+    onehot = np.eye(k)[fold]
+
+    xtx = np.einsum("nk,ni,nj->kij", onehot, X, X)
+    xty = np.einsum("nk,ni,n->ki", onehot, X, y)
+    # Each fold is fitted on the rows of all the other folds
+    train_xtx = xtx.sum(axis=0) - xtx
+    train_xty = xty.sum(axis=0) - xty
+    coefs = np.einsum("kij,kj->ki", np.linalg.pinv(train_xtx), train_xty)
+
+    y_pred = np.einsum("ni,ni->n", X, coefs[fold])
+    return {**scores(y, y_pred), "folds": int(k)}
+
+
+def fit(table, columns, target, predictors, folds=DEFAULT_FOLDS, seed=42):
+    """
+    Least squares fit of `target` on an intercept plus `predictors` (names of
+    table columns). Returns the coefficients (intercept first), the in-sample
+    scores and the cross-validated scores. None when there are fewer rows
+    than coefficients.
+    """
+    index = {name: i for i, name in enumerate(columns)}
+    X = _design(table[:, [index[name] for name in predictors]])
+    y = table[:, index[target]]
+    if len(y) <= X.shape[1]:
+        return None
+
+    coefs, *_ = np.linalg.lstsq(X, y, rcond=None)
+    return {
+        "coefficients": [float(c) for c in coefs],
+        "n": int(len(y)),
+        **scores(y, X @ coefs),
+        "cv": cross_validate(X, y, folds=folds, seed=seed),
+    }
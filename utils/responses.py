@@ -0,0 +1,201 @@
+# utils/responses.py
+#
+# Response helpers: a faster JSON provider for Flask (orjson when installed) and
+# writers that stream large payloads row by row while keeping the
+# {"status", "message", "payload"} envelope used by every endpoint, or as plain
+# NDJSON / CSV / GeoJSON downloads.
+
+import csv
+import io
+import json
+
+from flask import Response, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Flush the streamed body once this many bytes are buffered
+STREAM_FLUSH_BYTES = 64 * 1024
+
+# Rows fetched from the database per round trip when streaming a query
+STREAM_CHUNK_ROWS = 500
+
+_EMPTY = object()
+
+
+def dumps_bytes(obj, default=None) -> bytes:
+    """
+    Serialize an object to compact UTF-8 JSON with sorted keys, like jsonify.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=default,
+            option=orjson.OPT_SORT_KEYS
+            | orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        obj, default=default, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that uses orjson for compact responses, so every jsonify call
+    benefits without touching the routes. Falls back to the stdlib encoder when
+    orjson is missing or when formatting options (e.g. indent) are requested.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, default=self.default).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj, default=self.default) + b"\n", mimetype=self.mimetype
+        )
+
+
+class RowStream:
+    """
+    Wraps an iterable of rows and eagerly pulls the first one, so query errors
+    are raised before the response starts (and can still become a 500) and the
+    caller can tell whether the result is empty.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._first = next(self._rows, _EMPTY)
+
+    @property
+    def empty(self) -> bool:
+        return self._first is _EMPTY
+
+    def __iter__(self):
+        if self._first is not _EMPTY:
+            first, self._first = self._first, _EMPTY
+            yield first
+        yield from self._rows
+
+
+def stream_query(query, session_factory, chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    RowStream of an ORM query fetched `chunk_rows` at a time. Flask tears the
+    request's scoped session down when the view returns, before a streamed
+    body is sent, so the query runs on a session of its own (from
+    `session_factory`) that is closed with the stream.
+    """
+    session = session_factory()
+
+    def rows():
+        try:
+            yield from query.with_session(session).yield_per(chunk_rows)
+        finally:
+            session.close()
+
+    return RowStream(rows())
+
+
+def iter_json_array(rows, serialize, flush_bytes=STREAM_FLUSH_BYTES):
+    """
+    Yield a JSON array as byte chunks, serializing rows as they are produced.
+    """
+    buffer = bytearray(b"[")
+    separator = b""
+    for row in rows:
+        buffer += separator + dumps_bytes(serialize(row))
+        separator = b","
+        if len(buffer) >= flush_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
+
+
+def iter_ndjson(rows, serialize, flush_bytes=STREAM_FLUSH_BYTES):
+    """
+    Yield newline-delimited JSON as byte chunks, one row per line.
+    """
+    buffer = bytearray()
+    for row in rows:
+        buffer += dumps_bytes(serialize(row)) + b"\n"
+        if len(buffer) >= flush_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_csv(rows, header, serialize, flush_bytes=STREAM_FLUSH_BYTES):
+    """
+    Yield CSV as byte chunks: the header right away, then one line per row
+    (`serialize` returns the row's values in header order).
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def drain():
+        chunk = out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+        return chunk
+
+    writer.writerow(header)
+    yield drain()
+    for row in rows:
+        writer.writerow(serialize(row))
+        if out.tell() >= flush_bytes:
+            yield drain()
+    if out.tell():
+        yield drain()
+
+
+def stream_list_response(rows, serialize, message, status_code=200):
+    """
+    Stream {"status": "success", "message": ..., "payload": [...]} with the payload
+    serialized row by row. Pass a RowStream (or a query with yield_per) as rows.
+    """
+    if not isinstance(rows, RowStream):
+        rows = RowStream(rows)
+    return _stream(_envelope(message, iter_json_array(rows, serialize)), status_code)
+
+
+def stream_file_response(chunks, mimetype, filename, status_code=200):
+    """
+    Stream a download (no envelope) as an attachment named `filename`.
+    """
+    response = Response(stream_with_context(chunks), status=status_code, mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def retry_later_response(message, retry_after):
+    """
+    503 response telling the client when to retry (Earth Engine over quota,
+    server at capacity).
+    """
+    response = jsonify({"status": "error", "message": message, "payload": None})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(int(retry_after))
+    return response
+
+
+def _envelope(message, payload_chunks):
+    yield b'{"status":"success","message":' + dumps_bytes(message) + b',"payload":'
+    yield from payload_chunks
+    yield b"}\n"
+
+
+def _stream(chunks, status_code):
+    return Response(
+        stream_with_context(chunks), status=status_code, mimetype="application/json"
+    )
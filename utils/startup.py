@@ -0,0 +1,177 @@
+# utils/startup.py
+#
+# Startup helpers: deferred imports for heavy dependencies (Earth Engine, NumPy)
+# and an import timer that reports how long each module took to load, so the
+# cost of starting a worker stays visible.
+
+import importlib
+import importlib.abc
+import os
+import sys
+import threading
+import time
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access. Lets the
+    geo blueprint be registered without paying for `ee` and its dependencies
+    until a geo endpoint is actually called.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """
+    Per-spec proxy that times `exec_module` of one module. The original loader
+    is put back on the spec and the module before the module runs, so nothing
+    outlives the import and shared loaders (e.g. BuiltinImporter) stay untouched.
+    """
+
+    def __init__(self, timer, spec, loader):
+        self._timer = timer
+        self._spec = spec
+        self._loader = loader
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        return create_module(spec) if create_module is not None else None
+
+    def exec_module(self, module):
+        self._spec.loader = self._loader
+        module.__loader__ = self._loader
+        self._timer._exec_timed(self._spec.name, self._loader, module)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path hook that measures the time spent executing every module imported
+    while it is active (the in-process equivalent of `python -X importtime`).
+    """
+
+    def __init__(self):
+        self.timings = {}  # module name -> {"total_ms": ..., "self_ms": ...}
+        self.started_at = None
+        self.elapsed_ms = None
+        self._active = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._active = True
+        sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self):
+        self._active = False
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+            self.elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+        return self
+
+    def find_spec(self, fullname, path, target=None):
+        # Avoid recursing into ourselves while asking the other finders
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(self, spec, spec.loader)
+        return spec
+
+    def _exec_timed(self, name, loader, module):
+        if not self._active:
+            return loader.exec_module(module)
+
+        # Nested imports run on the importing thread: one stack per thread
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            total_ms = (time.perf_counter() - start) * 1000
+            children_ms = stack.pop()
+            if stack:
+                stack[-1] += total_ms
+            with self._lock:
+                self.timings[name] = {
+                    "total_ms": round(total_ms, 2),
+                    "self_ms": round(total_ms - children_ms, 2),
+                }
+
+    def report(self, top: int = 15):
+        """
+        Summarize the imports: total time, and the slowest top-level packages
+        and individual modules.
+        """
+        with self._lock:
+            timings = dict(self.timings)
+        packages = {}
+        for name, timing in timings.items():
+            root = name.split(".")[0]
+            packages[root] = packages.get(root, 0.0) + timing["self_ms"]
+
+        return {
+            "elapsed_ms": round(self.elapsed_ms or 0.0, 2),
+            "modules_imported": len(timings),
+            "packages": sorted(
+                ({"package": k, "self_ms": round(v, 2)} for k, v in packages.items()),
+                key=lambda item: item["self_ms"],
+                reverse=True,
+            )[:top],
+            "modules": sorted(
+                ({"module": k, **v} for k, v in timings.items()),
+                key=lambda item: item["total_ms"],
+                reverse=True,
+            )[:top],
+        }
+
+
+def print_startup_report(report, budget_ms=None):
+    """
+    Print the startup summary and warn when it goes over STARTUP_IMPORT_BUDGET_MS.
+    """
+    if budget_ms is None:
+        budget_ms = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+    print(
+        f"⏱️ Startup imports: {report['elapsed_ms']:.0f} ms "
+        f"({report['modules_imported']} modules, budget {budget_ms:.0f} ms)"
+    )
+    for item in report["packages"][:5]:
+        print(f"   {item['package']:<24} {item['self_ms']:>8.1f} ms")
+    if report["elapsed_ms"] > budget_ms:
+        print(
+            f"⚠️ Startup imports exceeded the budget by "
+            f"{report['elapsed_ms'] - budget_ms:.0f} ms, run `flask startup-report` for details"
+        )
@@ -0,0 +1,87 @@
+# utils/timeseries.py
+#
+# Monthly KPI time series. Every month of the requested span is reduced in one
+# mapped Earth Engine call (GeoAnalytics.monthly_means). Finished months never
+# change, so their values are stored in the result cache as immutable entries;
+# later requests only compute the months they have not seen plus the current,
+# partial month.
+
+import datetime
+
+from . import cache
+
+# The datasets lag a few days behind real time (same lag as the base layers)
+DATA_LAG_DAYS = 7
+
+# Longest span one request may ask for
+MAX_MONTHS = 120
+
+LAYERS = ("heat", "NDVI", "AQ")
+
+
+def parse_month(value):
+    """Parse "YYYY-MM" into the first day of that month."""
+    return datetime.datetime.strptime(value, "%Y-%m").date()
+
+
+def _next_month(day):
+    return day.replace(year=day.year + 1, month=1) if day.month == 12 else day.replace(month=day.month + 1)
+
+
+def month_ranges(start, end, today=None):
+    """
+    (month, start date, end date, finished) for each month from `start` to
+    `end` (first days of month). The last available day is today minus the
+    data lag; months past it are left out.
+    """
+    today = today or datetime.date.today()
+    available = today - datetime.timedelta(days=DATA_LAG_DAYS)
+    ranges = []
+    month = start
+    while month <= end and month < available:
+        month_end = _next_month(month)
+        finished = month_end <= available
+        ranges.append((
+            month.strftime("%Y-%m"),
+            month.isoformat(),
+            (month_end if finished else available).isoformat(),
+            finished,
+        ))
+        month = month_end
+    return ranges
+
+
+def _cache_key(layer, latitude, longitude, buffer, month):
+    return f"timeseries:{layer}:{latitude:.6f}:{longitude:.6f}:{buffer}:{month}"
+
+
+def monthly_series(analyzer, layer, start, end):
+    """
+    Monthly means of `layer` for the analyzer's region. Returns a list of
+    {"month", "value", "final"} in order.
+    """
+    ranges = month_ranges(start, end)
+    result_cache = cache.get_cache()
+    values = {}
+
+    if result_cache is not None:
+        for month, _, _, finished in ranges:
+            if finished:
+                key = _cache_key(layer, analyzer.latitude, analyzer.longitude, analyzer.buffer, month)
+                cached = result_cache.get(key, cache="timeseries")
+                if cached is not None:
+                    values[month] = cached["value"]
+
+    missing = [r for r in ranges if r[0] not in values]
+    if missing:
+        computed = analyzer.monthly_means(layer, [(start_day, end_day) for _, start_day, end_day, _ in missing])
+        for (month, _, _, finished), value in zip(missing, computed):
+            values[month] = value
+            if finished and result_cache is not None:
+                key = _cache_key(layer, analyzer.latitude, analyzer.longitude, analyzer.buffer, month)
+                result_cache.set(key, {"value": value}, cache.IMMUTABLE_TTL_S)
+
+    return [
+        {"month": month, "value": values.get(month), "final": finished}
+        for month, _, _, finished in ranges
+    ]
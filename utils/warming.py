@@ -0,0 +1,263 @@
+# utils/warming.py
+#
+# Cache warming for the regions most visitors open. For each configured region
+# the same Earth Engine computations the geo endpoints make are evaluated ahead
+# of time (KPIs, base layer tile URLs, regression coefficients and slopes), so the results
+# are in the shared result cache (utils/cache.py) before the first visitor of
+# the day arrives.
+#
+# Runs from `flask warm-cache` or from a background thread that each worker
+# starts with its first request, at the times listed in WARM_CACHE_AT (e.g.
+# "04:00,10:00"). Only one worker of a host warms at a time (lock file).
+
+import datetime
+import json
+import os
+import threading
+import time
+
+from . import cache, metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_REGIONS_PATH = os.path.join(BASE_DIR, "data", "warm_regions.json")
+REPORT_PATH = os.path.join(BASE_DIR, "instance", "warm_cache_report.json")
+LOCK_PATH = os.path.join(BASE_DIR, "instance", "warm_cache.lock")
+
+KPI_LAYERS = ("heat", "NDVI", "AQ")
+
+
+def load_regions(path=None):
+    """
+    Read the regions to warm: a JSON list of {"name", "latitude", "longitude",
+    "buffer"} from WARM_REGIONS_FILE (default data/warm_regions.json).
+    """
+    path = path or os.getenv("WARM_REGIONS_FILE", DEFAULT_REGIONS_PATH)
+    with open(path, encoding="utf-8") as fh:
+        regions = json.load(fh)
+    for region in regions:
+        missing = {"name", "latitude", "longitude", "buffer"} - set(region)
+        if missing:
+            raise ValueError(f"Region {region} in {path} is missing {sorted(missing)}")
+    return regions
+
+
+def warm_region(region):
+    """
+    Evaluate every cacheable computation of one region. Returns what was
+    covered and how long each step took.
+    """
+    from .geoprocessor import GeoAnalytics
+
+    start = time.perf_counter()
+    items = {}
+
+    def step(name, func):
+        step_start = time.perf_counter()
+        try:
+            ok = func() is not False
+            items[name] = {"ok": ok, "ms": round((time.perf_counter() - step_start) * 1000, 1)}
+        except Exception as e:
+            items[name] = {"ok": False, "error": str(e)}
+        metrics.CACHE_WARM_ITEMS.labels(result="ok" if items[name]["ok"] else "error").inc()
+
+    # Same arguments as the geo routes parse from the query string, so the
+    # expressions (and cache keys) match
+    analyzer = GeoAnalytics(
+        latitude=float(region["latitude"]),
+        longitude=float(region["longitude"]),
+        buffer=int(region["buffer"]),
+    )
+
+    step("kpi:all", lambda: analyzer.get_all_kpis() is not None)
+    for layer in KPI_LAYERS:
+        step(f"kpi:{layer}", lambda layer=layer: analyzer.get_initial_kpis(layer) is not None)
+
+    layers = {
+        "temp": (analyzer.base_temp, analyzer.temp_vis_params),
+        "ndvi": (analyzer.base_ndvi, analyzer.ndvi_vis_params),
+        "aq": (analyzer.base_aq, analyzer.aq_vis_params),
+    }
+    for name, (image, vis_params) in layers.items():
+        step(f"tiles:{name}", lambda image=image, vis_params=vis_params: analyzer.get_tile_url(image, vis_params))
+
+    step("regression:simple", lambda: analyzer._fit_linear_models_simple(sample_scale=250))
+    step("regression:slopes", lambda: analyzer.simple_slopes() is not None)
+    step("regression:calibrated", analyzer.calibrate_precision)
+
+    return {
+        "name": region["name"],
+        "duration_s": round(time.perf_counter() - start, 2),
+        "covered": sum(1 for item in items.values() if item["ok"]),
+        "total": len(items),
+        "items": items,
+    }
+
+
+def warm_all(regions=None):
+    """
+    Warm every configured region and write the report to
+    instance/warm_cache_report.json.
+    """
+    regions = regions if regions is not None else load_regions()
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+
+    result_cache = cache.get_cache()
+    if result_cache is not None:
+        result_cache.purge_expired()
+
+    results = []
+    for region in regions:
+        try:
+            results.append(warm_region(region))
+        except Exception as e:
+            results.append({"name": region.get("name"), "error": str(e), "covered": 0, "total": 0})
+
+    report = {
+        "started_at": started_at,
+        "duration_s": round(time.perf_counter() - start, 2),
+        "regions": results,
+        "covered": sum(r["covered"] for r in results),
+        "total": sum(r["total"] for r in results),
+    }
+    metrics.CACHE_WARM_SECONDS.set(report["duration_s"])
+
+    try:
+        os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+        with open(REPORT_PATH, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"Warning: could not write the warm-cache report: {e}")
+    return report
+
+
+def warm_all_locked(regions=None):
+    """
+    Run warm_all unless another worker is already warming. Returns the report,
+    or None when skipped.
+    """
+    if fcntl is None:
+        return warm_all(regions)
+
+    os.makedirs(os.path.dirname(LOCK_PATH), exist_ok=True)
+    with open(LOCK_PATH, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        try:
+            return warm_all(regions)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def print_report(report):
+    print(
+        f"🔥 Cache warmed in {report['duration_s']:.1f} s: "
+        f"{report['covered']}/{report['total']} items"
+    )
+    for region in report["regions"]:
+        if "error" in region:
+            print(f"   {region['name']:<24} failed: {region['error']}")
+            continue
+        print(
+            f"   {region['name']:<24} {region['covered']}/{region['total']} "
+            f"in {region['duration_s']:.1f} s"
+        )
+        for name, item in region["items"].items():
+            if not item["ok"]:
+                print(f"      {name}: {item.get('error', 'no result')}")
+
+
+def parse_schedule(value):
+    """
+    Parse "HH:MM[,HH:MM...]" into a sorted list of datetime.time.
+    """
+    times = []
+    for part in (value or "").split(","):
+        part = part.strip()
+        if part:
+            try:
+                hours, minutes = part.split(":")
+                times.append(datetime.time(int(hours), int(minutes)))
+            except ValueError:
+                raise ValueError(f"expected HH:MM, got {part!r}") from None
+    return sorted(times)
+
+
+def schedule_from_env():
+    """
+    WARM_CACHE_AT, parsed once at startup. A malformed value is reported and
+    disables scheduled warming instead of failing every request.
+    """
+    value = os.getenv("WARM_CACHE_AT")
+    try:
+        return parse_schedule(value)
+    except ValueError as e:
+        print(f"⚠️ Invalid WARM_CACHE_AT {value!r} ({e}), scheduled cache warming disabled")
+        return []
+
+
+def next_run(schedule, now=None):
+    now = now or datetime.datetime.now()
+    for day_offset in (0, 1):
+        day = now.date() + datetime.timedelta(days=day_offset)
+        for at in schedule:
+            candidate = datetime.datetime.combine(day, at)
+            if candidate > now:
+                return candidate
+    return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def ensure_scheduler(app):
+    """
+    Start the warming thread once per process (called on every request, so CLI
+    commands never start it) for the schedule in app.config["WARM_CACHE_SCHEDULE"].
+    Only the first call tries, even if the thread could not be started.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = False
+                try:
+                    _scheduler = start_scheduler(app, app.config.get("WARM_CACHE_SCHEDULE")) or False
+                except Exception as e:
+                    print(f"Cache warming scheduler failed to start: {e}")
+    return _scheduler or None
+
+
+def start_scheduler(app, schedule=None):
+    """
+    Start the background warming thread for the times in WARM_CACHE_AT (server
+    local time). Does nothing when no schedule is configured.
+    """
+    schedule = schedule if schedule is not None else schedule_from_env()
+    if not schedule:
+        return None
+
+    def loop():
+        while True:
+            run_at = next_run(schedule)
+            time.sleep(max(0.0, (run_at - datetime.datetime.now()).total_seconds()))
+            try:
+                with app.app_context():
+                    report = warm_all_locked()
+                if report:
+                    print_report(report)
+            except Exception as e:
+                print(f"Cache warming failed: {e}")
+
+    thread = threading.Thread(target=loop, name="warm-cache", daemon=True)
+    thread.start()
+    print(f"🔥 Cache warming scheduled at {', '.join(t.strftime('%H:%M') for t in schedule)}")
+    return thread
@@ -1,17 +1,17 @@
 import ee
 import math
 from datetime import date, timedelta
-from dotenv import load_dotenv
-import os
 
-load_dotenv()
+from . import ee_client, fanout
+from .limiter import EEOverloadedError
 
-def get_wind_speed(lat, lon):
+DISPERSION_RADII = [1000, 5000, 10000] # Radius in meters (1km, 5km, 10km)
+
+
+def _wind_image():
     """
-    Obtains wind speed for the industrial prediction model
+    Monthly mean wind a year ago (ERA5-Land): speed, u and v bands.
     """
-
-    point = ee.Geometry.Point([lon, lat])
     today = date.today()
     target_date = today - timedelta(days=365)
     start_month = target_date.replace(day=1)
@@ -34,52 +34,137 @@ def get_wind_speed(lat, lon):
     
     print(f"📅 Calculating median for {start_month.strftime('%Y-%m')}")
 
-
-
     dataset_filtered = dataset_full.filterDate(start_date, end_date)
     mean_image = dataset_filtered.mean() 
-    
-    if mean_image is None:
-        print(f"Data not found in the range provided.")
-        return [0.0, 0.0, 0.0]
 
     u_mean = mean_image.select("u_component_of_wind_10m")
     v_mean = mean_image.select("v_component_of_wind_10m")
     
-    speed_image = wind_speed_ee(u_mean, v_mean)
+    speed_image = wind_speed_ee(u_mean, v_mean).rename("wind_speed")
+    # Speed and components in one image, so every consumer shares the same reductions
+    return speed_image.addBands(u_mean).addBands(v_mean)
 
-    DISPERSION_RADII = [1000, 5000, 10000] # Radius in meters (1km, 5km, 10km)
 
-    results_list = []
-    
-    for radius in DISPERSION_RADII:
-        buffered_point = point.buffer(radius) 
-        
+def _radius_means(wind_image, lat, lon, radius):
+    """
+    Mean wind speed, u and v within `radius` m of a point. The reduction is
+    cached, so speeds and components of the same point cost one round trip.
+    """
+    buffered_point = ee.Geometry.Point([lon, lat]).buffer(radius)
+    return ee_client.get_info(
+        wind_image.reduceRegion(
+            reducer=ee.Reducer.mean(),
+            geometry=buffered_point,
+            scale=1000,
+            maxPixels=1e13
+        ),
+        "reduceRegion",
+    )
+
+
+@ee_client.traced
+def get_wind_speed(lat, lon):
+    """
+    Obtains wind speed for the industrial prediction model
+    """
+    ee_client.initialize()
+    wind_image = _wind_image()
+
+    def radius_speed(radius):
         try:
-            value = speed_image.reduceRegion(
-                reducer=ee.Reducer.mean(), 
-                geometry=buffered_point, 
-                scale=1000,               
-                maxPixels=1e13
-            ).getInfo()
-
-            if value:
-                speed_key = list(value.keys())[0]
-                total_speed = round(value[speed_key], 2)
-                results_list.append(total_speed)
+            value = _radius_means(wind_image, lat, lon, radius)
+
+            if value and value.get("wind_speed") is not None:
+                total_speed = round(value["wind_speed"], 2)
                 print(f"Wind speed in {radius/1000}km radius of: {total_speed} m/s")
-            else:
-                results_list.append(0.0)
-                print(f"Null value in {radius/1000} km radio.")
+                return total_speed
+            print(f"Null value in {radius/1000} km radio.")
+            return 0.0
 
+        except EEOverloadedError:
+            raise
         except Exception as e:
-            results_list.append(0.0)
             print(f"Error GEE in radius {radius/1000}km: {e}")
+            return 0.0
+
+    # The radii are independent reductions: fetched in parallel
+    results_list = fanout.run(
+        lambda radius=radius: radius_speed(radius) for radius in DISPERSION_RADII
+    )
+    results_list = [0.0 if isinstance(r, Exception) else r for r in results_list]
 
     # 4. Returns the array
     return results_list
 
 
+@ee_client.traced
+def get_wind_components(lat, lon, radius=DISPERSION_RADII[-1]):
+    """
+    Mean wind (u, v) in m/s around a point, for plume dispersion. (0, 0)
+    when there is no data.
+    """
+    ee_client.initialize()
+    value = _radius_means(_wind_image(), lat, lon, radius) or {}
+    u = value.get("u_component_of_wind_10m")
+    v = value.get("v_component_of_wind_10m")
+    if u is None or v is None:
+        print(f"Null wind components in {radius/1000} km radio.")
+        return 0.0, 0.0
+    return float(u), float(v)
+
+
+# Sites per reduceRegions round trip of get_wind_speeds_bulk
+BULK_CHUNK = 2000
+
+
+@ee_client.traced
+def get_wind_speeds_bulk(points):
+    """
+    Wind speeds at DISPERSION_RADII around many (lat, lon) points, as
+    get_wind_speed gives for one, from one reduceRegions per BULK_CHUNK
+    distinct points. The radius means are focal means of the speed image
+    sampled at each point. Missing values are 0.0.
+    """
+    ee_client.initialize()
+    points = [(round(float(lat), 4), round(float(lon), 4)) for lat, lon in points]
+    unique = list(dict.fromkeys(points))
+
+    speed = _wind_image().select("wind_speed")
+    bands = [f"wind_speed_{radius}m" for radius in DISPERSION_RADII]
+    image = ee.Image.cat([
+        speed.focal_mean(radius=radius, kernelType="circle", units="meters").rename(band)
+        for radius, band in zip(DISPERSION_RADII, bands)
+    ])
+
+    def reduce_chunk(start):
+        collection = ee.FeatureCollection({
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"site": start + i}}
+                for i, (lat, lon) in enumerate(unique[start:start + BULK_CHUNK])
+            ],
+        })
+        return ee_client.get_info(
+            image.reduceRegions(collection=collection, reducer=ee.Reducer.first(), scale=1000),
+            "reduceRegions",
+        ) or {}
+
+    # Chunks are independent reductions: fetched in parallel
+    speeds = {}
+    for result in fanout.run(
+        lambda start=start: reduce_chunk(start) for start in range(0, len(unique), BULK_CHUNK)
+    ):
+        if isinstance(result, Exception):
+            raise result
+        for feature in result.get("features", []):
+            props = feature.get("properties") or {}
+            speeds[props.get("site")] = [round(props.get(band) or 0.0, 2) for band in bands]
+
+    print(f"🌬️ Wind speeds for {len(unique)} distinct sites")
+    by_point = {point: speeds.get(i, [0.0] * len(bands)) for i, point in enumerate(unique)}
+    return [by_point[point] for point in points]
+
+
 # Ejemplo de uso (la lat/lon debe ser tu punto de interés)
 # coords = {"lat": 19.4326, "lon": -99.1332} 
 # wind_data = get_wind_speed(coords["lat"], coords["lon"])